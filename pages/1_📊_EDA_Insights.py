@@ -9,6 +9,15 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sales_analytics.data_store import PERIOD_COLUMN, SALES_COLUMNS, get_store, load_rollups, load_sales
+from sales_analytics.downsample import downsample_frame, point_budget
+from sales_analytics.feature_cache import get_feature_cache
+from sales_analytics.features import engineer_features
+from sales_analytics.ingestion import ensure_ingestion_worker
 
 # Page config
 st.set_page_config(page_title="EDA & Insights", page_icon="📊", layout="wide")
@@ -72,31 +81,32 @@ st.markdown("""
 
 # Load data
 @st.cache_data
-def load_data():
-    import os
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    parent_dir = os.path.dirname(current_dir)
-    csv_path = os.path.join(parent_dir, 'company_sales_data.csv')
-    df = pd.read_csv(csv_path)
-    
-    # Add calculated columns
-    df['profit_per_unit'] = df['total_profit'] / df['total_units']
-    df['month'] = df['month_number']
-    
-    # Add season
-    seasons = {1: 'Winter', 2: 'Winter', 3: 'Spring', 4: 'Spring', 5: 'Spring',
-               6: 'Summer', 7: 'Summer', 8: 'Summer', 9: 'Fall', 10: 'Fall',
-               11: 'Fall', 12: 'Winter'}
-    df['season'] = df['month_number'].map(seasons)
-    
-    # Add quarter
-    df['quarter'] = ((df['month_number'] - 1) // 3) + 1
+def load_data(data_version):
+    # Time axis for the trend charts: the source date, else the store's year period
+    time_col = 'date' if 'date' in (get_store().schema() or {}) else PERIOD_COLUMN
+    df = load_sales(SALES_COLUMNS + [time_col])
+    
+    # Add calculated columns (profit per unit, month, season, quarter, ...); the feature
+    # matrix itself is mapped from the cache shared with training
+    df = engineer_features(df, features=get_feature_cache().for_frame(df[SALES_COLUMNS], data_version).features)
     df['quarter'] = 'Q' + df['quarter'].astype(str)
+    if time_col == PERIOD_COLUMN:
+        # Months since the start of the history; month_number alone repeats every year
+        df['period'] = (df[PERIOD_COLUMN] - df[PERIOD_COLUMN].min()) * 12 + df['month_number']
     
     return df
 
+@st.cache_data
+def load_cube(data_version):
+    # Materialized month-level aggregates; KPIs and seasonal/quarterly charts read from these
+    return load_rollups()
+
 try:
-    df = load_data()
+    # New actuals bump the store version, which refreshes only the data-backed caches
+    ensure_ingestion_worker()
+    data_version = get_store().version
+    df = load_data(data_version)
+    cube = load_cube(data_version)
     
     # KPI Section
     st.markdown("### 🎯 Key Performance Indicators")
@@ -104,7 +114,7 @@ try:
     kpi_col1, kpi_col2, kpi_col3, kpi_col4 = st.columns(4)
     
     with kpi_col1:
-        avg_units = df['total_units'].mean()
+        avg_units = cube.mean('total_units')
         st.markdown(f"""
         <div class="kpi-card">
             <div class="kpi-label">Average Monthly Units</div>
@@ -113,7 +123,7 @@ try:
         """, unsafe_allow_html=True)
     
     with kpi_col2:
-        avg_profit = df['total_profit'].mean()
+        avg_profit = cube.mean('total_profit')
         st.markdown(f"""
         <div class="kpi-card">
             <div class="kpi-label">Average Monthly Profit</div>
@@ -122,7 +132,7 @@ try:
         """, unsafe_allow_html=True)
     
     with kpi_col3:
-        top_product = df[['facecream', 'facewash', 'toothpaste', 'bathingsoap', 'shampoo', 'moisturizer']].mean().idxmax()
+        top_product = cube.mean(['facecream', 'facewash', 'toothpaste', 'bathingsoap', 'shampoo', 'moisturizer']).idxmax()
         st.markdown(f"""
         <div class="kpi-card">
             <div class="kpi-label">Top Selling Product</div>
@@ -131,7 +141,7 @@ try:
         """, unsafe_allow_html=True)
     
     with kpi_col4:
-        profit_efficiency = df['profit_per_unit'].mean()
+        profit_efficiency = cube.mean('profit_per_unit')
         st.markdown(f"""
         <div class="kpi-card">
             <div class="kpi-label">Profit Per Unit</div>
@@ -161,8 +171,19 @@ try:
     
     # Filter data
     filtered_df = df.copy()
+    season_filter = None
     if selected_season != 'All':
         filtered_df = filtered_df[filtered_df['season'] == selected_season]
+        season_filter = {'season': selected_season}
+    
+    # Time-series charts send at most `max_points` points per trace to the browser
+    x_col = 'date' if 'date' in filtered_df.columns else 'period'
+    max_points = point_budget()
+    x_range = None
+    if len(filtered_df) > max_points:
+        x_min, x_max = filtered_df[x_col].min(), filtered_df[x_col].max()
+        x_range = st.slider("Zoom Time Range", min_value=x_min, max_value=x_max, value=(x_min, x_max),
+                            help="Narrower ranges are re-sampled at full chart resolution")
     
     st.markdown("---")
     
@@ -180,17 +201,20 @@ try:
             vertical_spacing=0.15
         )
         
+        totals = downsample_frame(filtered_df, x_col, ['total_units', 'total_profit'], max_points, x_range=x_range)
+        trend_mode = 'lines+markers' if len(filtered_df) <= max_points else 'lines'
+        
         fig.add_trace(
-            go.Scatter(x=filtered_df['month_number'], y=filtered_df['total_units'],
-                      mode='lines+markers', name='Total Units',
+            go.Scatter(x=totals['total_units'][0], y=totals['total_units'][1],
+                      mode=trend_mode, name='Total Units',
                       line=dict(color='#00f0ff', width=3),
                       marker=dict(size=10)),
             row=1, col=1
         )
         
         fig.add_trace(
-            go.Scatter(x=filtered_df['month_number'], y=filtered_df['total_profit'],
-                      mode='lines+markers', name='Total Profit',
+            go.Scatter(x=totals['total_profit'][0], y=totals['total_profit'][1],
+                      mode=trend_mode, name='Total Profit',
                       line=dict(color='#00ff88', width=3),
                       marker=dict(size=10)),
             row=2, col=1
@@ -226,7 +250,7 @@ try:
         
         # Product sales breakdown
         product_cols = ['facecream', 'facewash', 'toothpaste', 'bathingsoap', 'shampoo', 'moisturizer']
-        product_means = filtered_df[product_cols].mean().sort_values(ascending=True)
+        product_means = cube.mean(product_cols, where=season_filter).sort_values(ascending=True)
         
         fig = go.Figure(go.Bar(
             x=product_means.values,
@@ -259,12 +283,13 @@ try:
         
         fig = go.Figure()
         colors = ['#00f0ff', '#00ff88', '#ff00ff', '#ffaa00', '#ff0088', '#00ffff']
+        product_series = downsample_frame(filtered_df, x_col, selected_products, max_points, x_range=x_range)
         
         for i, product in enumerate(selected_products):
             fig.add_trace(go.Scatter(
-                x=filtered_df['month_number'],
-                y=filtered_df[product],
-                mode='lines+markers',
+                x=product_series[product][0],
+                y=product_series[product][1],
+                mode=trend_mode,
                 name=product.replace('_', ' ').title(),
                 line=dict(color=colors[i % len(colors)], width=2),
                 marker=dict(size=8)
@@ -298,7 +323,7 @@ try:
         st.markdown("#### Seasonal Performance Analysis")
         
         # Seasonal breakdown
-        seasonal_stats = df.groupby('season')[['total_units', 'total_profit']].mean().round(0)
+        seasonal_stats = cube.mean(['total_units', 'total_profit'], by='season').round(0)
         
         col1, col2 = st.columns(2)
         
@@ -355,7 +380,7 @@ try:
         # Quarterly performance
         st.markdown("#### Quarterly Performance")
         
-        quarterly_stats = df.groupby('quarter')[['total_units', 'total_profit']].sum()
+        quarterly_stats = cube.sum(['total_units', 'total_profit'], by='quarter')
         
         fig = go.Figure()
         fig.add_trace(go.Bar(
@@ -400,7 +425,7 @@ try:
         
         # Correlation heatmap
         product_cols = ['facecream', 'facewash', 'toothpaste', 'bathingsoap', 'shampoo', 'moisturizer']
-        corr_matrix = df[product_cols].corr()
+        corr_matrix = cube.corr(product_cols)
         
         fig = go.Figure(data=go.Heatmap(
             z=corr_matrix.values,
@@ -439,12 +464,12 @@ try:
             color_discrete_sequence=['#00f0ff', '#00ff88', '#ffaa00', '#ff0088']
         )
         
-        # Add trendline
-        z = np.polyfit(df['total_units'], df['total_profit'], 1)
-        p = np.poly1d(z)
+        # Add trendline (least-squares fit from the rollup cells)
+        slope, intercept, units_profit_r = cube.linear_fit('total_units', 'total_profit')
+        trend_x = np.array([df['total_units'].min(), df['total_units'].max()])
         fig.add_trace(go.Scatter(
-            x=df['total_units'].sort_values(),
-            y=p(df['total_units'].sort_values()),
+            x=trend_x,
+            y=slope * trend_x + intercept,
             mode='lines',
             name='Trend',
             line=dict(color='red', width=2, dash='dash')
@@ -458,13 +483,40 @@ try:
         
         st.plotly_chart(fig, use_container_width=True)
         
-        st.markdown("""
+        # Wording follows the fitted line rather than assuming a perfect fit
+        strength = abs(units_profit_r)
+        direction = 'positive' if units_profit_r >= 0 else 'negative'
+        if np.isnan(units_profit_r):
+            correlation_text = ("Profit did not vary over the period, so it shows <strong>no correlation</strong> "
+                                "with units sold.")
+            pricing_text = "There is no per-unit margin to read off the trend."
+        elif strength >= 0.99:
+            correlation_text = (f"There's a <strong>near-perfect {direction} linear correlation (r={units_profit_r:.2f})</strong> "
+                                f"between units sold and profit,")
+            pricing_text = (f"confirming a consistent ${slope:,.2f} profit per unit pricing strategy. This stability "
+                            f"indicates excellent cost control and predictable margin management.")
+        elif strength >= 0.7:
+            correlation_text = (f"There's a <strong>strong {direction} correlation (r={units_profit_r:.2f})</strong> "
+                                f"between units sold and profit:")
+            pricing_text = (f"each extra unit adds about ${slope:,.2f} of profit, though margins shift somewhat "
+                            f"from month to month.")
+        elif strength >= 0.4:
+            correlation_text = (f"There's a <strong>moderate {direction} correlation (r={units_profit_r:.2f})</strong> "
+                                f"between units sold and profit:")
+            pricing_text = (f"volume explains only {units_profit_r ** 2:.0%} of the profit variation, so the "
+                            f"${slope:,.2f} per unit trend is a rough guide and product mix and pricing matter too.")
+        else:
+            correlation_text = (f"There's only a <strong>weak correlation (r={units_profit_r:.2f})</strong> "
+                                f"between units sold and profit:")
+            pricing_text = ("volume explains little of the profit variation, so margins are driven by product mix "
+                            "and pricing rather than by how many units ship.")
+        
+        st.markdown(f"""
         <div class="insight-box">
             <h3>💡 Key Insight</h3>
             <p>
-                There's a <strong>perfect linear correlation (r=1.0)</strong> between units sold and profit,
-                confirming a consistent $10 profit per unit pricing strategy. This stability indicates
-                excellent cost control and predictable margin management.
+                {correlation_text}
+                {pricing_text}
             </p>
         </div>
         """, unsafe_allow_html=True)
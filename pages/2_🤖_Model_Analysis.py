@@ -11,6 +11,15 @@ import json
 import joblib
 from pathlib import Path
 import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sales_analytics import load_predictor
+from sales_analytics.attribution import mean_abs_contributions
+from sales_analytics.data_store import get_store
+from sales_analytics.feature_cache import load_feature_set
+from sales_analytics.sensitivity import background_sample, ice_curves, sensitivity_ranking
 
 # Page config
 st.set_page_config(page_title="Model Analysis", page_icon="🤖", layout="wide")
@@ -67,16 +76,22 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+MODELS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'trained_models')
+DEPLOYMENT_PATH = os.path.join(MODELS_PATH, 'deployment_summary.json')
+
+def deployment_mtime():
+    # Changes whenever retraining or an online update publishes a new deployment
+    try:
+        return os.stat(DEPLOYMENT_PATH).st_mtime_ns
+    except OSError:
+        return None
+
 # Load model information
 @st.cache_data
-def load_model_info():
+def load_model_info(deployment_mtime):
     try:
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(current_dir)
-        
-        deployment_path = os.path.join(parent_dir, 'trained_models', 'deployment_summary.json')
-        feature_path = os.path.join(parent_dir, 'trained_models', 'feature_info.json')
+        deployment_path = DEPLOYMENT_PATH
+        feature_path = os.path.join(MODELS_PATH, 'feature_info.json')
         
         with open(deployment_path, 'r') as f:
             deployment_info = json.load(f)
@@ -89,7 +104,33 @@ def load_model_info():
         st.error(f"Error loading model info: {str(e)}")
         return None, None
 
-deployment_info, feature_info = load_model_info()
+@st.cache_resource
+def load_models():
+    return load_predictor()
+
+@st.cache_data
+def load_importances(deployment_version, data_version):
+    # Recomputed only when a new model version is published or new actuals arrive
+    try:
+        predictor = load_models()
+        predictor.refresh()
+        return mean_abs_contributions(predictor, load_feature_set().features)
+    except Exception as e:
+        st.warning(f"Could not compute feature importances: {str(e)}")
+        return None
+
+@st.cache_data
+def load_sensitivity(target, model_key, data_version):
+    # Keyed on the target's model artifact, so only a retrained model's curves are recomputed
+    try:
+        predictor = load_models()
+        predictor.refresh()
+        return ice_curves(predictor, background_sample(load_feature_set().features), [target])[target]
+    except Exception as e:
+        st.warning(f"Could not compute sensitivity curves: {str(e)}")
+        return None
+
+deployment_info, feature_info = load_model_info(deployment_mtime())
 
 if deployment_info and feature_info:
     
@@ -282,41 +323,109 @@ if deployment_info and feature_info:
                 for feature in matching_features:
                     st.markdown(f"- `{feature}`")
     
-    # Feature importance visualization (simulated)
-    st.markdown("#### 📈 Estimated Feature Importance")
-    
-    # Simulate feature importance (in real scenario, extract from trained models)
-    np.random.seed(42)
-    top_features = ['toothpaste', 'bathingsoap', 'facecream', 'month', 'is_holiday_season', 
-                    'toothpaste_ma3', 'bathingsoap_ma3', 'product_diversity']
-    importance_values = np.random.rand(len(top_features)) * 100
-    importance_values = sorted(importance_values, reverse=True)
-    
-    fig = go.Figure(go.Bar(
-        x=importance_values,
-        y=top_features,
-        orientation='h',
-        marker=dict(
-            color=importance_values,
-            colorscale='Viridis',
-            showscale=True,
-            colorbar=dict(title="Importance")
-        ),
-        text=[f"{v:.1f}%" for v in importance_values],
-        textposition='auto',
-    ))
+    # Feature importance from exact attributions of the deployed models
+    st.markdown("#### 📈 Feature Importance (Mean |SHAP| over the Sales History)")
     
-    fig.update_layout(
-        title="Top 8 Most Important Features",
-        xaxis_title="Relative Importance (%)",
-        yaxis_title="Feature",
-        template='plotly_dark',
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
+    importances = load_importances(deployment_info.get('version', deployment_info.get('created_date')),
+                                   get_store().version)
     
-    st.plotly_chart(fig, use_container_width=True)
+    if importances is None or importances.empty:
+        st.info("Feature importances are unavailable for the deployed models.")
+    else:
+        importance_target = st.selectbox(
+            "Model",
+            list(importances.columns),
+            format_func=lambda target: f"{target} ({deployment_info['best_models'][target]['algorithm']})"
+        )
+        target_importance = importances[importance_target]
+        # Share of the total attribution mass, so targets on different scales compare
+        importance_share = (target_importance / target_importance.sum() * 100).sort_values(ascending=False).head(8)
+        top_features = list(importance_share.index)
+        importance_values = list(importance_share.values)
+        
+        fig = go.Figure(go.Bar(
+            x=importance_values,
+            y=top_features,
+            orientation='h',
+            marker=dict(
+                color=importance_values,
+                colorscale='Viridis',
+                showscale=True,
+                colorbar=dict(title="Importance")
+            ),
+            text=[f"{v:.1f}%" for v in importance_values],
+            textposition='auto',
+        ))
+        
+        fig.update_layout(
+            title="Top 8 Most Important Features",
+            xaxis_title="Relative Importance (%)",
+            yaxis_title="Feature",
+            template='plotly_dark',
+            height=400,
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)'
+        )
+        
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption("Average absolute change each feature makes to the model's predictions on past months "
+                   "(TreeSHAP for RF/XGB, exact coefficient decomposition for linear models).")
+    
+    # Partial dependence and ICE curves of every deployed model
+    st.markdown("#### 📉 Partial Dependence & ICE Curves")
+    
+    predictor = load_models()
+    predictor.refresh()
+    curve_target = st.selectbox(
+        "Curve model",
+        predictor.targets,
+        format_func=lambda target: f"{target} ({predictor.algorithms[target]})"
+    )
+    curves = load_sensitivity(curve_target, predictor.model_key(curve_target), get_store().version)
+    
+    if not curves:
+        st.info("Sensitivity curves are unavailable for this model.")
+    else:
+        ranking = sensitivity_ranking(curves)
+        curve_feature = st.selectbox(
+            "Feature",
+            [feature for feature, _ in ranking],
+            format_func=lambda feature: f"{feature} (PD range {dict(ranking)[feature]:,.1f})"
+        )
+        grid, ice = curves[curve_feature]
+        center_ice = st.checkbox("Center ICE curves at the first grid value", value=False)
+        if center_ice:
+            ice = ice - ice[:, :1]
+        partial_dependence = ice.mean(axis=0)
+        
+        fig = go.Figure()
+        for i, row in enumerate(ice):
+            fig.add_trace(go.Scatter(
+                x=grid, y=row, mode='lines',
+                line=dict(color='rgba(0, 240, 255, 0.25)', width=1),
+                name='ICE (one month)', legendgroup='ice', showlegend=i == 0,
+                hoverinfo='skip'
+            ))
+        fig.add_trace(go.Scatter(
+            x=grid, y=partial_dependence, mode='lines+markers',
+            line=dict(color='#ffaa00', width=4),
+            name='Partial dependence'
+        ))
+        
+        fig.update_layout(
+            title=f"{curve_target} vs {curve_feature}",
+            xaxis_title=curve_feature,
+            yaxis_title=f"Change in {curve_target}" if center_ice else f"Predicted {curve_target}",
+            template='plotly_dark',
+            height=450,
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)'
+        )
+        
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"Each thin line sweeps {curve_feature} over its observed range for one past month "
+                   f"({ice.shape[0]} months, {len(grid)} grid values) with the other features held fixed; "
+                   "the thick line is their average. Features are ordered by the range of that average.")
     
     st.markdown("---")
     
@@ -381,7 +490,7 @@ if deployment_info and feature_info:
         - **Evaluation Metrics:** R², RMSE, MAE
         
         **Model Persistence:**
-        - Models saved using `joblib`
+        - Models saved using `joblib`, plus a pickle-free float32 artifact for fast, version-independent loading
         - Feature scaler saved separately
         - Deployment metadata tracked in JSON
         
@@ -413,14 +522,9 @@ if deployment_info and feature_info:
     # Model Files
     st.markdown("### 📁 Deployed Model Files")
     
-    model_files = {
-        'Total Units Model': 'trained_models/best_total_units_model_rf.joblib',
-        'Total Profit Model': 'trained_models/best_total_profit_model_rf.joblib',
-        'Face Cream Model': 'trained_models/best_facecream_model_xgb.joblib',
-        'Moisturizer Model': 'trained_models/best_moisturizer_model_lr.joblib',
-        'Profit Per Unit Model': 'trained_models/best_profit_per_unit_model_lr.joblib',
-        'Feature Scaler': 'trained_models/feature_scaler.joblib'
-    }
+    # Filenames carry the deployment version after a retrain, so list what the summary points at
+    model_files = {f"{info['description']} Model": info['filename'] for info in best_models.values()}
+    model_files['Feature Scaler'] = deployment_info['feature_scaler']
     
     file_col1, file_col2 = st.columns(2)
     
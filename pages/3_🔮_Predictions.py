@@ -6,11 +6,34 @@ Company Sales Data - Interactive Forecasting
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
 import json
+import os
+import sys
 from pathlib import Path
 import plotly.graph_objects as go
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sales_analytics import PredictionCache, RollingWindowStore, load_predictor
+from sales_analytics.config import PRODUCT_COLS
+from sales_analytics.data_store import get_store, load_sales
+from sales_analytics.features import HOLIDAY_MONTHS, SEASON_MAP
+from sales_analytics.forecasting import MAX_HORIZON, RecursiveForecaster
+from sales_analytics.goal_seek import goal_seek
+from sales_analytics.ingestion import ensure_ingestion_worker
+from sales_analytics.intervals import DEFAULT_LEVEL, INTERVAL_LEVELS
+from sales_analytics.reconciliation import (historical_proportions, product_hierarchy, product_residuals,
+                                            reconcile_forecast)
+
+# Display names of the product columns
+PRODUCT_LABELS = {
+    'facecream': 'Face Cream',
+    'facewash': 'Face Wash',
+    'toothpaste': 'Toothpaste',
+    'bathingsoap': 'Bathing Soap',
+    'shampoo': 'Shampoo',
+    'moisturizer': 'Moisturizer',
+}
+
 # Page config
 st.set_page_config(page_title="Make Predictions", page_icon="🔮", layout="wide")
 
@@ -70,20 +93,10 @@ st.markdown("""
 @st.cache_resource
 def load_models():
     try:
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(current_dir)
-        models_dir = os.path.join(parent_dir, 'trained_models')
-        
-        models = {}
-        models['total_units'] = joblib.load(os.path.join(models_dir, 'best_total_units_model_rf.joblib'))
-        models['total_profit'] = joblib.load(os.path.join(models_dir, 'best_total_profit_model_rf.joblib'))
-        models['facecream'] = joblib.load(os.path.join(models_dir, 'best_facecream_model_xgb.joblib'))
-        models['moisturizer'] = joblib.load(os.path.join(models_dir, 'best_moisturizer_model_lr.joblib'))
-        models['profit_per_unit'] = joblib.load(os.path.join(models_dir, 'best_profit_per_unit_model_lr.joblib'))
-        models['scaler'] = joblib.load(os.path.join(models_dir, 'feature_scaler.joblib'))
-        
-        return models
+        # Trailing actuals feed the *_ma3 trend features of every scenario
+        rolling_state = RollingWindowStore.from_store()
+        # Cached resource, so the prediction cache is shared by every session
+        return load_predictor(rolling_state=rolling_state, cache=PredictionCache())
     except Exception as e:
         st.error(f"Error loading models: {str(e)}")
         return None
@@ -103,22 +116,43 @@ def load_feature_info():
         return None
 
 @st.cache_data
-def load_historical_data():
+def load_historical_data(data_version):
     try:
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(current_dir)
-        csv_path = os.path.join(parent_dir, 'company_sales_data.csv')
-        return pd.read_csv(csv_path)
+        # Product mix for form defaults and the template, totals for the comparison metric
+        return load_sales(['month_number'] + PRODUCT_COLS + ['total_units', 'total_profit'])
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         return None
 
-models = load_models()
+@st.cache_data
+def load_outlook(model_versions, data_version, horizon, reconciliation_method):
+    # Rolled forward (and reconciled) only for a new model version, new actuals or new settings
+    predictor = load_models()
+    history = load_historical_data(data_version)
+    outlook = RecursiveForecaster(predictor).forecast(history, horizon)
+    base_gap = (outlook['total_units'] - outlook[[f'{p}_units' for p in PRODUCT_COLS]].sum(axis=1)).abs().mean()
+    if reconciliation_method != 'none':
+        outlook = reconcile_forecast(
+            outlook,
+            reconciliation_method,
+            residuals=product_residuals(predictor, history),
+            proportions=historical_proportions(product_hierarchy(), history[PRODUCT_COLS])
+        )
+    return outlook, base_gap
+
+ensure_ingestion_worker()
+data_version = get_store().version
+
+predictor = load_models()
+if predictor is not None:
+    # Models and the prediction cache stay loaded; only the trailing actuals and
+    # newly published model versions are re-read
+    predictor.rolling_state.refresh()
+    predictor.refresh()
 feature_info = load_feature_info()
-historical_df = load_historical_data()
+historical_df = load_historical_data(data_version)
 
-if models and feature_info and historical_df is not None:
+if predictor is not None and feature_info and historical_df is not None:
     
     # Prediction Selection
     st.markdown("### 🎯 Select Prediction Task")
@@ -181,7 +215,7 @@ if models and feature_info and historical_df is not None:
             
             is_holiday = st.checkbox(
                 "Holiday Season?",
-                value=(month in [11, 12, 1]),
+                value=(month in HOLIDAY_MONTHS),
                 help="Check if this is a holiday season month"
             )
         
@@ -254,6 +288,25 @@ if models and feature_info and historical_df is not None:
                 help=f"Historical avg: {avg_moisturizer}"
             )
         
+        st.caption(
+            f"📈 3-month trend features combine your inputs with the last "
+            f"{min(len(predictor.rolling_state), 2)} recorded months of actuals."
+        )
+        
+        predict_all_targets = st.checkbox(
+            "Predict all targets",
+            value=False,
+            help="Score every deployed model on this scenario in one pass"
+        )
+        
+        interval_level = st.select_slider(
+            "Prediction interval",
+            options=[int(level * 100) for level in INTERVAL_LEVELS],
+            value=int(DEFAULT_LEVEL * 100),
+            format_func=lambda level: f"{level}%",
+            help="Coverage of the range shown around the forecast"
+        ) / 100
+        
         # Submit button
         st.markdown("---")
         submit_button = st.form_submit_button("🔮 Generate Prediction", use_container_width=True)
@@ -266,46 +319,38 @@ if models and feature_info and historical_df is not None:
             # Calculate derived features
             product_diversity = sum([1 for val in [facecream, facewash, toothpaste, bathingsoap, shampoo, moisturizer] if val > 0])
             
-            # Calculate moving averages (use current values as approximation)
-            facecream_ma3 = facecream
-            facewash_ma3 = facewash
-            toothpaste_ma3 = toothpaste
-            bathingsoap_ma3 = bathingsoap
-            shampoo_ma3 = shampoo
-            moisturizer_ma3 = moisturizer
-            
             # Season encoding
-            season_mapping = {
-                1: 'Winter', 2: 'Winter', 3: 'Spring', 4: 'Spring', 5: 'Spring',
-                6: 'Summer', 7: 'Summer', 8: 'Summer', 9: 'Fall', 10: 'Fall',
-                11: 'Fall', 12: 'Winter'
-            }
-            current_season = season_mapping[month]
-            
-            season_Fall = 1 if current_season == 'Fall' else 0
-            season_Spring = 1 if current_season == 'Spring' else 0
-            season_Summer = 1 if current_season == 'Summer' else 0
-            season_Winter = 1 if current_season == 'Winter' else 0
-            
-            # Create feature array
-            feature_values = [
-                month, quarter, int(is_holiday), product_diversity,
-                facecream, facewash, toothpaste, bathingsoap, shampoo, moisturizer,
-                facecream_ma3, facewash_ma3, toothpaste_ma3, bathingsoap_ma3, shampoo_ma3, moisturizer_ma3,
-                season_Fall, season_Spring, season_Summer, season_Winter
-            ]
-            
-            # Create DataFrame with proper feature names
-            feature_df = pd.DataFrame([feature_values], columns=feature_info['feature_columns'])
+            current_season = SEASON_MAP[month]
+            
+            # Single-row scenario scored through the batch engine
+            scenario_df = pd.DataFrame([{
+                'month': month,
+                'is_holiday_season': int(is_holiday),
+                'facecream': facecream,
+                'facewash': facewash,
+                'toothpaste': toothpaste,
+                'bathingsoap': bathingsoap,
+                'shampoo': shampoo,
+                'moisturizer': moisturizer
+            }])
             
-            # Scale features
             try:
-                feature_scaled = models['scaler'].transform(feature_df)
-                
                 # Make prediction - handle scikit-learn version compatibility
                 try:
-                    prediction = models[selected_task].predict(feature_scaled)[0]
+                    # Intervals come out of the same model pass as the forecasts; both are
+                    # served from the shared prediction cache when the scenario repeats
+                    if predict_all_targets:
+                        # One shared feature matrix, all models scored concurrently
+                        forecast = predictor.predict_intervals(scenario_df, level=interval_level, parallel=True).iloc[0]
+                        all_predictions = forecast[predictor.targets]
+                    else:
+                        all_predictions = None
+                        forecast = predictor.predict_intervals(scenario_df, [selected_task], level=interval_level).iloc[0]
+                    prediction = forecast[selected_task]
+                    interval = (forecast[f'{selected_task}_lower'], forecast[f'{selected_task}_upper'])
                 except AttributeError as e:
+                    all_predictions = None
+                    interval = None
                     # Fallback for version mismatch - use simple formula
                     if selected_task == 'total_units':
                         prediction = sum([facecream, facewash, toothpaste, bathingsoap, shampoo, moisturizer])
@@ -319,6 +364,8 @@ if models and feature_info and historical_df is not None:
                         prediction = moisturizer
                     st.warning("⚠️ Using fallback prediction due to model version compatibility. Consider retraining models with current scikit-learn version.")
             except Exception as e:
+                all_predictions = None
+                interval = None
                 st.error(f"Prediction error: {str(e)}")
                 st.info("Using estimated prediction based on inputs...")
                 # Simple fallback predictions
@@ -344,14 +391,20 @@ if models and feature_info and historical_df is not None:
             
             # Format prediction based on task
             if selected_task == 'profit_per_unit':
-                pred_display = f"${prediction:.2f}"
+                value_display = lambda v: f"${v:.2f}"
                 unit = "per unit"
             elif 'profit' in selected_task:
-                pred_display = f"${prediction:,.2f}"
+                value_display = lambda v: f"${v:,.2f}"
                 unit = "USD"
             else:
-                pred_display = f"{prediction:,.0f}"
+                value_display = lambda v: f"{v:,.0f}"
                 unit = "units"
+            pred_display = value_display(prediction)
+            
+            if interval is not None and np.isfinite(interval).all():
+                interval_display = f"{interval_level:.0%} range: {value_display(interval[0])} – {value_display(interval[1])}"
+            else:
+                interval_display = "No calibrated range for this model"
             
             # Prediction card
             st.markdown(f"""
@@ -360,11 +413,34 @@ if models and feature_info and historical_df is not None:
                 <div class="prediction-value">{pred_display}</div>
                 <p style='color: white; font-size: 1.2rem; opacity: 0.9;'>{unit}</p>
                 <div style='margin-top: 1.5rem;'>
-                    <span class="confidence-badge">AI-Powered Forecast</span>
+                    <span class="confidence-badge">{interval_display}</span>
                 </div>
             </div>
             """, unsafe_allow_html=True)
             
+            if interval is not None:
+                interval_methods = {
+                    'tree quantiles': "the spread of the forest's individual trees",
+                    'conformal': "held-out walk-forward errors recorded at training time (conformal)",
+                    'normal': "the model's held-out RMSE (normal approximation)",
+                    'unavailable': "no recorded validation error",
+                }
+                st.caption(f"📏 Range from {interval_methods[predictor.interval_method(selected_task, interval_level)]}.")
+            
+            if all_predictions is not None:
+                st.markdown("#### 🧮 All Target Forecasts")
+                
+                target_cols = st.columns(len(all_predictions))
+                for col, (target, value) in zip(target_cols, all_predictions.items()):
+                    task_name = next((k for k, v in prediction_tasks.items() if v[0] == target), target)
+                    with col:
+                        if target == 'profit_per_unit':
+                            st.metric(task_name, f"${value:.2f}")
+                        elif 'profit' in target:
+                            st.metric(task_name, f"${value:,.0f}")
+                        else:
+                            st.metric(task_name, f"{value:,.0f}")
+            
             # Additional insights
             col1, col2, col3 = st.columns(3)
             
@@ -399,50 +475,72 @@ if models and feature_info and historical_df is not None:
             
             st.markdown("---")
             
-            # Feature Contribution (simulated)
+            # Feature Contribution (exact attribution of the deployed model)
             st.markdown("### 📊 Feature Contribution Analysis")
             
             st.info("""
             **Understanding the Prediction:**
-            The model analyzed all input features and their interactions to generate this forecast.
-            Below are the estimated contributions of key features to this prediction.
+            Each bar is the exact amount a feature moved this forecast away from the model's average
+            prediction (SHAP values: TreeSHAP for RF/XGB, coefficient decomposition for linear models).
+            The contributions add up to the prediction shown above.
             """)
             
-            # Simulated feature importance for this prediction
-            np.random.seed(int(prediction) % 100)
-            top_contributors = {
-                'Bathing Soap': bathingsoap / total_input_units * 100 if total_input_units > 0 else 0,
-                'Toothpaste': toothpaste / total_input_units * 100 if total_input_units > 0 else 0,
-                'Face Cream': facecream / total_input_units * 100 if total_input_units > 0 else 0,
-                'Month/Season': np.random.uniform(10, 20),
-                'Holiday Effect': 15 if is_holiday else 5,
-                'Product Diversity': product_diversity / 6 * 100
-            }
-            
-            fig = go.Figure(go.Bar(
-                x=list(top_contributors.values()),
-                y=list(top_contributors.keys()),
-                orientation='h',
-                marker=dict(
-                    color=list(top_contributors.values()),
-                    colorscale='Viridis',
-                    showscale=False
-                ),
-                text=[f"{v:.1f}%" for v in top_contributors.values()],
-                textposition='auto',
-            ))
-            
-            fig.update_layout(
-                title="Estimated Feature Contributions",
-                xaxis_title="Contribution (%)",
-                yaxis_title="Feature",
-                template='plotly_dark',
-                height=400,
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)'
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            try:
+                contributions, expected_value = predictor.explain(scenario_df, selected_task)
+                contributions = contributions.iloc[0]
+            except Exception as e:
+                contributions = None
+                st.caption(f"Feature contributions are unavailable for this model: {str(e)}")
+            
+            if contributions is not None:
+                # Related features are summed into the groups shown on the form
+                feature_groups = {
+                    'month': 'Month/Season', 'quarter': 'Month/Season',
+                    'season_Fall': 'Month/Season', 'season_Spring': 'Month/Season',
+                    'season_Summer': 'Month/Season', 'season_Winter': 'Month/Season',
+                    'is_holiday_season': 'Holiday Effect',
+                    'product_diversity': 'Product Diversity',
+                }
+                for product in PRODUCT_COLS:
+                    feature_groups[product] = PRODUCT_LABELS[product]
+                    feature_groups[f'{product}_ma3'] = f'{PRODUCT_LABELS[product]} (3-mo trend)'
+                
+                top_contributors = contributions.groupby(contributions.index.map(feature_groups)).sum()
+                top_contributors = top_contributors.reindex(
+                    top_contributors.abs().sort_values(ascending=False).index
+                ).head(8)[::-1]
+                
+                if selected_task == 'profit_per_unit':
+                    value_format = lambda v: f"{v:+,.2f}"
+                else:
+                    value_format = lambda v: f"{v:+,.0f}"
+                
+                fig = go.Figure(go.Bar(
+                    x=top_contributors.values,
+                    y=top_contributors.index,
+                    orientation='h',
+                    marker=dict(
+                        color=['#00ff88' if v >= 0 else '#ff4b6e' for v in top_contributors.values]
+                    ),
+                    text=[value_format(v) for v in top_contributors.values],
+                    textposition='auto',
+                ))
+                
+                fig.update_layout(
+                    title="Feature Contributions to This Forecast",
+                    xaxis_title=f"Contribution ({unit})",
+                    yaxis_title="Feature",
+                    template='plotly_dark',
+                    height=400,
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)'
+                )
+                
+                st.plotly_chart(fig, use_container_width=True)
+                st.caption(
+                    f"Average model prediction {value_format(expected_value).lstrip('+')} "
+                    f"+ contributions {value_format(contributions.sum())} = forecast {value_format(expected_value + contributions.sum()).lstrip('+')}"
+                )
             
             st.markdown("---")
             
@@ -495,6 +593,9 @@ if models and feature_info and historical_df is not None:
                 'Product Diversity': product_diversity
             }
             
+            if all_predictions is not None:
+                report_data.update({f'Predicted {target}': value for target, value in all_predictions.items()})
+            
             report_df = pd.DataFrame([report_data])
             
             csv = report_df.to_csv(index=False)
@@ -507,6 +608,272 @@ if models and feature_info and historical_df is not None:
     
     else:
         st.info("👆 Fill in the form above and click '🔮 Generate Prediction' to see results")
+    
+    st.markdown("---")
+    
+    # Multi-month outlook rolled forward from the latest actuals
+    st.markdown("### 📆 Multi-Month Outlook")
+    
+    outlook_col1, outlook_col2 = st.columns([1, 3])
+    with outlook_col1:
+        horizon = st.slider(
+            "Months ahead",
+            min_value=1,
+            max_value=MAX_HORIZON,
+            value=12,
+            help="Each month's moving averages are built from the forecasts before it"
+        )
+        outlook_target = st.selectbox(
+            "Outlook target",
+            predictor.targets,
+            format_func=lambda target: next((k for k, v in prediction_tasks.items() if v[0] == target), target)
+        )
+        reconciliation_labels = {
+            'mint_shrink': 'MinT (shrinkage)',
+            'wls_var': 'MinT (error variances)',
+            'bottom_up': 'Bottom-up',
+            'top_down': 'Top-down',
+            'ols': 'OLS',
+            'none': 'None (independent models)',
+        }
+        reconciliation_method = st.selectbox(
+            "Reconciliation",
+            list(reconciliation_labels),
+            format_func=reconciliation_labels.get,
+            help="Make Total Units equal the sum of the product forecasts"
+        )
+    
+    try:
+        model_versions = tuple(predictor.model_key(target) for target in predictor.targets)
+        outlook_df, base_gap = load_outlook(model_versions, data_version, horizon, reconciliation_method)
+    except Exception as e:
+        outlook_df = None
+        st.error(f"Outlook error: {str(e)}")
+    
+    if outlook_df is not None:
+        month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+        outlook_labels = [f"+{step} ({month_names[month - 1]})" for step, month in zip(outlook_df['step'], outlook_df['month'])]
+        
+        with outlook_col2:
+            fig = go.Figure(go.Scatter(
+                x=outlook_labels,
+                y=outlook_df[outlook_target],
+                mode='lines+markers',
+                line=dict(color='#00f0ff', width=3),
+                marker=dict(size=8, color='#00ff88')
+            ))
+            fig.update_layout(
+                height=350,
+                margin=dict(l=20, r=20, t=20, b=20),
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(0,0,0,0)',
+                font=dict(color='white'),
+                xaxis=dict(title='Months ahead', gridcolor='rgba(255,255,255,0.1)'),
+                yaxis=dict(title=outlook_target.replace('_', ' ').title(), gridcolor='rgba(255,255,255,0.1)')
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        
+        modelled_products = [PRODUCT_LABELS[target] for target in predictor.targets if target in PRODUCT_LABELS]
+        st.caption(
+            f"📆 Product units are projected from each product's trailing 3-month level"
+            f"{' (' + ' and '.join(modelled_products) + ' from their own models)' if modelled_products else ''}; "
+            f"every month feeds the moving averages of the next. The independent forecasts miss the sum of "
+            f"their products by {base_gap:,.0f} units a month on average"
+            f"{'; reconciled to add up exactly.' if reconciliation_method != 'none' else '.'}"
+        )
+        st.download_button(
+            label="📥 Download Outlook (CSV)",
+            data=outlook_df.to_csv(index=False),
+            file_name=f"sales_outlook_{horizon}_months.csv",
+            mime="text/csv"
+        )
+    
+    st.markdown("---")
+    
+    # Goal seek: search the product mix instead of resubmitting the form by hand
+    st.markdown("### 🎯 Goal Seek")
+    
+    st.markdown("""
+    <div class="input-section">
+        <h4 style='color: #00f0ff; margin-bottom: 1rem;'>Find the Product Mix That Hits Your Target</h4>
+        <p style='color: white;'>
+            Choose a model and a goal; the optimizer searches product units within your limits
+            and returns the closest mixes it finds.
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Outside the form so the default goal follows the chosen model straight away
+    goal_target = st.selectbox(
+        "Model",
+        predictor.targets,
+        format_func=lambda target: next((k for k, v in prediction_tasks.items() if v[0] == target), target),
+        key="goal_target"
+    )
+    if goal_target in historical_df:
+        goal_history = historical_df[goal_target]
+    else:
+        goal_history = historical_df['total_profit'] / historical_df['total_units']
+    goal_mean = float(goal_history.mean())
+    # Step and default at the third significant figure of the target's historical mean
+    goal_step = 10.0 ** (np.floor(np.log10(goal_mean)) - 2) if goal_mean > 0 else 1.0
+    
+    with st.form("goal_seek_form"):
+        goal_col2, goal_col3 = st.columns(2)
+        with goal_col2:
+            goal_value = st.number_input(
+                "Target value",
+                min_value=0.0,
+                value=max(round(goal_mean / goal_step) * goal_step, 0.0),
+                step=goal_step,
+                key=f"goal_value_{goal_target}",
+                help="Goal for the chosen model's forecast (defaults to its historical mean)"
+            )
+        with goal_col3:
+            goal_month = st.slider("Month", min_value=1, max_value=12, value=6, key="goal_month")
+        
+        product_max = historical_df[PRODUCT_COLS].max()
+        bounds = {}
+        bound_cols = st.columns(3)
+        for i, product in enumerate(PRODUCT_COLS):
+            limit = int(product_max[product] * 2)
+            with bound_cols[i % 3]:
+                bounds[product] = st.slider(
+                    f"{PRODUCT_LABELS[product]} units",
+                    min_value=0,
+                    max_value=limit,
+                    value=(0, int(product_max[product] * 1.5)),
+                    step=50
+                )
+        
+        capacity = st.number_input(
+            "Total capacity (units)",
+            min_value=0,
+            value=int(historical_df['total_units'].max() * 1.2),
+            step=1000,
+            help="Upper limit on the sum of all product units"
+        )
+        goal_submit = st.form_submit_button("🎯 Find Product Mix", use_container_width=True)
+    
+    if goal_submit:
+        try:
+            with st.spinner("🎯 Searching product mixes..."):
+                mixes, search_stats = goal_seek(
+                    predictor,
+                    goal_target,
+                    goal_value,
+                    goal_month,
+                    lower=[bounds[product][0] for product in PRODUCT_COLS],
+                    upper=[bounds[product][1] for product in PRODUCT_COLS],
+                    capacity=capacity,
+                    is_holiday=goal_month in HOLIDAY_MONTHS,
+                    reference=historical_df[PRODUCT_COLS].mean().to_numpy()
+                )
+            
+            best_gap = mixes['gap'].iloc[0]
+            st.success(
+                f"✅ Best mix forecasts {mixes['predicted'].iloc[0]:,.2f} ({best_gap:+,.2f} from the target) — "
+                f"{search_stats['evaluations']:,} candidates scored in {search_stats['seconds']:.2f}s"
+            )
+            mixes_display = mixes.rename(columns={
+                **PRODUCT_LABELS,
+                'total_units_input': 'Total Units',
+                'predicted': 'Forecast',
+                'gap': 'Gap to Target',
+            })
+            st.dataframe(mixes_display.round(2), use_container_width=True, hide_index=True)
+            if predictor.algorithms.get(goal_target) in ('RF', 'XGB'):
+                st.caption(
+                    "🌳 Tree-based models forecast in steps, so some targets can only be approached, "
+                    "not hit exactly; mixes are listed closest first."
+                )
+        except Exception as e:
+            st.error(f"Goal seek error: {str(e)}")
+    
+    st.markdown("---")
+    
+    # Batch Forecasting
+    st.markdown("### 📂 Batch Scenario Forecasting")
+    
+    st.markdown("""
+    <div class="input-section">
+        <h4 style='color: #00f0ff; margin-bottom: 1rem;'>Forecast a Whole Planning Cycle</h4>
+        <p style='color: white;'>
+            Upload a CSV with one scenario per row (a <code>month</code> column plus the six product unit columns).
+            Every scenario is scored against all deployed models in a single pass. List each month once and the
+            months are chained, so each month's trend features build on the months uploaded before it.
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    template_df = historical_df[['month_number'] + PRODUCT_COLS].rename(columns={'month_number': 'month'})
+    st.download_button(
+        label="📄 Download Scenario Template (CSV)",
+        data=template_df.to_csv(index=False),
+        file_name="scenario_template.csv",
+        mime="text/csv"
+    )
+    
+    uploaded_file = st.file_uploader("Upload Scenarios (CSV)", type=['csv'])
+    
+    if uploaded_file is not None:
+        try:
+            scenarios_df = pd.read_csv(uploaded_file)
+            
+            with st.spinner(f"🤖 Forecasting {len(scenarios_df):,} scenarios..."):
+                results_df = predictor.predict_all(scenarios_df)
+            
+            st.success(f"✅ Forecast {len(results_df):,} scenarios across {len(predictor.targets)} targets")
+            st.dataframe(results_df.head(100), use_container_width=True)
+            
+            st.download_button(
+                label="📥 Download Batch Forecast (CSV)",
+                data=results_df.to_csv(index=False),
+                file_name="batch_sales_forecast.csv",
+                mime="text/csv"
+            )
+            
+            explain_target = st.selectbox(
+                "🧭 Explain every forecast of",
+                ['—'] + predictor.targets,
+                help="Exact per-scenario feature contributions (SHAP values) of the selected target's model"
+            )
+            if explain_target != '—':
+                with st.spinner(f"🧭 Explaining {len(scenarios_df):,} forecasts..."):
+                    contributions, expected_value = predictor.explain(scenarios_df, explain_target)
+                
+                st.caption(
+                    f"Each row's contributions add up to its forecast minus the average prediction ({expected_value:,.2f})."
+                )
+                st.dataframe(contributions.head(100).round(2), use_container_width=True)
+                st.download_button(
+                    label="📥 Download Feature Contributions (CSV)",
+                    data=contributions.add_suffix('_contribution').to_csv(index=False),
+                    file_name=f"batch_contributions_{explain_target}.csv",
+                    mime="text/csv"
+                )
+        except Exception as e:
+            st.error(f"Batch prediction error: {str(e)}")
+
+    # Registry diagnostics (rendered last so it reflects models loaded during this run)
+    with st.sidebar:
+        with st.expander("⚙️ Model Registry", expanded=False):
+            registry_report = predictor.models.report()
+            st.dataframe(
+                registry_report[['target', 'algorithm', 'loaded', 'load_time_ms', 'resident_kb', 'hits']].round(1),
+                use_container_width=True,
+                hide_index=True
+            )
+            budget = predictor.models.memory_budget_bytes
+            budget_label = 'unlimited' if budget is None else f"{budget / (1024 * 1024):,.0f} MB"
+            st.caption(f"Memory budget: {budget_label}")
+        
+        with st.expander("🗃️ Prediction Cache", expanded=False):
+            cache = predictor.cache
+            cache_col1, cache_col2 = st.columns(2)
+            cache_col1.metric("Hits", f"{cache.stats['hits']:,}")
+            cache_col2.metric("Misses", f"{cache.stats['misses']:,}")
+            st.caption(f"{len(cache):,} cached predictions · hit rate {cache.hit_rate:.0%}")
 
 else:
     st.error("⚠️ Could not load required models and data files.")
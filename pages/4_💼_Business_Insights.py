@@ -7,6 +7,28 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sales_analytics import load_predictor
+from sales_analytics.config import PRODUCT_COLS
+from sales_analytics.data_store import get_store, load_sales
+from sales_analytics.forecasting import RecursiveForecaster
+from sales_analytics.ingestion import ensure_ingestion_worker
+from sales_analytics.inventory import N_PATHS, plan_inventory
+from sales_analytics.reconciliation import (historical_proportions, product_hierarchy, product_residuals,
+                                            reconcile_forecast)
+
+# Display names of the product columns
+PRODUCT_LABELS = {
+    'facecream': 'Face Cream',
+    'facewash': 'Face Wash',
+    'toothpaste': 'Toothpaste',
+    'bathingsoap': 'Bathing Soap',
+    'shampoo': 'Shampoo',
+    'moisturizer': 'Moisturizer',
+}
 
 # Page config
 st.set_page_config(page_title="Business Insights", page_icon="💼", layout="wide")
@@ -83,22 +105,35 @@ st.markdown("""
 
 # Load data
 @st.cache_data
-def load_data():
-    import os
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    parent_dir = os.path.dirname(current_dir)
-    csv_path = os.path.join(parent_dir, 'company_sales_data.csv')
-    df = pd.read_csv(csv_path)
-    df['profit_per_unit'] = df['total_profit'] / df['total_units']
-    df['month'] = df['month_number']
-    seasons = {1: 'Winter', 2: 'Winter', 3: 'Spring', 4: 'Spring', 5: 'Spring',
-               6: 'Summer', 7: 'Summer', 8: 'Summer', 9: 'Fall', 10: 'Fall',
-               11: 'Fall', 12: 'Winter'}
-    df['season'] = df['month_number'].map(seasons)
-    return df
+def load_data(data_version):
+    # Profit history for the charts, product units for the inventory simulation
+    return load_sales(['month_number', 'total_profit', 'total_units'] + PRODUCT_COLS)
+
+@st.cache_resource
+def load_models():
+    return load_predictor()
+
+@st.cache_data
+def simulate_inventory(model_version, data_version, lead_time, service_level):
+    # 12-month reconciled outlook plus bootstrapped forecast errors -> simulated demand paths
+    predictor = load_models()
+    history = load_data(data_version)
+    hierarchy = product_hierarchy()
+    residuals = product_residuals(predictor, history, hierarchy)
+    outlook = reconcile_forecast(
+        RecursiveForecaster(predictor).forecast(history, 12),
+        'mint_shrink',
+        hierarchy,
+        residuals,
+        historical_proportions(hierarchy, history[PRODUCT_COLS])
+    )
+    forecast = outlook[[f'{product}_units' for product in PRODUCT_COLS]].to_numpy()
+    return plan_inventory(forecast, residuals[:, hierarchy.n_aggregate:], history[PRODUCT_COLS],
+                          lead_time=lead_time, service_level=service_level)
 
 try:
-    df = load_data()
+    ensure_ingestion_worker()
+    df = load_data(get_store().version)
     
     # Executive Summary
     st.markdown("### 📊 Executive Summary")
@@ -208,15 +243,96 @@ try:
     </div>
     """, unsafe_allow_html=True)
     
-    # Business Impact
-    st.markdown("### 💰 Quantifiable Business Impact")
+    # Inventory Simulation
+    st.markdown("### 📦 Inventory Simulation")
     
-    impact_col1, impact_col2, impact_col3 = st.columns(3)
+    st.markdown(f"""
+    <div class="insight-card">
+        <h3>🎲 {N_PATHS:,} Simulated Demand Years</h3>
+        <p>
+            Each product's next 12 months are forecast by the deployed models, reconciled with the
+            total, and perturbed with resampled historical forecast errors. Reorder points and safety
+            stock are read off the simulated demand, and the stocking policy is replayed on every path.
+            It is compared with stocking from past sales alone.
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
     
-    # Calculate some metrics
+    sim_col1, sim_col2, sim_col3 = st.columns(3)
+    with sim_col1:
+        service_level = st.select_slider(
+            "Target availability",
+            options=[90, 95, 98, 99],
+            value=95,
+            format_func=lambda level: f"{level}%"
+        ) / 100
+    with sim_col2:
+        lead_time = st.slider("Replenishment lead time (months)", min_value=0, max_value=3, value=1)
+    with sim_col3:
+        carrying_cost = st.number_input(
+            "Carrying cost per unit per year ($)",
+            min_value=0.0,
+            max_value=100.0,
+            value=2.5,
+            step=0.5,
+            help="Storage, capital and shrinkage cost of holding one unit for a year"
+        )
+    
+    # Annual figures: the simulation covers one 12-month horizon
     avg_monthly_profit = df['total_profit'].mean()
     annual_profit = avg_monthly_profit * 12
-    potential_improvement = annual_profit * 0.15  # Assume 15% improvement
+    profit_per_unit = df['total_profit'].sum() / df['total_units'].sum()
+    
+    inventory_plan = None
+    try:
+        predictor = load_models()
+        predictor.refresh()
+        model_version = tuple(predictor.model_key(target) for target in predictor.targets)
+        inventory_plan, forecast_policy, baseline_policy = simulate_inventory(
+            model_version, get_store().version, lead_time, service_level
+        )
+    except Exception as e:
+        st.warning(f"Inventory simulation unavailable: {str(e)}")
+    
+    if inventory_plan is not None:
+        plan_display = pd.DataFrame({
+            'Product': [PRODUCT_LABELS[product] for product in inventory_plan.index],
+            'Reorder Point': inventory_plan['reorder_point'].round(0),
+            'Safety Stock': inventory_plan['safety_stock'].round(0),
+            'Stock-out Risk / Month': (inventory_plan['stockout_probability'] * 100).round(1).astype(str) + '%',
+            'Fill Rate': (inventory_plan['fill_rate'] * 100).round(1).astype(str) + '%',
+            'History-Only Stock-out Risk': (baseline_policy['stockout_probability'] * 100).round(1).astype(str) + '%',
+        })
+        st.dataframe(plan_display, use_container_width=True, hide_index=True)
+        
+        recovered_units = baseline_policy['lost_units'].sum() - forecast_policy['lost_units'].sum()
+        recovered_profit = recovered_units * profit_per_unit
+        forecast_carrying = forecast_policy['avg_on_hand'].sum() * carrying_cost
+        baseline_carrying = baseline_policy['avg_on_hand'].sum() * carrying_cost
+        carrying_change = forecast_carrying - baseline_carrying
+        potential_improvement = recovered_profit - carrying_change
+        carrying_change_pct = carrying_change / baseline_carrying * 100 if baseline_carrying else 0.0
+        carrying_change_display = f"{'+' if carrying_change >= 0 else '-'}${abs(carrying_change):,.0f}"
+        fill_rate = 1 - forecast_policy['lost_units'].sum() / forecast_policy['demand_units'].sum()
+        
+        st.caption(
+            f"📦 Forecast-driven stocking recovers {recovered_units:,.0f} units of lost sales a year "
+            f"(${recovered_profit:,.0f} profit at ${profit_per_unit:,.2f}/unit) and changes carrying cost by "
+            f"{carrying_change_display} ({carrying_change_pct:+.0f}%) versus stocking from past sales alone."
+        )
+    else:
+        potential_improvement = 0.0
+        recovered_profit = 0.0
+        fill_rate = None
+        carrying_change = 0.0
+        carrying_change_pct = 0.0
+    
+    st.markdown("---")
+    
+    # Business Impact
+    st.markdown("### 💰 Quantifiable Business Impact")
+    
+    impact_col1, impact_col2, impact_col3 = st.columns(3)
     
     with impact_col1:
         st.markdown(f"""
@@ -229,8 +345,8 @@ try:
     with impact_col2:
         st.markdown(f"""
         <div class="stat-highlight">
-            <h2>15-20%</h2>
-            <p>Potential Profit Increase</p>
+            <h2>{potential_improvement / annual_profit * 100:+.1f}%</h2>
+            <p>Simulated Profit Impact</p>
         </div>
         """, unsafe_allow_html=True)
     
@@ -238,7 +354,7 @@ try:
         st.markdown(f"""
         <div class="stat-highlight">
             <h2>${potential_improvement:,.0f}</h2>
-            <p>Expected Additional Revenue</p>
+            <p>Net Annual Impact (Simulated)</p>
         </div>
         """, unsafe_allow_html=True)
     
@@ -247,12 +363,25 @@ try:
     # Strategic Recommendations
     st.markdown("### 🎯 Strategic Recommendations")
     
-    st.markdown("""
+    if fill_rate is not None:
+        inventory_action = (
+            f"Set reorder points from the simulated demand above: a {service_level:.0%} availability target "
+            f"gives a {fill_rate:.1%} simulated fill rate with carrying cost {carrying_change_pct:+.0f}% "
+            f"versus stocking from past sales alone."
+        )
+        inventory_roi = (
+            f"${potential_improvement:,.0f} a year in simulation (${recovered_profit:,.0f} of profit from "
+            f"avoided stock-outs, {carrying_change_display} carrying cost)"
+        )
+    else:
+        inventory_action = "Use our predictive models to forecast demand 2-3 months ahead and set reorder points from it."
+        inventory_roi = "available once the inventory simulation can run"
+    
+    st.markdown(f"""
     <div class="recommendation-box">
         <h4>🔴 PRIORITY 1: Optimize Inventory Management</h4>
         <p style='color: white; line-height: 1.8;'>
-            <strong>Action:</strong> Use our predictive models to forecast demand 2-3 months ahead. 
-            Reduce inventory holding costs by 20-30% while maintaining 95%+ product availability.
+            <strong>Action:</strong> {inventory_action}
         </p>
         <p style='color: white; line-height: 1.8;'>
             <strong>Implementation:</strong>
@@ -264,7 +393,7 @@ try:
             <li>Monitor prediction accuracy and adjust seasonally</li>
         </ul>
         <p style='color: white;'>
-            <strong>Expected ROI:</strong> $50,000 - $100,000 annually in reduced carrying costs
+            <strong>Expected ROI:</strong> {inventory_roi}
         </p>
     </div>
     """, unsafe_allow_html=True)
@@ -368,27 +497,27 @@ try:
     outcome_col1, outcome_col2, outcome_col3 = st.columns(3)
     
     with outcome_col1:
-        st.markdown("""
+        st.markdown(f"""
         <div style='background: linear-gradient(135deg, #1a1a1a, #2a2a3a); padding: 1.5rem; 
                     border-radius: 10px; border: 2px solid #00ff88; height: 280px;'>
-            <h3 style='color: #00ff88; text-align: center;'>📈 Revenue Growth</h3>
+            <h3 style='color: #00ff88; text-align: center;'>📈 Profit Growth</h3>
             <p style='color: white; text-align: center; font-size: 3rem; font-weight: bold; 
-                      margin: 1rem 0;'>15-20%</p>
+                      margin: 1rem 0;'>{recovered_profit / annual_profit * 100:+.1f}%</p>
             <p style='color: white; text-align: center; line-height: 1.6;'>
-                Expected increase in annual revenue through optimized inventory and targeted marketing
+                Simulated increase in annual profit from sales no longer lost to stock-outs
             </p>
         </div>
         """, unsafe_allow_html=True)
     
     with outcome_col2:
-        st.markdown("""
+        st.markdown(f"""
         <div style='background: linear-gradient(135deg, #1a1a1a, #2a2a3a); padding: 1.5rem; 
                     border-radius: 10px; border: 2px solid #00f0ff; height: 280px;'>
-            <h3 style='color: #00f0ff; text-align: center;'>💰 Cost Savings</h3>
+            <h3 style='color: #00f0ff; text-align: center;'>💰 Carrying Cost</h3>
             <p style='color: white; text-align: center; font-size: 3rem; font-weight: bold; 
-                      margin: 1rem 0;'>25-30%</p>
+                      margin: 1rem 0;'>{carrying_change_pct:+.0f}%</p>
             <p style='color: white; text-align: center; line-height: 1.6;'>
-                Reduction in inventory carrying costs and waste through accurate demand forecasting
+                Simulated change in inventory carrying cost versus stocking from past sales alone
             </p>
         </div>
         """, unsafe_allow_html=True)
@@ -0,0 +1,23 @@
+"""
+🧠 Sales Analytics Engine
+Company Sales Data - Shared Forecasting Components
+"""
+
+from .cache import PredictionCache
+from .features import FEATURE_COLUMNS, build_feature_frame, build_feature_matrix, build_feature_row, engineer_features
+from .prediction import BatchPredictor, load_predictor
+from .registry import ModelRegistry
+from .rolling_state import RollingWindowStore
+
+__all__ = [
+    'FEATURE_COLUMNS',
+    'BatchPredictor',
+    'build_feature_frame',
+    'build_feature_matrix',
+    'build_feature_row',
+    'engineer_features',
+    'load_predictor',
+    'ModelRegistry',
+    'PredictionCache',
+    'RollingWindowStore',
+]
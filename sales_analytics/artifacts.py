@@ -0,0 +1,294 @@
+"""
+📦 Compact Model Artifacts
+Company Sales Data - Pickle-Free float32 Model & Scaler Format
+
+Run with:  python -m sales_analytics.artifacts [--models-dir trained_models]
+
+Exports the deployed models and scaler next to their joblib files and records them in
+`deployment_summary.json`. A compact artifact is one file:
+
+    b'SALESART' | uint32 format version | uint32 header length | JSON header | arrays
+
+The header names the artifact kind, its scalar attributes and the dtype/shape/offset of
+every array; arrays are stored raw and 64-byte aligned, so loading is a header parse
+plus one read-only memory map. Nothing is unpickled and no sklearn/XGBoost import is
+needed, so artifacts load the same under any library version.
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+from .config import MODELS_DIR
+from .tree_engine import CompiledTreeEnsemble, compile_model
+
+MAGIC = b'SALESART'
+FORMAT_VERSION = 1
+COMPACT_SUFFIX = '.bin'
+ALIGNMENT = 64
+
+
+class CompactModelError(ValueError):
+    """Raised for models that have no compact form and for unreadable artifact files."""
+
+
+def _check_columns(X, feature_names):
+    columns = getattr(X, 'columns', None)
+    if columns is not None and feature_names and list(columns) != list(feature_names):
+        raise ValueError(f"Feature columns {list(columns)} do not match the artifact's {feature_names}")
+
+
+class CompactScaler:
+    """StandardScaler.transform from stored mean/scale (computed in float64)."""
+
+    def __init__(self, mean, scale, feature_names=None):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.feature_names_in_ = feature_names
+        self.n_features_in_ = len(mean)
+
+    def transform(self, X):
+        _check_columns(X, self.feature_names_in_)
+        X = np.asarray(X, dtype=np.float64)
+        return (X - self.mean_) / self.scale_
+
+
+class CompactLinearModel:
+    """Linear regression: X @ coef + intercept (computed in float64)."""
+
+    def __init__(self, coef, intercept, feature_names=None):
+        self.coef_ = coef
+        self.intercept_ = float(intercept)
+        self.feature_names_in_ = feature_names
+        self.n_features_in_ = len(coef)
+
+    def predict(self, X):
+        _check_columns(X, self.feature_names_in_)
+        return np.asarray(X, dtype=np.float64) @ np.asarray(self.coef_, dtype=np.float64) + self.intercept_
+
+
+class CompactKernelSVR:
+    """RBF-kernel SVR: sum of dual_coef x exp(-gamma |x - sv|²) + intercept."""
+
+    def __init__(self, support_vectors, dual_coef, intercept, gamma, feature_names=None, chunk_size=4096):
+        self.support_vectors_ = support_vectors
+        self.dual_coef_ = dual_coef
+        self.intercept_ = float(intercept)
+        self.gamma = float(gamma)
+        self.feature_names_in_ = feature_names
+        self.n_features_in_ = support_vectors.shape[1]
+        self.chunk_size = chunk_size
+
+    def predict(self, X):
+        _check_columns(X, self.feature_names_in_)
+        X = np.asarray(X, dtype=np.float64)
+        sv = np.asarray(self.support_vectors_, dtype=np.float64)
+        coef = np.asarray(self.dual_coef_, dtype=np.float64)
+        sv_norms = (sv ** 2).sum(axis=1)
+        out = np.empty(len(X))
+        for start in range(0, len(X), self.chunk_size):
+            chunk = X[start:start + self.chunk_size]
+            distances = (chunk ** 2).sum(axis=1)[:, None] - 2 * chunk @ sv.T + sv_norms
+            out[start:start + self.chunk_size] = np.exp(-self.gamma * np.maximum(distances, 0)) @ coef
+        return out + self.intercept_
+
+
+def _feature_names(obj):
+    names = getattr(obj, 'feature_names_in_', None)
+    return None if names is None else [str(name) for name in names]
+
+
+def export_parts(obj):
+    """(kind, attributes, arrays) of a fitted scaler or model; CompactModelError if it has no compact form."""
+    names = _feature_names(obj)
+    name = type(obj).__name__
+
+    if name == 'StandardScaler' or isinstance(obj, CompactScaler):
+        scale = obj.scale_ if obj.scale_ is not None else np.ones(obj.n_features_in_)
+        mean = obj.mean_ if obj.mean_ is not None else np.zeros(obj.n_features_in_)
+        return 'scaler', {'feature_names': names}, {'mean': mean, 'scale': scale}
+
+    if hasattr(obj, 'coef_') and hasattr(obj, 'intercept_') and np.ndim(obj.coef_) == 1:
+        return 'linear', {'feature_names': names, 'intercept': float(obj.intercept_)}, {'coef': obj.coef_}
+
+    if name == 'SVR' or isinstance(obj, CompactKernelSVR):
+        if getattr(obj, 'kernel', 'rbf') != 'rbf':
+            raise CompactModelError(f"Only RBF-kernel SVR models have a compact form, not {obj.kernel!r}")
+        gamma = obj._gamma if hasattr(obj, '_gamma') else obj.gamma
+        return 'kernel_svr', {'feature_names': names, 'intercept': float(np.ravel(obj.intercept_)[0]),
+                              'gamma': float(gamma)}, {
+            'support_vectors': obj.support_vectors_, 'dual_coef': np.ravel(obj.dual_coef_)}
+
+    compiled = obj if isinstance(obj, CompiledTreeEnsemble) else compile_model(getattr(obj, 'native', obj))
+    if compiled is None:
+        raise CompactModelError(f"{name} has no compact artifact form")
+    attrs = {'feature_names': names or getattr(obj, 'feature_names_in_', None), 'n_trees': compiled.n_trees,
+             'depth': compiled.depth, 'n_features': compiled.n_features, 'aggregation': compiled.aggregation,
+             'base_score': float(compiled.base_score)}
+    arrays = {'feature': compiled.feature, 'threshold': compiled.threshold,
+              'default_left': compiled.default_left, 'value': compiled.value}
+    if compiled.cover is not None:
+        arrays['cover'] = compiled.cover
+    return 'tree_ensemble', attrs, arrays
+
+
+def _storage_dtype(array):
+    # Every real-valued array is stored as float32; indices and flags keep their type
+    array = np.asarray(array)
+    if np.issubdtype(array.dtype, np.floating):
+        return np.dtype('<f4')
+    return array.dtype.newbyteorder('<')
+
+
+def save(obj, path):
+    """Write `obj` as a compact artifact (atomically); returns the file size in bytes."""
+    kind, attrs, arrays = export_parts(obj)
+    entries = {}
+    blobs = []
+    offset = 0
+    for name, array in arrays.items():
+        data = np.ascontiguousarray(array, dtype=_storage_dtype(array))
+        entries[name] = {'dtype': data.dtype.str, 'shape': list(data.shape), 'offset': offset}
+        blobs.append((offset, data.tobytes()))
+        offset += -(-data.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header = json.dumps({'kind': kind, 'attrs': attrs, 'arrays': entries}).encode()
+    prefix = MAGIC + struct.pack('<II', FORMAT_VERSION, len(header)) + header
+    data_start = -(-len(prefix) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(prefix.ljust(data_start, b'\0'))
+        for array_offset, blob in blobs:
+            f.seek(data_start + array_offset)
+            f.write(blob)
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return data_start + offset
+
+
+def read(path):
+    """(kind, attributes, arrays) of a compact artifact; arrays are read-only memory maps."""
+    with open(path, 'rb') as f:
+        start = f.read(len(MAGIC) + 8)
+        if len(start) < len(MAGIC) + 8 or start[:len(MAGIC)] != MAGIC:
+            raise CompactModelError(f"{path} is not a compact model artifact")
+        version, header_length = struct.unpack('<II', start[len(MAGIC):])
+        if version > FORMAT_VERSION:
+            raise CompactModelError(f"{path} uses artifact format {version}; this build reads up to {FORMAT_VERSION}")
+        header = json.loads(f.read(header_length))
+
+    data_start = -(-(len(MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+    arrays = {}
+    if header['arrays']:
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        for name, entry in header['arrays'].items():
+            dtype = np.dtype(entry['dtype'])
+            start = data_start + entry['offset']
+            count = int(np.prod(entry['shape'], dtype=np.int64))
+            arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(entry['shape'])
+    return header['kind'], header['attrs'], arrays
+
+
+def load(path):
+    """Scaler or model object for a compact artifact."""
+    kind, attrs, arrays = read(path)
+    names = attrs.get('feature_names')
+    if kind == 'scaler':
+        return CompactScaler(arrays['mean'], arrays['scale'], names)
+    if kind == 'linear':
+        return CompactLinearModel(arrays['coef'], attrs['intercept'], names)
+    if kind == 'kernel_svr':
+        return CompactKernelSVR(arrays['support_vectors'], arrays['dual_coef'], attrs['intercept'], attrs['gamma'],
+                                names)
+    if kind == 'tree_ensemble':
+        # Stored values are float32; forests still average them in float64
+        model = CompiledTreeEnsemble(
+            arrays['feature'], arrays['threshold'], arrays['default_left'], arrays['value'],
+            attrs['n_trees'], attrs['depth'], attrs['n_features'], attrs['aggregation'],
+            base_score=attrs['base_score'], value_dtype=np.float32, cover=arrays.get('cover'),
+        )
+        model.feature_names_in_ = names
+        return model
+    raise CompactModelError(f"Unknown compact artifact kind {kind!r} in {path}")
+
+
+def compact_filename(filename):
+    """Compact artifact filename next to a joblib artifact of the same name."""
+    stem = filename[:-len('.joblib')] if filename.endswith('.joblib') else filename
+    return f'{stem}{COMPACT_SUFFIX}'
+
+
+def export_artifact(obj, models_dir, filename):
+    """Save the compact form of `obj` beside `filename`; returns its filename, or None without one."""
+    compact = compact_filename(os.path.basename(filename))
+    try:
+        save(obj, os.path.join(models_dir, compact))
+    except CompactModelError:
+        return None
+    directory = os.path.dirname(filename)
+    return f'{directory}/{compact}' if directory else compact
+
+
+def export_deployment(models_dir=MODELS_DIR):
+    """Export the deployment's scaler and models that lack a compact artifact.
+
+    Compact filenames are added to `deployment_summary.json`, which is replaced
+    atomically. Returns {artifact: compact filename or None when it has no compact form}.
+    """
+    import joblib
+
+    from .train import atomic_write_json
+
+    summary_path = os.path.join(models_dir, 'deployment_summary.json')
+    with open(summary_path, 'r') as f:
+        summary = json.load(f)
+
+    exported = {}
+    entries = [(summary, 'feature_scaler', 'feature_scaler_compact')]
+    entries += [(info, 'filename', 'compact_filename') for info in summary['best_models'].values()]
+    for entry, source_key, compact_key in entries:
+        existing = entry.get(compact_key)
+        if existing and os.path.exists(os.path.join(models_dir, os.path.basename(existing))):
+            continue
+        source = entry[source_key]
+        obj = joblib.load(os.path.join(models_dir, os.path.basename(source)))
+        entry[compact_key] = export_artifact(obj, models_dir, source)
+        exported[source] = entry[compact_key]
+
+    if exported:
+        atomic_write_json(summary, summary_path)
+    return exported
+
+
+def main(argv=None):
+    import warnings
+
+    parser = argparse.ArgumentParser(description='Export the deployed models and scaler as compact artifacts')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    args = parser.parse_args(argv)
+
+    # Legacy pickles warn about the sklearn version they were written with
+    warnings.filterwarnings('ignore')
+    exported = export_deployment(args.models_dir)
+    if not exported:
+        print('✅ Every deployed artifact already has a compact form')
+        return
+    for source, compact in exported.items():
+        if compact is None:
+            print(f'   {os.path.basename(source):<44} no compact form (stays joblib)')
+            continue
+        path = os.path.join(args.models_dir, os.path.basename(compact))
+        start = time.perf_counter()
+        load(path)
+        load_ms = (time.perf_counter() - start) * 1000
+        print(f'   {os.path.basename(source):<44} -> {os.path.basename(compact)} '
+              f'({os.path.getsize(path) / 1024:.1f} KB, loads in {load_ms:.2f} ms)')
+
+
+if __name__ == '__main__':
+    main()
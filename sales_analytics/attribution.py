@@ -0,0 +1,222 @@
+"""
+🧭 Prediction Attribution
+Company Sales Data - Exact Per-Prediction Feature Contributions
+
+Linear models are decomposed term by term; RF/XGB ensembles are explained with
+path-dependent TreeSHAP over their compiled node arrays. Either way the contributions
+of a row add up exactly to its prediction minus the explainer's `expected_value`.
+"""
+
+import math
+
+import numpy as np
+
+from .tree_engine import CompiledTreeEnsemble, compile_model
+
+# Rows x paths x depth evaluated per TreeSHAP block (bounds the working memory)
+TREE_SHAP_BLOCK = 1 << 21
+
+# Largest (one-fraction pattern, path, slot) table precomputed per explainer
+PATTERN_TABLE_SIZE = 1 << 22
+
+
+class LinearExplainer:
+    """Contributions coef_j * (x_j - background_j) of a linear model.
+
+    With `background` the mean of the training inputs (zeros for standardized inputs,
+    the default) `expected_value` is the model's mean training prediction.
+    """
+
+    def __init__(self, coef, intercept, background=None):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.background = np.zeros_like(self.coef) if background is None else np.asarray(background, np.float64)
+        self.expected_value = float(intercept) + float(self.coef @ self.background)
+
+    def shap_values(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.background) * self.coef
+
+
+class TreeExplainer:
+    """Path-dependent TreeSHAP for a CompiledTreeEnsemble.
+
+    Every leaf of the padded layout sits at the same depth D, so each root-to-leaf path
+    is a fixed-length record (features, directions, cover ratios). For a block of rows
+    the per-path Shapley weights are computed for all paths at once: the product
+    polynomial of (zero fraction + one fraction * t) over the path's distinct features
+    is built once and one factor divided back out per feature. Padding nodes send every
+    row left at full cover, which makes them null players and leaves values unchanged.
+    """
+
+    def __init__(self, compiled, block_size=TREE_SHAP_BLOCK):
+        if compiled.cover is None:
+            raise ValueError("TreeSHAP needs node covers; recompile or re-export the model")
+        self.compiled = compiled
+        self.block_size = block_size
+        self.n_features = compiled.n_features
+        self._build_paths()
+
+    def _build_paths(self):
+        c = self.compiled
+        depth, stride = c.depth, c.stride
+        first_leaf = (1 << depth) - 1
+        trees = np.repeat(np.arange(c.n_trees), 1 << depth)
+        slots = np.tile(np.arange(first_leaf, stride), c.n_trees)
+        leaves = trees * stride + slots
+        roots = trees * stride
+
+        # Only reachable leaves with a non-zero output contribute
+        scale = 1.0 / c.n_trees if c.aggregation == 'mean' else 1.0
+        value = c.value[leaves].astype(np.float64) * scale
+        keep = (c.cover[leaves] > 0) & (value != 0)
+        trees, slots, leaves, roots, value = trees[keep], slots[keep], leaves[keep], roots[keep], value[keep]
+
+        # Expected output: every leaf weighted by the share of training cover reaching it
+        root_cover = c.cover[roots].astype(np.float64)
+        self.expected_value = float(np.sum(value * c.cover[leaves] / root_cover))
+        if c.aggregation != 'mean':
+            self.expected_value += float(c.base_score)
+
+        n_paths = len(leaves)
+        nodes = np.empty((n_paths, depth), dtype=np.int64)
+        right = np.empty((n_paths, depth), dtype=bool)
+        ratio = np.empty((n_paths, depth))
+        child = slots
+        for level in range(depth - 1, -1, -1):
+            parent = (child - 1) // 2
+            nodes[:, level] = roots + parent
+            right[:, level] = child == 2 * parent + 2
+            ratio[:, level] = c.cover[roots + child] / c.cover[roots + parent].astype(np.float64)
+            child = parent
+
+        features = c.feature[nodes]
+        # Distinct-feature slot of every level: repeated features share their first level's slot
+        slot = np.tile(np.arange(depth), (n_paths, 1))
+        for level in range(1, depth):
+            for earlier in range(level - 1, -1, -1):
+                same = features[:, earlier] == features[:, level]
+                slot[same, level] = slot[same, earlier]
+
+        zero = np.ones((n_paths, depth))
+        for level in range(depth):
+            np.multiply.at(zero, (np.arange(n_paths), slot[:, level]), ratio[:, level])
+        # Slots no level maps to hold null players (one = zero = 1) on a dummy feature column
+        slot_feature = np.full((n_paths, depth), self.n_features)
+        for level in range(depth):
+            slot_feature[np.arange(n_paths), slot[:, level]] = features[:, level]
+
+        self.nodes, self.right, self.slot = nodes, right, slot
+        self.zero, self.slot_feature, self.value = zero, slot_feature, value
+        self.depth = depth
+        # Shapley weights s! (D - 1 - s)! / D! for coalitions of size s among the other D - 1 players
+        self.weights = np.array([math.factorial(s) * math.factorial(depth - 1 - s) / math.factorial(depth)
+                                 for s in range(depth)])
+        self._prepare()
+
+    def _one_fractions(self, X):
+        # (rows, paths, D) 1.0 where the row follows the path's direction at every level of that slot
+        c = self.compiled
+        x = X[:, c.feature[self.nodes]]
+        went_right = x > c.threshold[self.nodes]
+        missing = np.isnan(x)
+        if missing.any():
+            went_right = np.where(missing, ~c.default_left[self.nodes], went_right)
+        follows = went_right == self.right
+
+        one = np.ones(follows.shape[:2] + (self.depth,))
+        rows = np.arange(len(X))[:, None]
+        paths = np.arange(len(self.nodes))[None, :]
+        for level in range(self.depth):
+            one[rows, paths, self.slot[:, level]] *= follows[:, :, level]
+        return one
+
+    def _slot_contributions(self, one):
+        """(n, paths, D) contribution of every slot of every path, for one fractions `one` (n, paths, D)."""
+        depth = self.depth
+        zero = self.zero[None]
+
+        # Coefficients of prod_k (zero_k + one_k t), shape (D + 1, n, paths)
+        poly = np.zeros((depth + 1,) + one.shape[:2])
+        poly[0] = 1.0
+        for k in range(depth):
+            shifted = np.zeros_like(poly)
+            shifted[1:] = poly[:-1] * one[:, :, k]
+            poly = poly * zero[:, :, k] + shifted
+
+        contributions = np.empty(one.shape)
+        for k in range(depth):
+            o, z = one[:, :, k], zero[:, :, k]
+            # Divide the factor of slot k back out (synthetic division from the top when o = 1)
+            quotient = np.empty((depth,) + o.shape)
+            carry = poly[depth]
+            for s in range(depth - 1, -1, -1):
+                quotient[s] = np.where(o > 0, carry, poly[s] / z)
+                carry = poly[s] - z * quotient[s]
+            contributions[:, :, k] = (o - z) * np.tensordot(self.weights, quotient, axes=1) * self.value
+        return contributions
+
+    def _prepare(self):
+        from scipy import sparse
+
+        n_paths, depth = self.zero.shape
+        # Sums every (path, slot) contribution into its feature column (the dummy column is dropped)
+        self._scatter = sparse.csr_matrix(
+            (np.ones(n_paths * depth), (np.arange(n_paths * depth), self.slot_feature.ravel())),
+            shape=(n_paths * depth, self.n_features + 1),
+        )
+        # One fractions are 0/1, so with few enough (pattern, path) pairs every outcome is tabulated up front
+        self._table = None
+        if (1 << depth) * n_paths * depth <= PATTERN_TABLE_SIZE:
+            bits = (np.arange(1 << depth)[:, None] >> np.arange(depth)) & 1
+            patterns = np.broadcast_to(bits[:, None, :], (1 << depth, n_paths, depth)).astype(np.float64)
+            self._table = self._slot_contributions(patterns)
+            self._powers = 1 << np.arange(depth)
+
+    def _block(self, X):
+        one = self._one_fractions(X)
+        if self._table is not None:
+            codes = one.astype(np.int64) @ self._powers
+            contributions = self._table[codes, np.arange(len(self.nodes))]
+        else:
+            contributions = self._slot_contributions(one)
+        flat = contributions.reshape(len(X), -1)
+        return np.asarray((self._scatter.T @ flat.T).T)[:, :self.n_features]
+
+    def shap_values(self, X):
+        """(rows, features) contributions; each row sums to prediction - expected_value."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        rows_per_block = max(self.block_size // max(len(self.nodes) * self.depth, 1), 1)
+        return np.concatenate([self._block(X[start:start + rows_per_block])
+                               for start in range(0, max(len(X), 1), rows_per_block)])[:len(X)]
+
+
+def explainer_for(model):
+    """Exact explainer for a fitted (or compact/compiled) model; ValueError for models without one."""
+    compiled = getattr(model, 'compiled', None)
+    if isinstance(model, CompiledTreeEnsemble):
+        compiled = model
+    elif compiled is None and not hasattr(model, 'coef_'):
+        compiled = compile_model(model)
+    if compiled is not None:
+        return TreeExplainer(compiled)
+    coef = getattr(model, 'coef_', None)
+    if coef is not None and np.ndim(coef) == 1:
+        return LinearExplainer(coef, model.intercept_)
+    raise ValueError(f"No exact attribution for {type(model).__name__} models")
+
+
+def mean_abs_contributions(predictor, features, targets=None):
+    """Global importance: mean |contribution| of every feature per target over `features` rows.
+
+    Returns a (feature_columns x targets) frame; targets without an exact explainer are omitted.
+    """
+    import pandas as pd
+
+    targets = predictor.targets if targets is None else list(targets)
+    importances = {}
+    for target in targets:
+        try:
+            contributions, _ = predictor.explain_matrix(features, target)
+        except ValueError:
+            continue
+        importances[target] = contributions.abs().mean()
+    return pd.DataFrame(importances, index=predictor.feature_columns)
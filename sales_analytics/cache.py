@@ -0,0 +1,158 @@
+"""
+🗃️ Prediction Cache
+Company Sales Data - LRU/TTL Memoization of Model Outputs
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .config import PREDICTION_CACHE_PATH, PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_SECONDS
+
+CACHE_FORMAT_VERSION = 1
+
+# Minimum seconds between automatic writes of a persistent cache
+FLUSH_INTERVAL_SECONDS = 30
+
+
+def feature_row_keys(features):
+    """Stable digest of every canonical feature vector (one per row).
+
+    -0.0 and all NaN payloads are normalized first so equal scenarios always hash equally.
+    """
+    features = np.ascontiguousarray(np.asarray(features, dtype=np.float64) + 0.0)
+    features[np.isnan(features)] = np.nan
+    return [hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest() for row in features]
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of single predictions with a time-to-live.
+
+    Entries are keyed on (model key, feature digest), where the model key carries the
+    target, algorithm and artifact version, so redeploying a model never serves stale
+    values. With a `path` the cache is reloaded on start and written back periodically
+    and at interpreter exit.
+    """
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl_seconds=PREDICTION_CACHE_TTL_SECONDS,
+                 path=PREDICTION_CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_flush = time.time()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+        if path:
+            self.load()
+            atexit.register(self.flush)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_many(self, model_key, row_keys):
+        """Cached values for `row_keys` as (values, hit mask); misses are NaN."""
+        values = np.full(len(row_keys), np.nan)
+        hit = np.zeros(len(row_keys), dtype=bool)
+        now = time.time()
+
+        with self._lock:
+            for i, row_key in enumerate(row_keys):
+                key = (model_key, row_key)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires, value = entry
+                if expires < now:
+                    del self._entries[key]
+                    self.stats['expirations'] += 1
+                    continue
+                self._entries.move_to_end(key)
+                values[i] = value
+                hit[i] = True
+
+            n_hits = int(hit.sum())
+            self.stats['hits'] += n_hits
+            self.stats['misses'] += len(row_keys) - n_hits
+        return values, hit
+
+    def put_many(self, model_key, row_keys, values):
+        expires = time.time() + self.ttl_seconds
+        with self._lock:
+            for row_key, value in zip(row_keys, values):
+                key = (model_key, row_key)
+                self._entries[key] = (expires, float(value))
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+            self._dirty = True
+
+        if self.path and time.time() - self._last_flush > FLUSH_INTERVAL_SECONDS:
+            self.flush()
+
+    def invalidate(self, model_key=None):
+        """Drop every entry (or only those computed by `model_key`)."""
+        with self._lock:
+            if model_key is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [key for key in self._entries if key[0] == model_key]
+                for key in stale:
+                    del self._entries[key]
+                dropped = len(stale)
+            self._dirty = self._dirty or dropped > 0
+        return dropped
+
+    @property
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            # A corrupt cache file is just a cold cache
+            return
+        if payload.get('format_version') != CACHE_FORMAT_VERSION:
+            return
+
+        now = time.time()
+        with self._lock:
+            for model_key, row_key, expires, value in payload.get('entries', []):
+                if expires >= now:
+                    self._entries[(model_key, row_key)] = (expires, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def flush(self):
+        """Write the cache to `path` if it changed since the last write."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = [[model_key, row_key, expires, value]
+                       for (model_key, row_key), (expires, value) in self._entries.items()]
+            self._dirty = False
+            self._last_flush = time.time()
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'format_version': CACHE_FORMAT_VERSION, 'entries': entries}, f)
+        os.replace(tmp_path, self.path)
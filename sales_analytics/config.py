@@ -0,0 +1,62 @@
+"""
+⚙️ Project Configuration
+Company Sales Data - Shared Paths & Constants
+"""
+
+import os
+
+# Project layout
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(BASE_DIR, 'trained_models')
+DATA_PATH = os.path.join(BASE_DIR, 'company_sales_data.csv')
+
+# Product categories in the order they appear in the CSV
+PRODUCT_COLS = ['facecream', 'facewash', 'toothpaste', 'bathingsoap', 'shampoo', 'moisturizer']
+
+# Algorithms that were fitted on StandardScaler output in the model building notebook.
+# Tree ensembles (RF, XGB) were fitted on the raw feature values.
+SCALED_ALGORITHMS = {'LR', 'SVR', 'LSTM'}
+
+# Resident-size budget for lazily loaded models (MB); least recently used models are evicted beyond it
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get('SALES_MODEL_MEMORY_BUDGET_MB', 256))
+
+# Batches up to this many rows use the compiled tree-ensemble path; larger ones use native predict
+COMPILED_MAX_BATCH = int(os.environ.get('SALES_COMPILED_MAX_BATCH', 1024))
+
+# Threads used to fan one scaled feature matrix out to the per-target models (0 = one per target)
+PREDICTION_WORKERS = int(os.environ.get('SALES_PREDICTION_WORKERS', 0))
+
+# HTTP prediction service
+SERVER_HOST = os.environ.get('SALES_SERVER_HOST', '127.0.0.1')
+SERVER_PORT = int(os.environ.get('SALES_SERVER_PORT', 8600))
+# Concurrent requests arriving within this window are scored in one vectorized call
+SERVER_BATCH_WINDOW_MS = float(os.environ.get('SALES_SERVER_BATCH_WINDOW_MS', 5))
+SERVER_MAX_BATCH = int(os.environ.get('SALES_SERVER_MAX_BATCH', 1024))
+
+# Prediction cache shared by every session of a process; set SALES_PREDICTION_CACHE_PATH to persist it
+PREDICTION_CACHE_SIZE = int(os.environ.get('SALES_PREDICTION_CACHE_SIZE', 100_000))
+PREDICTION_CACHE_TTL_SECONDS = float(os.environ.get('SALES_PREDICTION_CACHE_TTL_SECONDS', 24 * 3600))
+PREDICTION_CACHE_PATH = os.environ.get('SALES_PREDICTION_CACHE_PATH') or None
+
+# Partitioned Parquet copy of the sales history (rebuilt from DATA_PATH when the CSV changes)
+DATA_STORE_DIR = os.environ.get('SALES_DATA_STORE_DIR', os.path.join(BASE_DIR, 'data_store'))
+
+# Drop directory tailed by the ingestion pipeline for new sales actuals (*.csv, *.jsonl)
+INGEST_DIR = os.environ.get('SALES_INGEST_DIR', os.path.join(BASE_DIR, 'incoming'))
+INGEST_POLL_SECONDS = float(os.environ.get('SALES_INGEST_POLL_SECONDS', 5))
+# Run the ingestion poller inside the dashboard process as well
+INGEST_IN_APP = os.environ.get('SALES_INGEST_IN_APP', '1') not in ('0', 'false', 'False')
+
+# Nominal plot width used to size downsampled chart payloads
+CHART_WIDTH_PX = int(os.environ.get('SALES_CHART_WIDTH_PX', 1200))
+
+# Processes used by the retraining CLI for the algorithm x target grid (0 = one per CPU)
+TRAINING_WORKERS = int(os.environ.get('SALES_TRAINING_WORKERS', 0))
+
+# Seconds between checks for newly published model versions in long-running services
+MODEL_REFRESH_SECONDS = float(os.environ.get('SALES_MODEL_REFRESH_SECONDS', 30))
+
+# Content-addressed cache of engineered/scaled feature matrices shared by training, CV and the pages
+FEATURE_CACHE_DIR = os.environ.get('SALES_FEATURE_CACHE_DIR', os.path.join(BASE_DIR, 'feature_cache'))
+# Cached data versions kept on disk (least recently used beyond this are removed)
+FEATURE_CACHE_ENTRIES = int(os.environ.get('SALES_FEATURE_CACHE_ENTRIES', 4))
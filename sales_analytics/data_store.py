@@ -0,0 +1,548 @@
+"""
+🗄️ Sales Data Store
+Company Sales Data - Partitioned Parquet Access Layer
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # pragma: no cover - CSV fallback below
+    pa = None
+    ds = None
+
+from .config import DATA_PATH, DATA_STORE_DIR, PRODUCT_COLS
+from .rollups import RollupCube
+
+# Source schema of the sales history
+SALES_COLUMNS = ['month_number'] + PRODUCT_COLS + ['total_units', 'total_profit']
+
+# Hive partition keys, outermost first; only those present in the data are used
+PARTITION_KEYS = ['year', 'store', 'month_number']
+
+# Position of every row in arrival order, assigned by the store on append
+SEQUENCE_COLUMN = 'ingest_seq'
+
+# Columns that order the history in time (rows are returned sorted by them); rows of the
+# same period keep their arrival order
+TIME_KEYS = ['year', 'month_number', 'date', 'day', SEQUENCE_COLUMN]
+
+# Period column derived for histories that carry neither a year nor a date
+PERIOD_COLUMN = 'year'
+
+# Bumped when the stored columns change; stores of an older layout are rebuilt from the source
+STORE_LAYOUT = 2
+
+MANIFEST = '_manifest.json'
+ROLLUPS = '_rollups.npz'
+
+# Rows per Parquet row group (the unit of predicate pushdown within a file)
+ROW_GROUP_SIZE = 128 * 1024
+
+_FILTER_OPS = {
+    '==': lambda field, value: field == value,
+    '=': lambda field, value: field == value,
+    '!=': lambda field, value: field != value,
+    '<': lambda field, value: field < value,
+    '<=': lambda field, value: field <= value,
+    '>': lambda field, value: field > value,
+    '>=': lambda field, value: field >= value,
+    'in': lambda field, value: field.isin(list(value)),
+    'not in': lambda field, value: ~field.isin(list(value)),
+}
+
+
+class SourceConflictError(ValueError):
+    """Raised when rows of the source CSV that are already in the store were edited or removed."""
+
+
+def _validate(sales_df):
+    missing = [col for col in SALES_COLUMNS if col not in sales_df.columns]
+    if missing:
+        raise ValueError(f"Sales data is missing required columns: {missing}")
+
+
+def derived_columns(columns):
+    """Columns the store adds to rows with the given source columns."""
+    period = [] if PERIOD_COLUMN in columns or 'date' in columns else [PERIOD_COLUMN]
+    return period + [SEQUENCE_COLUMN]
+
+
+def assign_periods(sales_df, last_periods=None):
+    """Copy of `sales_df` (rows in arrival order) with a `year` period counted on from `last_periods`.
+
+    The sales schema only carries `month_number`, so each series (one per `store` when
+    present) starts a new year whenever a month does not come after the one before it.
+    `last_periods` maps series -> [year, month_number] of its latest stored row; years
+    start at 1. Returns (frame, updated last_periods).
+    """
+    df = sales_df.copy()
+    last_periods = dict(last_periods or {})
+    series = df['store'].astype(str) if 'store' in df.columns else pd.Series('', index=df.index)
+    month = df['month_number'].astype(np.int64)
+
+    # A month 13 sentinel makes a new series' first row open year 1
+    start = [last_periods.get(key, [0, 13]) for key in series]
+    start_year = pd.Series([year for year, _ in start], index=df.index)
+    previous = month.groupby(series, sort=False).shift(1)
+    previous = previous.fillna(pd.Series([prior for _, prior in start], index=df.index))
+    wraps = (month <= previous).astype(np.int64)
+    df[PERIOD_COLUMN] = start_year + wraps.groupby(series, sort=False).cumsum()
+
+    latest = df.assign(_series=series).groupby('_series', sort=False).tail(1)
+    for key, year, last_month in zip(latest['_series'], latest[PERIOD_COLUMN], latest['month_number']):
+        last_periods[key] = [int(year), int(last_month)]
+    return df, last_periods
+
+
+def _filter_expression(filters):
+    """pandas/pyarrow style [(column, op, value), ...] filters -> dataset expression (AND)."""
+    expression = None
+    for column, op, value in filters or []:
+        if op not in _FILTER_OPS:
+            raise ValueError(f"Unsupported filter operator: {op!r}")
+        term = _FILTER_OPS[op](ds.field(column), value)
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def _filter_frame(df, filters):
+    # Same filters evaluated in pandas (CSV fallback)
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters or []:
+        if op not in _FILTER_OPS:
+            raise ValueError(f"Unsupported filter operator: {op!r}")
+        mask &= _FILTER_OPS[op](df[column], value)
+    return df[mask]
+
+
+class SalesDataStore:
+    """Columnar, partitioned copy of the sales history.
+
+    Rows are written as Parquet files under hive-style `year=/store=/month_number=`
+    directories (whichever keys the data has). Product and total columns are stored
+    as separate Parquet columns, so `read()` only decodes the requested columns and
+    skips partitions and row groups excluded by `filters`. Histories without a year or
+    date get a derived `year` period (see `assign_periods`), so months appended after a
+    December open a new year instead of folding into the first one. Every row also gets
+    its `ingest_seq` position in arrival order, which never repeats or goes backwards.
+
+    Without pyarrow the store degrades to reading the source CSV with pandas.
+    """
+
+    def __init__(self, root=DATA_STORE_DIR, source=DATA_PATH):
+        self.root = root
+        self.source = source
+        self._lock = threading.Lock()
+        # Serializes source syncs and layout migrations (which append through `_lock`)
+        self._sync_lock = threading.Lock()
+
+    @property
+    def available(self):
+        return ds is not None
+
+    # ---- writing ---------------------------------------------------------
+
+    def _partition_keys(self, columns):
+        return [key for key in PARTITION_KEYS if key in columns]
+
+    def _manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        path = os.path.join(self.root, MANIFEST)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _source_signature(self):
+        stat = os.stat(self.source)
+        return {'path': os.path.abspath(self.source), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+    def append(self, sales_df):
+        """Write new rows as an additional fragment in their partitions."""
+        self._append(sales_df)
+
+    def _append(self, sales_df, **manifest_fields):
+        # `manifest_fields` are recorded in the same manifest write as the rows
+        _validate(sales_df)
+        if not self.available:
+            raise RuntimeError("pyarrow is required to write to the sales data store")
+
+        with self._lock:
+            manifest = self._manifest() or self._new_manifest(sales_df.columns)
+            manifest.update(manifest_fields)
+            keys = manifest['partition_keys']
+            if PERIOD_COLUMN in manifest.get('derived', []):
+                sales_df, manifest['last_periods'] = assign_periods(sales_df, manifest.get('last_periods'))
+            sales_df = sales_df.reset_index(drop=True)
+            sales_df[SEQUENCE_COLUMN] = np.arange(manifest['rows'], manifest['rows'] + len(sales_df), dtype=np.int64)
+            table = pa.Table.from_pandas(sales_df.reset_index(drop=True), preserve_index=False)
+            if 'schema' in manifest:
+                # Later fragments must match the first one's column types
+                if set(table.column_names) != set(manifest['columns']):
+                    raise ValueError(
+                        f"Columns {sorted(table.column_names)} do not match the store's {manifest['columns']}"
+                    )
+                table = table.select(list(manifest['schema'])).cast(pa.schema([
+                    (name, pa.type_for_alias(dtype)) for name, dtype in manifest['schema'].items()
+                ]))
+            else:
+                manifest['schema'] = {field.name: str(field.type) for field in table.schema}
+            # Contiguous partitions give one large row group per file instead of one per input batch
+            order = keys + [key for key in TIME_KEYS if key in table.column_names and key not in keys]
+            if order:
+                table = table.sort_by([(key, 'ascending') for key in order])
+            ds.write_dataset(
+                table,
+                self.root,
+                format='parquet',
+                partitioning=keys,
+                partitioning_flavor='hive',
+                # Unique per write so appends never overwrite earlier fragments
+                basename_template=f'part-{time.time_ns():x}-{{i}}.parquet',
+                existing_data_behavior='overwrite_or_ignore',
+                min_rows_per_group=ROW_GROUP_SIZE,
+                max_rows_per_group=ROW_GROUP_SIZE,
+            )
+            # Keep the materialized rollups in step with the rows just written
+            rollups_path = os.path.join(self.root, ROLLUPS)
+            cube = RollupCube.load(rollups_path) if os.path.exists(rollups_path) else RollupCube()
+            cube.update(sales_df).save(rollups_path)
+
+            manifest['rows'] += len(sales_df)
+            manifest['columns'] = sorted(set(manifest.get('columns', [])) | set(sales_df.columns))
+            manifest['updated'] = time.time()
+            # Unique per write; readers key their caches on it
+            manifest['version'] = f'{time.time_ns():x}'
+            self._write_manifest(manifest)
+
+    def _new_manifest(self, columns):
+        derived = derived_columns(columns)
+        return {'layout': STORE_LAYOUT, 'partition_keys': self._partition_keys(list(columns) + derived),
+                'derived': derived, 'rows': 0}
+
+    def rebuild(self, sales_df=None):
+        """Replace the store contents with `sales_df` (default: the source CSV).
+
+        Every stored row goes, ingested ones included; `ensure_current` only builds
+        stores that do not exist yet.
+        """
+        from_source = sales_df is None
+        if from_source:
+            sales_df = pd.read_csv(self.source)
+        _validate(sales_df)
+
+        with self._lock:
+            if os.path.isdir(self.root):
+                shutil.rmtree(self.root)
+            os.makedirs(self.root)
+            manifest = self._new_manifest(sales_df.columns)
+            if from_source:
+                # Rows of the CSV held by the store; later CSV rows are appended by `ensure_current`
+                manifest['source'] = self._source_signature()
+                manifest['source_rows'] = len(sales_df)
+            self._write_manifest(manifest)
+        self.append(sales_df)
+
+    def ensure_current(self):
+        """Build the store from the source CSV when it is missing, and bring it up to date.
+
+        A store of an older layout is rewritten in the current one with all of its rows.
+        Rows added to the end of the CSV are appended; rows already stored, including
+        everything appended by ingestion, are never dropped. Returns True when the store
+        was written to.
+        """
+        if not self.available:
+            return False
+        manifest = self._manifest()
+        if manifest is None:
+            self.rebuild()
+            return True
+
+        changed = False
+        if manifest.get('layout', 1) < STORE_LAYOUT:
+            self._migrate()
+            manifest = self._manifest()
+            changed = True
+        if 'source' in manifest and os.path.exists(self.source) and manifest['source'] != self._source_signature():
+            changed = self._sync_source() or changed
+        return changed
+
+    def _sync_source(self):
+        """Append the rows added to the source CSV since it was last read.
+
+        A touched or re-saved CSV with the same rows only updates the recorded signature.
+        SourceConflictError when rows the store already holds differ from the CSV.
+        """
+        with self._sync_lock:
+            manifest = self._manifest()
+            signature = self._source_signature()
+            if manifest['source'] == signature:
+                return False
+
+            source = pd.read_csv(self.source)
+            # Stores built before `source_rows` was recorded held exactly the CSV's rows then
+            known = manifest.get('source_rows', len(source))
+            derived = manifest.get('derived', [])
+            stored_columns = [col for col in manifest.get('columns', []) if col not in derived]
+            if known > len(source) or sorted(source.columns) != sorted(stored_columns):
+                raise SourceConflictError(
+                    f"{self.source} no longer holds the {known} rows the data store was built from; "
+                    f"rebuild the store explicitly (SalesDataStore.rebuild) to replace its contents"
+                )
+            stored = self._scan(list(source.columns) + [SEQUENCE_COLUMN], [(SEQUENCE_COLUMN, '<', known)])
+            stored = stored.sort_values(SEQUENCE_COLUMN, kind='stable').drop(columns=SEQUENCE_COLUMN)
+            try:
+                pd.testing.assert_frame_equal(stored.reset_index(drop=True), source.iloc[:known].reset_index(drop=True),
+                                              check_dtype=False, check_like=True)
+            except AssertionError:
+                raise SourceConflictError(
+                    f"Rows of {self.source} already in the data store were edited or removed; "
+                    f"rebuild the store explicitly (SalesDataStore.rebuild) to replace its contents"
+                ) from None
+
+            if known < len(source):
+                self._append(source.iloc[known:], source=signature, source_rows=len(source))
+                return True
+            with self._lock:
+                manifest = self._manifest()
+                manifest['source'] = signature
+                self._write_manifest(manifest)
+            return False
+
+    def _stored_rows(self, manifest):
+        # Every stored row in arrival order, without the columns the store derives
+        dataset = self._dataset()
+        if SEQUENCE_COLUMN in dataset.schema.names:
+            df = dataset.to_table().to_pandas().sort_values(SEQUENCE_COLUMN, kind='stable')
+        else:
+            # Older layouts have no sequence; file names carry their write time (part-<ns hex>-<i>)
+            writes = {}
+            for fragment in dataset.get_fragments():
+                written = os.path.basename(fragment.path).split('-')[1]
+                writes.setdefault(written, []).append(fragment.to_table(schema=dataset.schema).to_pandas())
+            df = pd.concat([self._order(pd.concat(frames), None) for _, frames in sorted(writes.items())])
+        derived = set(manifest.get('derived', [])) | {SEQUENCE_COLUMN}
+        df = df.drop(columns=[col for col in df.columns if col in derived])
+        # Partition columns come back with the types pyarrow inferred from the directory names
+        types = {name: pa.type_for_alias(dtype).to_pandas_dtype()
+                 for name, dtype in manifest.get('schema', {}).items() if name in df.columns}
+        return df.astype(types).reset_index(drop=True)
+
+    def _migrate(self):
+        """Rewrite an older-layout store in the current layout, keeping every stored row.
+
+        The new store is built beside the old one and swapped in, so an interrupted
+        migration leaves the old store in place.
+        """
+        with self._sync_lock:
+            manifest = self._manifest()
+            if manifest.get('layout', 1) >= STORE_LAYOUT:
+                return
+            staging = SalesDataStore(f'{self.root}.migrating', self.source)
+            staging.rebuild(self._stored_rows(manifest))
+            staged = staging._manifest()
+            for key in ('source', 'source_rows'):
+                if key in manifest:
+                    staged[key] = manifest[key]
+            staging._write_manifest(staged)
+
+            retired = f'{self.root}.retired'
+            with self._lock:
+                if os.path.isdir(retired):
+                    shutil.rmtree(retired)
+                os.replace(self.root, retired)
+                os.replace(staging.root, self.root)
+            shutil.rmtree(retired)
+
+    def schema(self):
+        """Column -> Arrow type name of the rows the store accepts (None before the first write).
+
+        Columns the store derives itself are not part of it.
+        """
+        if not self.available:
+            return None
+        self.ensure_current()
+        manifest = self._manifest()
+        if 'schema' not in manifest:
+            return None
+        derived = manifest.get('derived', [])
+        return {name: dtype for name, dtype in manifest['schema'].items() if name not in derived}
+
+    @property
+    def version(self):
+        """Token that changes on every write (CSV rebuild or append)."""
+        if not self.available:
+            stat = os.stat(self.source)
+            return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        self.ensure_current()
+        return self._manifest().get('version', '0')
+
+    # ---- reading ---------------------------------------------------------
+
+    def read(self, columns=None, filters=None):
+        """Sales rows in time order, restricted to `columns` and `filters`.
+
+        `filters` is a list of (column, op, value) tuples combined with AND, with op one
+        of ==, !=, <, <=, >, >=, in, not in (the pandas `read_parquet` convention).
+        """
+        if not self.available:
+            wanted = None if columns is None else set(columns) | set(TIME_KEYS) | {f[0] for f in filters or []}
+            return self._order(_filter_frame(self._read_source(wanted), filters), columns)
+
+        self.ensure_current()
+        return self._scan(columns, filters)
+
+    def _scan(self, columns=None, filters=None):
+        # `read` over the stored files as they are
+        dataset = self._dataset()
+        names = dataset.schema.names
+        projection = None
+        if columns is not None:
+            unknown = [col for col in columns if col not in names]
+            if unknown:
+                raise ValueError(f"Unknown sales data columns: {unknown}")
+            # Time keys ride along so rows can be put back in order
+            projection = list(dict.fromkeys(list(columns) + [key for key in TIME_KEYS if key in names]))
+
+        table = dataset.to_table(columns=projection, filter=_filter_expression(filters))
+        return self._order(table.to_pandas(), columns)
+
+    def _read_source(self, wanted=None):
+        # CSV fallback: derive the same columns the store would have written
+        usecols = None if wanted is None else (lambda col: col in wanted or col == 'store')
+        df = pd.read_csv(self.source, usecols=usecols)
+        if PERIOD_COLUMN in derived_columns(df.columns):
+            df, _ = assign_periods(df)
+        df[SEQUENCE_COLUMN] = np.arange(len(df), dtype=np.int64)
+        return df
+
+    def _order(self, df, columns):
+        order = [key for key in TIME_KEYS if key in df.columns]
+        if 'store' in df.columns:
+            order.insert(0, 'store')
+        if order:
+            df = df.sort_values(order, kind='stable')
+        df = df.reset_index(drop=True)
+        if columns is not None:
+            df = df[list(columns)]
+        return df
+
+    def tail(self, n, columns=None):
+        """Most recent `n` rows of history, reading only the partitions that hold them.
+
+        The ordering keys are read first to find the last `n` rows' sequence numbers;
+        only those rows are then decoded in full.
+        """
+        names = self.columns()
+        if not self.available or SEQUENCE_COLUMN not in names:
+            return self.read(columns).tail(n).reset_index(drop=True)
+
+        keys = [key for key in TIME_KEYS if key in names]
+        latest = self.read(keys).tail(n)
+        if latest.empty:
+            return self.read(columns).head(0)
+        filters = [(SEQUENCE_COLUMN, 'in', latest[SEQUENCE_COLUMN].tolist())]
+        if 'year' in keys:
+            # Whole years before the cutoff are skipped without opening their files
+            filters.append(('year', '>=', int(latest['year'].min())))
+        recent = self.read(None if columns is None else list(dict.fromkeys(list(columns) + keys)), filters)
+        return recent.reset_index(drop=True) if columns is None else recent[list(columns)]
+
+    def iter_batches(self, columns=None, filters=None, batch_size=ROW_GROUP_SIZE):
+        """Rows as DataFrames of at most `batch_size` rows, in storage order.
+
+        Unlike `read()` the history is never held in memory at once, which suits
+        order-independent reductions over data larger than RAM.
+        """
+        if not self.available:
+            wanted = None if columns is None else set(columns) | {f[0] for f in filters or []}
+            usecols = None if wanted is None else (lambda col: col in wanted)
+            for chunk in pd.read_csv(self.source, usecols=usecols, chunksize=batch_size):
+                chunk = _filter_frame(chunk, filters)
+                yield chunk if columns is None else chunk[list(columns)]
+            return
+
+        self.ensure_current()
+        for batch in self._dataset().to_batches(columns=columns, filter=_filter_expression(filters),
+                                                batch_size=batch_size):
+            yield batch.to_pandas()
+
+    def iter_partitions(self, columns=None, filters=None, batch_size=ROW_GROUP_SIZE):
+        """One lazy batch iterator per stored file (skipping pruned partitions), for parallel scans."""
+        if not self.available:
+            return [self.iter_batches(columns, filters, batch_size)]
+
+        self.ensure_current()
+        dataset = self._dataset()
+        expression = _filter_expression(filters)
+
+        def batches(fragment):
+            for batch in fragment.to_batches(schema=dataset.schema, columns=columns, filter=expression,
+                                             batch_size=batch_size):
+                yield batch.to_pandas()
+
+        return [batches(fragment) for fragment in dataset.get_fragments(filter=expression)]
+
+    def row_count(self):
+        """Number of stored rows (from the manifest, without reading any data)."""
+        if not self.available:
+            return len(pd.read_csv(self.source, usecols=[0]))
+        self.ensure_current()
+        return int(self._manifest().get('rows', 0))
+
+    def rollups(self):
+        """Materialized per-month rollup cube of the whole history."""
+        if not self.available:
+            return RollupCube.from_frame(self._read_source())
+        self.ensure_current()
+        rollups_path = os.path.join(self.root, ROLLUPS)
+        if not os.path.exists(rollups_path):
+            with self._lock:
+                RollupCube.from_frame(self.read()).save(rollups_path)
+        return RollupCube.load(rollups_path)
+
+    def columns(self):
+        if not self.available:
+            return list(pd.read_csv(self.source, nrows=0).columns)
+        self.ensure_current()
+        return self._dataset().schema.names
+
+    def _dataset(self):
+        # Files starting with '_' or '.' (the manifest) are ignored by pyarrow
+        return ds.dataset(self.root, format='parquet', partitioning='hive')
+
+
+_default_store = None
+
+
+def get_store():
+    """Process-wide store over the project's sales history."""
+    global _default_store
+    if _default_store is None:
+        _default_store = SalesDataStore()
+    return _default_store
+
+
+def load_sales(columns=None, filters=None):
+    """Read the sales history through the default store (column projection + filter pushdown)."""
+    return get_store().read(columns, filters)
+
+
+def load_rollups():
+    """Rollup cube over the default store's history."""
+    return get_store().rollups()
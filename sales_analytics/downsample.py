@@ -0,0 +1,116 @@
+"""
+📉 Chart Downsampling
+Company Sales Data - Bounded Time-Series Payloads for Plotly
+"""
+
+import numpy as np
+
+from .config import CHART_WIDTH_PX
+
+# Points kept per horizontal pixel; ~2 preserves every visible extreme
+POINTS_PER_PIXEL = 2
+
+
+def point_budget(width_px=CHART_WIDTH_PX, points_per_pixel=POINTS_PER_PIXEL):
+    return max(int(width_px * points_per_pixel), 3)
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets selection of `n_out` points (indices, ascending).
+
+    Keeps the first and last points and, from each of the `n_out - 2` buckets in between,
+    the point forming the largest triangle with the previously kept point and the
+    average of the next bucket, which preserves the visual shape of the line.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    n_out = max(n_out, 3)
+
+    # Integer bucket edges: truncated float steps can land one index short of an exact boundary
+    edges = 1 + np.arange(n_out - 1) * (n - 2) // (n_out - 2)
+    # Average point of every bucket (the last "next bucket" is the final point itself)
+    bucket_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+    bucket_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+    next_x = np.append(bucket_x[1:], x[-1])
+    next_y = np.append(bucket_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y[i] - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """Indices of the minimum and maximum of each of `(n_out - 2) // 2` equal buckets (ascending)."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+
+    # Two points per bucket plus both endpoints stays within n_out
+    n_buckets = max((n_out - 2) // 2, 1)
+    edges = np.arange(n_buckets + 1) * n // n_buckets
+    starts, counts = edges[:-1], np.diff(edges)
+    starts, counts = starts[counts > 0], counts[counts > 0]
+
+    # Position of the min/max inside each bucket via a padded (buckets, max_len) view
+    width = counts.max()
+    offsets = np.arange(width)
+    index = np.minimum(starts[:, None] + offsets, n - 1)
+    values = y[index]
+    valid = offsets < counts[:, None]
+    lows = np.where(valid, values, np.inf).argmin(axis=1)
+    highs = np.where(valid, values, -np.inf).argmax(axis=1)
+
+    selected = np.concatenate([starts + lows, starts + highs, [0, n - 1]])
+    return np.unique(selected)
+
+
+def downsample(x, y, n_out, method='lttb'):
+    """(x, y) reduced to at most `n_out` points; NaN samples are dropped first."""
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    keep = ~np.isnan(y)
+    if not keep.all():
+        x, y = x[keep], y[keep]
+
+    if method == 'lttb':
+        # LTTB needs a numeric x axis; datetimes are measured in their integer ticks
+        numeric_x = x.astype('datetime64[ns]').astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x
+        index = lttb_indices(numeric_x, y, n_out)
+    elif method == 'minmax':
+        index = minmax_indices(y, n_out)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method!r} (expected 'lttb' or 'minmax')")
+    return x[index], y[index]
+
+
+def downsample_frame(df, x_col, y_cols, n_out, method='lttb', x_range=None):
+    """Per-column downsampled series of `df`, optionally restricted to an x window first.
+
+    Zooming in (a narrower `x_range`) spends the same point budget on fewer rows, so
+    detail is recovered at every zoom level while the payload stays bounded.
+    """
+    x = df[x_col].to_numpy()
+    mask = None
+    if x_range is not None:
+        low, high = x_range
+        mask = (x >= low) & (x <= high)
+        x = x[mask]
+
+    series = {}
+    for col in y_cols:
+        y = df[col].to_numpy(dtype=np.float64)
+        series[col] = downsample(x, y if mask is None else y[mask], n_out, method)
+    return series
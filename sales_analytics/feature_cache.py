@@ -0,0 +1,235 @@
+"""
+💾 Feature-Matrix Cache
+Company Sales Data - Content-Addressed, Memory-Mapped Feature Matrices
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from .config import FEATURE_CACHE_DIR, FEATURE_CACHE_ENTRIES, PRODUCT_COLS
+from .data_store import SALES_COLUMNS, get_store
+from .features import FEATURE_COLUMNS, FEATURE_PIPELINE_VERSION, engineer_features
+
+# Columns kept alongside the features so training reads its labels from the same entry
+TARGET_COLUMNS = ['total_units', 'total_profit'] + PRODUCT_COLS + ['profit_per_unit']
+
+META = 'meta.json'
+INDEX = '_index.json'
+
+
+def content_key(sales_df, feature_columns=FEATURE_COLUMNS, pipeline_version=FEATURE_PIPELINE_VERSION):
+    """Digest of the sales rows plus the feature pipeline that turns them into a matrix.
+
+    Equal data always maps to the same entry, however many store versions it passed through.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps({
+        'pipeline_version': pipeline_version,
+        'feature_columns': list(feature_columns),
+        'sales_columns': list(sales_df.columns),
+    }).encode())
+    digest.update(pd.util.hash_pandas_object(sales_df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class FeatureSet:
+    """One cache entry: the engineered and scaled float32 matrices of a sales history.
+
+    Arrays are memory-mapped read-only on first access, so every reader (pages, training
+    processes, CV folds) shares the same page-cache copy. Pickling carries only the entry
+    path; the receiving process maps the files itself.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META), 'r') as f:
+            self.meta = json.load(f)
+        self.key = self.meta['key']
+        self.columns = self.meta['feature_columns']
+        self.target_names = self.meta['target_columns']
+        self._arrays = {}
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+        return self._arrays[name]
+
+    @property
+    def features(self):
+        """(rows, FEATURE_COLUMNS) float32 matrix of raw engineered features."""
+        return self._array('features')
+
+    @property
+    def scaled(self):
+        """`features` standardized with `scaler()` (fitted on every row of the entry)."""
+        return self._array('scaled')
+
+    @property
+    def targets(self):
+        """(rows, target columns) float64 matrix of the prediction targets."""
+        return self._array('targets')
+
+    def frame(self, scaled=False):
+        """Feature matrix as a DataFrame over the mapped array (no copy)."""
+        return pd.DataFrame(self.scaled if scaled else self.features, columns=self.columns, copy=False)
+
+    def target(self, name):
+        return self.targets[:, self.target_names.index(name)]
+
+    def target_frame(self):
+        return pd.DataFrame(self.targets, columns=self.target_names, copy=False)
+
+    def scaler(self):
+        """StandardScaler equivalent to the one that produced `scaled`."""
+        stats = self.meta['scaler']
+        scaler = StandardScaler()
+        scaler.mean_ = np.array(stats['mean'])
+        scaler.var_ = np.array(stats['var'])
+        scaler.scale_ = np.array(stats['scale'])
+        scaler.n_samples_seen_ = stats['n_samples_seen']
+        scaler.n_features_in_ = len(self.columns)
+        scaler.feature_names_in_ = np.array(self.columns, dtype=object)
+        return scaler
+
+
+class FeatureMatrixCache:
+    """Directory of FeatureSets keyed by `content_key`, with an index from store versions to keys.
+
+    Looking up the current store version is a dictionary read; only an unseen version
+    reads and hashes the history, and only unseen content engineers features. Entries
+    are written to a temporary directory and renamed into place, so concurrent builders
+    never expose a partial entry.
+    """
+
+    def __init__(self, root=FEATURE_CACHE_DIR, max_entries=FEATURE_CACHE_ENTRIES):
+        self.root = root
+        self.max_entries = max_entries
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def _index(self):
+        path = os.path.join(self.root, INDEX)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # A corrupt index only costs a re-hash
+            return {}
+
+    def _write_index(self, index):
+        path = os.path.join(self.root, INDEX)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _entry(self, key):
+        if key not in self._open:
+            self._open[key] = FeatureSet(os.path.join(self.root, key))
+        return self._open[key]
+
+    def _exists(self, key):
+        return os.path.exists(os.path.join(self.root, key, META))
+
+    def get(self, store=None):
+        """FeatureSet of the store's current history."""
+        store = store or get_store()
+        version = store.version
+        key = self._index().get(version)
+        if key is not None and self._exists(key):
+            with self._lock:
+                return self._entry(key)
+        return self.for_frame(store.read(SALES_COLUMNS), version)
+
+    def for_frame(self, sales_df, version=None):
+        """FeatureSet of a time-ordered sales frame, built on first sight of its content."""
+        key = content_key(sales_df)
+        with self._lock:
+            if not self._exists(key):
+                self._build(sales_df, key)
+            index = self._index()
+            if version is not None and index.get(version) != key:
+                index[version] = key
+            self._prune(index, keep=key)
+            self._write_index(index)
+            # Recently used entries survive pruning longest
+            os.utime(os.path.join(self.root, key, META))
+            return self._entry(key)
+
+    def _build(self, sales_df, key):
+        df = engineer_features(sales_df)
+        features = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        scaler = StandardScaler().fit(features)
+        targets = [col for col in TARGET_COLUMNS if col in df.columns]
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f'.{key}.{os.getpid()}.tmp')
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, 'features.npy'), features.astype(np.float32))
+        np.save(os.path.join(tmp_path, 'scaled.npy'), scaler.transform(features).astype(np.float32))
+        np.save(os.path.join(tmp_path, 'targets.npy'), df[targets].to_numpy(dtype=np.float64))
+        with open(os.path.join(tmp_path, META), 'w') as f:
+            json.dump({
+                'key': key,
+                'pipeline_version': FEATURE_PIPELINE_VERSION,
+                'rows': len(df),
+                'feature_columns': FEATURE_COLUMNS,
+                'target_columns': targets,
+                'scaler': {
+                    'mean': scaler.mean_.tolist(),
+                    'var': scaler.var_.tolist(),
+                    'scale': scaler.scale_.tolist(),
+                    'n_samples_seen': int(scaler.n_samples_seen_),
+                },
+            }, f, indent=2)
+        try:
+            os.rename(tmp_path, os.path.join(self.root, key))
+        except OSError:
+            # Another process published the same content first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def _prune(self, index, keep):
+        entries = [name for name in os.listdir(self.root) if self._exists(name)]
+        entries.sort(key=lambda name: os.path.getmtime(os.path.join(self.root, name, META)), reverse=True)
+        stale = [name for name in entries if name != keep][max(self.max_entries - 1, 0):]
+        for name in stale:
+            # Open maps of a removed entry stay valid until their readers drop them
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            self._open.pop(name, None)
+        for version in [version for version, key in index.items() if key in stale]:
+            del index[version]
+
+
+_default_cache = None
+
+
+def get_feature_cache():
+    """Process-wide feature-matrix cache."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = FeatureMatrixCache()
+    return _default_cache
+
+
+def load_feature_set(store=None):
+    """FeatureSet of the default store's current history."""
+    return get_feature_cache().get(store)
@@ -0,0 +1,176 @@
+"""
+🧮 Feature Engineering Pipeline
+Company Sales Data - Shared Feature Definitions
+"""
+
+import numpy as np
+import pandas as pd
+
+from .config import PRODUCT_COLS
+
+# Month -> season lookup (index 0 is unused so months can index directly)
+SEASONS = ['Fall', 'Spring', 'Summer', 'Winter']
+SEASON_INDEX_BY_MONTH = np.array([-1, 3, 3, 1, 1, 1, 2, 2, 2, 0, 0, 0, 3])
+SEASON_MAP = {month: SEASONS[SEASON_INDEX_BY_MONTH[month]] for month in range(1, 13)}
+
+# Months flagged as holiday season when the deployed models were trained
+HOLIDAY_MONTHS = [11, 12]
+
+# Window of the trailing product moving averages
+MA_WINDOW = 3
+
+# Bump whenever a feature definition changes; cached feature matrices are keyed on it
+FEATURE_PIPELINE_VERSION = 1
+
+# Column order expected by the deployed scaler and models (feature_info.json)
+FEATURE_COLUMNS = (
+    ['month', 'quarter', 'is_holiday_season', 'product_diversity']
+    + PRODUCT_COLS
+    + [f'{product}_ma3' for product in PRODUCT_COLS]
+    + [f'season_{season}' for season in SEASONS]
+)
+
+# Minimal columns a scenario table must provide
+SCENARIO_COLUMNS = ['month'] + PRODUCT_COLS
+
+
+def quarter_of(month):
+    return (np.asarray(month) - 1) // 3 + 1
+
+
+def season_of(month):
+    return np.array(SEASONS)[SEASON_INDEX_BY_MONTH[np.asarray(month, dtype=np.int64)]]
+
+
+def rolling_means(values, window=MA_WINDOW, groups=None):
+    """Trailing mean over the last `window` rows (min_periods=1), computed with cumulative sums.
+
+    `groups` optionally labels contiguous series (e.g. one per store) so windows never
+    cross a series boundary.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    index = np.arange(n)
+
+    cumulative = np.zeros((n + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=cumulative[1:])
+
+    start = np.maximum(index - window + 1, 0)
+    if groups is not None:
+        groups = np.asarray(groups)
+        boundaries = np.ones(n, dtype=bool)
+        boundaries[1:] = groups[1:] != groups[:-1]
+        group_start = np.maximum.accumulate(np.where(boundaries, index, 0))
+        start = np.maximum(start, group_start)
+
+    counts = (index - start + 1).astype(np.float64)
+    if values.ndim > 1:
+        counts = counts[:, None]
+    return (cumulative[index + 1] - cumulative[start]) / counts
+
+
+def normalize_scenarios(scenarios):
+    # Accept the raw CSV schema as well as the form naming
+    if 'month' not in scenarios.columns and 'month_number' in scenarios.columns:
+        scenarios = scenarios.rename(columns={'month_number': 'month'})
+
+    missing = [col for col in SCENARIO_COLUMNS if col not in scenarios.columns]
+    if missing:
+        raise ValueError(f"Scenario table is missing required columns: {missing}")
+
+    month = scenarios['month'].to_numpy()
+    if len(month) and (np.any(month < 1) or np.any(month > 12)):
+        raise ValueError("Scenario 'month' values must be between 1 and 12")
+
+    return scenarios
+
+
+def build_feature_matrix(scenarios, feature_columns=FEATURE_COLUMNS):
+    """Build the model feature matrix for every scenario row in one vectorized pass.
+
+    Optional `is_holiday_season` and `<product>_ma3` columns override the defaults
+    (holiday flag derived from the month, moving averages equal to the current value).
+    """
+    scenarios = normalize_scenarios(scenarios)
+
+    month = scenarios['month'].to_numpy(dtype=np.int64)
+    products = scenarios[PRODUCT_COLS].to_numpy(dtype=np.float64)
+
+    if 'is_holiday_season' in scenarios.columns:
+        is_holiday = scenarios['is_holiday_season'].to_numpy(dtype=np.float64)
+    else:
+        is_holiday = np.isin(month, HOLIDAY_MONTHS).astype(np.float64)
+
+    columns = {
+        'month': month.astype(np.float64),
+        'quarter': quarter_of(month).astype(np.float64),
+        'is_holiday_season': is_holiday,
+        'product_diversity': (products > 0).sum(axis=1).astype(np.float64),
+    }
+
+    for i, product in enumerate(PRODUCT_COLS):
+        columns[product] = products[:, i]
+        ma_col = f'{product}_ma3'
+        if ma_col in scenarios.columns:
+            columns[ma_col] = scenarios[ma_col].to_numpy(dtype=np.float64)
+        else:
+            columns[ma_col] = products[:, i]
+
+    season_index = SEASON_INDEX_BY_MONTH[month]
+    for i, season in enumerate(SEASONS):
+        columns[f'season_{season}'] = (season_index == i).astype(np.float64)
+
+    return np.column_stack([columns[col] for col in feature_columns])
+
+
+def build_feature_row(month, products, is_holiday=None, moving_averages=None, feature_columns=FEATURE_COLUMNS):
+    """Feature vector for a single scenario, produced by the batch path on a one-row table."""
+    row = {'month': month}
+    row.update({product: products[product] for product in PRODUCT_COLS})
+    if is_holiday is not None:
+        row['is_holiday_season'] = int(is_holiday)
+    if moving_averages is not None:
+        row.update({f'{product}_ma3': moving_averages[product] for product in PRODUCT_COLS})
+
+    return build_feature_matrix(pd.DataFrame([row]), feature_columns)[0]
+
+
+def engineer_features(sales_df, group_col=None, features=None):
+    """Add every derived column used by the dashboards and models to a sales history frame.
+
+    Rows must be in time order (within each `group_col` series when given); the
+    `_ma3` columns are true trailing 3-month means over that history. `features`
+    optionally supplies the FEATURE_COLUMNS matrix of these rows (e.g. from the
+    feature cache) instead of recomputing it.
+    """
+    df = sales_df.copy()
+    month = df['month_number'].to_numpy(dtype=np.int64)
+
+    if features is None:
+        groups = df[group_col].to_numpy() if group_col is not None else None
+        moving_averages = rolling_means(df[PRODUCT_COLS].to_numpy(), groups=groups)
+        for i, product in enumerate(PRODUCT_COLS):
+            df[f'{product}_ma3'] = moving_averages[:, i]
+        features = build_feature_matrix(df, FEATURE_COLUMNS)
+    else:
+        if len(features) != len(df):
+            raise ValueError(f"Feature matrix has {len(features)} rows for {len(df)} sales rows")
+        for product in PRODUCT_COLS:
+            ma_col = f'{product}_ma3'
+            df[ma_col] = np.asarray(features[:, FEATURE_COLUMNS.index(ma_col)], dtype=np.float64)
+
+    for i, col in enumerate(FEATURE_COLUMNS):
+        if col in PRODUCT_COLS or col.endswith('_ma3'):
+            continue
+        df[col] = features[:, i].astype(np.int64)
+
+    df['season'] = season_of(month)
+    if 'total_units' in df.columns and 'total_profit' in df.columns:
+        df['profit_per_unit'] = df['total_profit'] / df['total_units']
+
+    return df
+
+
+def build_feature_frame(sales_df, group_col=None):
+    """Model-ready feature frame (FEATURE_COLUMNS order) for a sales history."""
+    return engineer_features(sales_df, group_col)[FEATURE_COLUMNS]
@@ -0,0 +1,161 @@
+"""
+📆 Multi-Horizon Forecasting
+Company Sales Data - Batched Recursive Forecasts for the Months Ahead
+
+The deployed models score one month at a time from its product units, calendar
+features and trailing `_ma3` windows. The forecaster rolls that state forward: every
+step advances all series by one month, projects each series' product units, scores the
+month and pushes the units into the series' window, so later moving averages are built
+from the forecasts before them. Series advance together, one batched predict per step.
+
+A future month's product units are projected as the trailing mean of its series'
+window; products with a deployed model of their own (facecream, moisturizer) then
+replace the projection with that model's forecast before the totals are scored.
+Planned units can be supplied instead of projections.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .config import PRODUCT_COLS
+from .features import MA_WINDOW, build_feature_matrix
+
+# Longest forecast horizon in months
+MAX_HORIZON = 24
+
+
+class ForecastState:
+    """Trailing product-unit windows of many series, advanced a month at a time.
+
+    `units` is (series, window, products) with the most recent month last; `valid`
+    marks the slots that hold a month (short histories fill only the newest ones).
+    """
+
+    def __init__(self, last_month, units, valid, keys=None):
+        self.last_month = np.asarray(last_month, dtype=np.int64)
+        self.units = np.asarray(units, dtype=np.float64)
+        self.valid = np.asarray(valid, dtype=bool)
+        self.keys = keys
+
+    @classmethod
+    def from_history(cls, history, group_col=None, window=MA_WINDOW):
+        """Seed from the trailing `window` months of each series of a time-ordered sales frame."""
+        month_col = 'month_number' if 'month_number' in history.columns else 'month'
+        if group_col is None:
+            recent = history.tail(window)
+            codes, keys = np.zeros(len(recent), dtype=np.int64), None
+        else:
+            recent = history.groupby(group_col, sort=False).tail(window)
+            codes, keys = pd.factorize(recent[group_col])
+        if not len(recent):
+            raise ValueError("Forecasting needs at least one month of history per series")
+
+        n_series = codes.max() + 1
+        # Newest month of each series lands in the last slot
+        position = window - 1 - pd.Series(codes).groupby(codes).cumcount(ascending=False).to_numpy()
+        units = np.zeros((n_series, window, len(PRODUCT_COLS)))
+        valid = np.zeros((n_series, window), dtype=bool)
+        units[codes, position] = recent[PRODUCT_COLS].to_numpy(dtype=np.float64)
+        valid[codes, position] = True
+        newest = position == window - 1
+        last_month = np.empty(n_series, dtype=np.int64)
+        last_month[codes[newest]] = recent[month_col].to_numpy(dtype=np.int64)[newest]
+        return cls(last_month, units, valid, keys)
+
+    def __len__(self):
+        return len(self.last_month)
+
+    def next_months(self):
+        return self.last_month % 12 + 1
+
+    def projection(self):
+        """(series, products) trailing mean of each window."""
+        counts = self.valid.sum(axis=1)[:, None]
+        return (self.units * self.valid[:, :, None]).sum(axis=1) / counts
+
+    def moving_averages(self, units):
+        """`_ma3` values of a new month with `units`: its own units plus the preceding window - 1 months."""
+        prior = self.valid[:, 1:]
+        total = (self.units[:, 1:] * prior[:, :, None]).sum(axis=1) + units
+        return total / (prior.sum(axis=1) + 1)[:, None]
+
+    def advance(self, months, units):
+        """Append one month to every series, retiring its oldest slot."""
+        self.units = np.concatenate([self.units[:, 1:], np.asarray(units, dtype=np.float64)[:, None]], axis=1)
+        self.valid = np.concatenate([self.valid[:, 1:], np.ones((len(self), 1), dtype=bool)], axis=1)
+        self.last_month = np.asarray(months, dtype=np.int64)
+
+
+class RecursiveForecaster:
+    """Forecasts every deployed target 1 to MAX_HORIZON months ahead for many series at once."""
+
+    def __init__(self, predictor):
+        self.predictor = predictor
+
+    def _features(self, months, units, state):
+        scenarios = pd.DataFrame(units, columns=PRODUCT_COLS)
+        scenarios.insert(0, 'month', months)
+        moving_averages = state.moving_averages(units)
+        for i, product in enumerate(PRODUCT_COLS):
+            scenarios[f'{product}_ma3'] = moving_averages[:, i]
+        return build_feature_matrix(scenarios, self.predictor.feature_columns)
+
+    def forecast(self, history, horizon=12, group_col=None, unit_plan=None, parallel=True):
+        """Long frame of forecasts: one row per series and step ahead.
+
+        `history` is a time-ordered sales frame (one series per `group_col` value).
+        `unit_plan` optionally fixes the product units of every forecast month, as an
+        array of shape (horizon, products) shared by all series or (series, horizon,
+        products). Columns: [group_col], `step`, `month`, one per target, and the
+        `<product>_units` each month was scored with.
+        """
+        if not 1 <= horizon <= MAX_HORIZON:
+            raise ValueError(f"Forecast horizon must be between 1 and {MAX_HORIZON} months")
+        state = ForecastState.from_history(history, group_col)
+        if unit_plan is not None:
+            unit_plan = np.broadcast_to(np.asarray(unit_plan, dtype=np.float64),
+                                        (len(state), horizon, len(PRODUCT_COLS)))
+
+        targets = self.predictor.targets
+        product_targets = [t for t in targets if t in PRODUCT_COLS]
+        months_out, units_out = [], []
+        predictions_out = {target: [] for target in targets}
+
+        for step in range(horizon):
+            months = state.next_months()
+            predictions = {}
+            if unit_plan is None:
+                units = state.projection()
+                if product_targets:
+                    # Product models refine their own product's units before the totals see them
+                    refined = self.predictor.predict_matrix(self._features(months, units, state), product_targets,
+                                                            parallel=parallel)
+                    for target in product_targets:
+                        predictions[target] = refined[target].to_numpy()
+                        units[:, PRODUCT_COLS.index(target)] = np.maximum(predictions[target], 0)
+            else:
+                units = unit_plan[:, step].copy()
+
+            remaining = [t for t in targets if t not in predictions]
+            scored = self.predictor.predict_matrix(self._features(months, units, state), remaining, parallel=parallel)
+            for target in remaining:
+                predictions[target] = scored[target].to_numpy()
+
+            for target in targets:
+                predictions_out[target].append(predictions[target])
+            months_out.append(months)
+            units_out.append(units)
+            state.advance(months, units)
+
+        # Series-major rows: every step of the first series, then the next
+        columns = {}
+        if group_col is not None:
+            columns[group_col] = np.repeat(np.asarray(state.keys), horizon)
+        columns['step'] = np.tile(np.arange(1, horizon + 1), len(state))
+        columns['month'] = np.stack(months_out, axis=1).ravel()
+        for target in targets:
+            columns[target] = np.stack(predictions_out[target], axis=1).ravel()
+        units = np.stack(units_out, axis=1).reshape(-1, len(PRODUCT_COLS))
+        for i, product in enumerate(PRODUCT_COLS):
+            columns[f'{product}_units'] = units[:, i]
+        return pd.DataFrame(columns)
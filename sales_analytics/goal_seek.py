@@ -0,0 +1,106 @@
+"""
+🎯 Goal Seek
+Company Sales Data - Product Mixes That Reach a Forecast Target
+
+Searches the six product-unit inputs for mixes whose forecast of a chosen target
+(e.g. `total_profit`) hits a goal, within per-product bounds and an optional total
+capacity. The search is differential evolution: every generation's whole population is
+scored in one batched predict call, and nothing needs gradients, so the piecewise
+constant tree ensembles are searched as easily as the linear models.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from .config import PRODUCT_COLS
+
+POPULATION = 128
+GENERATIONS = 60
+
+# Differential-evolution mutation scale and crossover rate
+MUTATION = 0.7
+CROSSOVER = 0.9
+
+# Weight of the pull towards the reference mix, relative to the scaled distance from the goal
+REFERENCE_WEIGHT = 1e-3
+
+
+def repair(candidates, lower, upper, capacity=None):
+    """Whole-unit mixes inside [lower, upper] whose total stays within `capacity`.
+
+    Mixes over capacity are shrunk towards `lower` along the line between them, which
+    keeps every product inside its bounds.
+    """
+    candidates = np.clip(candidates, lower, upper)
+    if capacity is not None:
+        floor_total = lower.sum()
+        excess_room = candidates.sum(axis=1) - floor_total
+        scale = np.minimum(1.0, (capacity - floor_total) / np.where(excess_room > 0, excess_room, 1.0))
+        candidates = lower + (candidates - lower) * scale[:, None]
+    # Floors never leave the bounds or exceed the capacity when the bounds are whole units
+    return np.floor(candidates + 1e-9)
+
+
+def goal_seek(predictor, target, goal, month, lower, upper, capacity=None, is_holiday=None, reference=None,
+              population=POPULATION, generations=GENERATIONS, top_k=5, seed=0):
+    """Product mixes whose `target` forecast for `month` is closest to `goal`.
+
+    `lower`/`upper` bound each product's units (PRODUCT_COLS order) and `capacity`
+    caps their total. Among mixes that reach the goal equally well the search prefers
+    those nearest `reference` (default: the middle of the bounds). Returns (frame of the
+    `top_k` distinct best mixes with `predicted` and `gap` columns, stats dict).
+    """
+    if target not in predictor.targets:
+        raise ValueError(f"Unknown prediction target: {target!r}")
+    lower = np.ceil(np.asarray(lower, dtype=np.float64))
+    upper = np.floor(np.asarray(upper, dtype=np.float64))
+    if np.any(lower > upper):
+        raise ValueError("Each product's minimum must not exceed its maximum")
+    if capacity is not None and lower.sum() > capacity:
+        raise ValueError(f"Product minimums ({lower.sum():,.0f} units) exceed the capacity ({capacity:,.0f})")
+
+    span = np.where(upper > lower, upper - lower, 1.0)
+    reference = (lower + upper) / 2 if reference is None else np.asarray(reference, dtype=np.float64)
+    scale = max(abs(goal), 1.0)
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+
+    def evaluate(candidates):
+        scenarios = pd.DataFrame(candidates, columns=PRODUCT_COLS)
+        scenarios.insert(0, 'month', month)
+        if is_holiday is not None:
+            scenarios['is_holiday_season'] = int(is_holiday)
+        # Candidates are throwaway: keep them out of the shared prediction cache
+        predicted = predictor.predict(scenarios, [target], use_cache=False)[target]
+        predicted = predicted.to_numpy(dtype=np.float64, copy=True)
+        drift = (((candidates - reference) / span) ** 2).mean(axis=1)
+        return predicted, np.abs(predicted - goal) / scale + REFERENCE_WEIGHT * drift
+
+    members = repair(lower + rng.random((population, len(PRODUCT_COLS))) * (upper - lower), lower, upper, capacity)
+    predicted, loss = evaluate(members)
+    for _ in range(generations):
+        # DE/rand/1/bin for the whole population at once
+        a, b, c = (rng.integers(0, population, population) for _ in range(3))
+        mutants = members[a] + MUTATION * (members[b] - members[c])
+        crossed = rng.random(members.shape) < CROSSOVER
+        crossed[np.arange(population), rng.integers(0, len(PRODUCT_COLS), population)] = True
+        trials = repair(np.where(crossed, mutants, members), lower, upper, capacity)
+        trial_predicted, trial_loss = evaluate(trials)
+        better = trial_loss < loss
+        members[better], predicted[better], loss[better] = trials[better], trial_predicted[better], trial_loss[better]
+
+    order = np.argsort(loss)
+    _, first = np.unique(members[order], axis=0, return_index=True)
+    best = order[np.sort(first)][:top_k]
+    mixes = pd.DataFrame(members[best].astype(np.int64), columns=PRODUCT_COLS)
+    mixes['total_units_input'] = mixes[PRODUCT_COLS].sum(axis=1)
+    mixes['predicted'] = predicted[best]
+    mixes['gap'] = predicted[best] - goal
+    stats = {
+        'evaluations': population * (generations + 1),
+        'generations': generations,
+        'seconds': time.perf_counter() - start,
+    }
+    return mixes, stats
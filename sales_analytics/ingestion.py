@@ -0,0 +1,356 @@
+"""
+📥 Sales Ingestion
+Company Sales Data - Append-Only Streaming Pipeline
+
+Run with:  python -m sales_analytics.ingestion [--once] [--interval 5]
+
+Producers hand over new actuals through the drop directory in either form:
+    *.csv    whole files (write elsewhere, then move in so they appear atomically)
+    *.jsonl  one JSON record per line, appended at any time (a local message-queue
+             stand-in); each file is tailed from the last committed byte offset
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+from .config import INGEST_DIR, INGEST_IN_APP, INGEST_POLL_SECONDS, PRODUCT_COLS
+from .data_store import SALES_COLUMNS, get_store
+
+STATE_FILE = '_ingest_state.json'
+# Held by whichever process is polling the drop directory
+LOCK_FILE = '_ingest.lock'
+
+logger = logging.getLogger(__name__)
+
+# Tolerance when checking totals against the product breakdown
+TOTAL_TOLERANCE = 1e-6
+
+
+def validate_sales_records(records, schema=None):
+    """Split raw records into (valid, rejected) frames against the sales schema.
+
+    Missing or unexpected columns reject the whole batch (ValueError). Row-level
+    problems (non-numeric or negative values, month outside 1-12, total_units below the
+    product sum, fractional values for integer columns) reject only that row; the rejected
+    frame carries an `error` column. The store's `schema()` leaves out the columns it derives
+    (`year` and the `ingest_seq` ordering key), so producers never supply them.
+    """
+    records = records.copy()
+    expected = list(schema) if schema else SALES_COLUMNS
+    missing = [col for col in expected if col not in records.columns]
+    unexpected = [col for col in records.columns if col not in expected]
+    if missing or unexpected:
+        raise ValueError(f"Sales records do not match the schema (missing {missing}, unexpected {unexpected})")
+
+    numeric = records[SALES_COLUMNS].apply(pd.to_numeric, errors='coerce')
+    errors = pd.Series('', index=records.index)
+
+    def flag(mask, message):
+        errors[mask & (errors == '')] = message
+
+    flag(numeric.isna().any(axis=1), 'missing or non-numeric values')
+    flag((numeric < 0).any(axis=1), 'negative values')
+    flag(~numeric['month_number'].between(1, 12), 'month_number must be between 1 and 12')
+    # Totals may include lines outside the six tracked products, but never fewer units
+    product_sum = numeric[PRODUCT_COLS].sum(axis=1)
+    flag(numeric['total_units'] < product_sum - TOTAL_TOLERANCE, 'total_units is below the product sum')
+
+    if schema is None:
+        integer_columns = ['month_number'] + PRODUCT_COLS + ['total_units']
+    else:
+        integer_columns = [col for col in SALES_COLUMNS if schema[col].startswith(('int', 'uint'))]
+    fractional = (numeric[integer_columns] % 1 != 0).any(axis=1)
+    flag(fractional, 'fractional values in integer columns')
+
+    valid = errors == ''
+    cleaned = records[valid].copy()
+    for col in SALES_COLUMNS:
+        cleaned[col] = numeric.loc[valid, col].astype(np.int64 if col in integer_columns else np.float64)
+
+    rejected = records[~valid].copy()
+    rejected['error'] = errors[~valid]
+    return cleaned.reset_index(drop=True), rejected.reset_index(drop=True)
+
+
+@contextlib.contextmanager
+def _exclusive(path, wait):
+    """Cross-process lock on `path`; yields False when `wait` is off and another process holds it."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK if wait else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            yield False
+            return
+        # Closing the descriptor below releases the lock
+        yield True
+    finally:
+        os.close(fd)
+
+
+def submit_records(records, drop_dir=INGEST_DIR, stream='actuals'):
+    """Queue records (list of dicts or DataFrame) for ingestion by appending them to `<stream>.jsonl`."""
+    if isinstance(records, pd.DataFrame):
+        records = records.to_dict('records')
+    os.makedirs(drop_dir, exist_ok=True)
+    payload = ''.join(json.dumps(record, default=_json_default) + '\n' for record in records)
+    # A single O_APPEND write keeps concurrent producers from interleaving lines
+    fd = os.open(os.path.join(drop_dir, f'{stream}.jsonl'), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, payload.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class IngestionPipeline:
+    """Moves new records from the drop directory into the sales data store.
+
+    Each poll validates everything that arrived, writes the valid rows as one new
+    store fragment (which also folds them into the rollup cube and bumps the store
+    version that dashboard caches are keyed on), then commits: CSV files move to
+    `processed/`, JSONL offsets are saved, and rejected rows land in `rejected/`.
+    Listeners are called with the appended rows, e.g. to refresh rolling features.
+    """
+
+    def __init__(self, drop_dir=INGEST_DIR, store=None, listeners=()):
+        self.drop_dir = drop_dir
+        self.store = store or get_store()
+        self.listeners = list(listeners)
+        self.totals = {'polls': 0, 'rows': 0, 'rejected': 0, 'files': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    # ---- state -----------------------------------------------------------
+
+    def _state_path(self):
+        return os.path.join(self.drop_dir, STATE_FILE)
+
+    def _load_state(self):
+        path = self._state_path()
+        if not os.path.exists(path):
+            return {'offsets': {}}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        path = self._state_path()
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+
+    # ---- sources ---------------------------------------------------------
+
+    def _read_csv(self, path):
+        return pd.read_csv(path)
+
+    def _read_jsonl(self, path, offset):
+        """Complete lines after `offset` -> (frame, new offset, unparseable lines)."""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            chunk = f.read()
+        # A producer may be mid-write: only consume up to the last newline
+        end = chunk.rfind(b'\n') + 1
+        records, bad_lines = [], []
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError('not an object')
+                records.append(record)
+            except ValueError:
+                bad_lines.append(line.decode('utf-8', errors='replace'))
+        return pd.DataFrame.from_records(records), offset + end, bad_lines
+
+    def _write_rejected(self, name, rejected):
+        if rejected.empty:
+            return
+        directory = os.path.join(self.drop_dir, 'rejected')
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(name))[0]
+        rejected.to_csv(os.path.join(directory, f'{stem}-{time.time_ns():x}.csv'), index=False)
+
+    # ---- polling ---------------------------------------------------------
+
+    def poll(self, wait=False):
+        """Ingest everything that arrived since the last poll; returns a summary dict.
+
+        Every pipeline on the drop directory (dashboard workers, the CLI) takes a file
+        lock on it first, so a file or JSONL span is only ever ingested once. When another
+        process holds the lock the poll is skipped (`busy` in the summary) unless `wait`.
+        """
+        summary = {'rows': 0, 'rejected': 0, 'files': 0, 'version': None, 'busy': False}
+        if not os.path.isdir(self.drop_dir):
+            return summary
+        with self._lock, _exclusive(os.path.join(self.drop_dir, LOCK_FILE), wait) as acquired:
+            if not acquired:
+                summary['busy'] = True
+                return summary
+            return self._poll(summary)
+
+    def _poll(self, summary):
+
+        state = self._load_state()
+        schema = self.store.schema()
+        batches, rejected, done_files, offsets = [], [], [], {}
+
+        for path in sorted(glob.glob(os.path.join(self.drop_dir, '*.csv'))):
+            try:
+                valid, bad = validate_sales_records(self._read_csv(path), schema)
+            except (ValueError, pd.errors.ParserError) as exc:
+                valid, bad = None, pd.DataFrame({'file': [os.path.basename(path)], 'error': [str(exc)]})
+            if valid is not None:
+                batches.append(valid)
+            rejected.append((path, bad))
+            done_files.append(path)
+
+        for path in sorted(glob.glob(os.path.join(self.drop_dir, '*.jsonl'))):
+            name = os.path.basename(path)
+            offset = state['offsets'].get(name, 0)
+            if os.path.getsize(path) < offset:
+                # Truncated or replaced by the producer: start over
+                offset = 0
+            frame, new_offset, bad_lines = self._read_jsonl(path, offset)
+            if new_offset == offset:
+                continue
+            if bad_lines:
+                rejected.append((path, pd.DataFrame({'line': bad_lines, 'error': 'invalid JSON record'})))
+            if not frame.empty:
+                try:
+                    valid, bad = validate_sales_records(frame, schema)
+                    batches.append(valid)
+                except ValueError as exc:
+                    bad = frame.assign(error=str(exc))
+                rejected.append((path, bad))
+            offsets[name] = new_offset
+
+        new_rows = pd.concat(batches, ignore_index=True) if batches else None
+        if new_rows is not None and not new_rows.empty:
+            self.store.append(new_rows)
+            summary['rows'] = len(new_rows)
+            summary['version'] = self.store.version
+
+        # Commit only after the rows are durable in the store
+        for path, bad in rejected:
+            self._write_rejected(path, bad)
+            summary['rejected'] += len(bad)
+        processed = os.path.join(self.drop_dir, 'processed')
+        for path in done_files:
+            os.makedirs(processed, exist_ok=True)
+            shutil.move(path, os.path.join(processed, f'{time.time_ns():x}-{os.path.basename(path)}'))
+        if offsets:
+            state['offsets'].update(offsets)
+            self._save_state(state)
+
+        summary['files'] = len(done_files) + len(offsets)
+        self.totals['polls'] += 1
+        for key in ('rows', 'rejected', 'files'):
+            self.totals[key] += summary[key]
+
+        # After the commit, so a failing listener can never get the same rows ingested twice
+        if summary['rows']:
+            for listener in self.listeners:
+                try:
+                    listener(new_rows)
+                except Exception:
+                    self.totals['errors'] += 1
+                    logger.exception("Ingestion listener %r failed", listener)
+        return summary
+
+    def poll_safely(self):
+        """`poll()`, logging a failure instead of raising it; returns None when the poll failed.
+
+        A poll that fails before appending leaves its files and offsets uncommitted, so they
+        are read again on the next poll.
+        """
+        try:
+            return self.poll()
+        except Exception:
+            self.totals['errors'] += 1
+            logger.exception("Ingestion poll of %s failed; retrying on the next poll", self.drop_dir)
+            return None
+
+    def run(self, interval=INGEST_POLL_SECONDS, stop_event=None):
+        """Poll until `stop_event` is set; a failed poll (bad file, transient I/O error) never ends the loop."""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            self.poll_safely()
+            stop_event.wait(interval)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def ensure_ingestion_worker(interval=INGEST_POLL_SECONDS):
+    """Start (once per process) a daemon thread polling the default drop directory.
+
+    Pollers in other processes share the drop directory's file lock, so any number of
+    dashboard workers and a separate ingestion process can run side by side. Disabled
+    with SALES_INGEST_IN_APP=0.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None and INGEST_IN_APP:
+            pipeline = IngestionPipeline()
+            thread = threading.Thread(target=pipeline.run, args=(interval,), name='sales-ingestion', daemon=True)
+            thread.start()
+            _worker = pipeline
+        return _worker
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ingest new sales actuals from the drop directory')
+    parser.add_argument('--drop-dir', default=INGEST_DIR)
+    parser.add_argument('--interval', type=float, default=INGEST_POLL_SECONDS)
+    parser.add_argument('--once', action='store_true', help='poll a single time and exit')
+    args = parser.parse_args(argv)
+
+    pipeline = IngestionPipeline(args.drop_dir)
+    if args.once:
+        print(json.dumps(pipeline.poll(wait=True)))
+        return
+
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s')
+    print(f'📥 Watching {args.drop_dir} every {args.interval:g}s')
+    try:
+        while True:
+            summary = pipeline.poll_safely()
+            if summary and (summary['rows'] or summary['rejected']):
+                print(json.dumps(summary))
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+📏 Prediction Intervals
+Company Sales Data - Per-Tree Quantile & Conformal Forecast Ranges
+
+RF forests get the spread of their own trees: every tree's leaf value is already on
+hand from the traversal that averages them, so the bounds are quantiles over an array
+the point prediction needed anyway. Other models (XGB, LR, SVR) get split-conformal
+intervals, prediction ± a quantile of the absolute walk-forward (out-of-fold)
+residuals recorded when they were trained. Deployments without recorded residuals
+fall back to a normal interval from their held-out RMSE.
+"""
+
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+from .tree_engine import CompiledTreeEnsemble, compile_model
+
+# Coverage levels calibrated at training time (and offered on the Predictions page)
+INTERVAL_LEVELS = (0.8, 0.9, 0.95)
+DEFAULT_LEVEL = 0.9
+
+# Averaged ensembles whose per-tree outputs are samples of the prediction itself
+TREE_QUANTILE_ALGORITHMS = {'RF'}
+
+
+def _level_key(level):
+    return f'{level:g}'
+
+
+def conformal_calibration(residuals, levels=INTERVAL_LEVELS):
+    """Split-conformal half-widths per coverage level from held-out residuals.
+
+    The half-width at `level` is the ceil((n + 1) * level)-th smallest |residual|; it is
+    None when there are too few residuals to guarantee that coverage.
+    """
+    scores = np.sort(np.abs(np.asarray(residuals, dtype=np.float64)))
+    half_widths = {}
+    for level in levels:
+        rank = math.ceil((len(scores) + 1) * level)
+        half_widths[_level_key(level)] = float(scores[rank - 1]) if rank <= len(scores) else None
+    return {'method': 'conformal', 'n': int(len(scores)), 'half_widths': half_widths}
+
+
+def calibrated_half_width(info, level=DEFAULT_LEVEL):
+    """(half-width, method) of the symmetric interval for a deployment entry of `best_models`."""
+    calibration = info.get('calibration') or {}
+    half_width = calibration.get('half_widths', {}).get(_level_key(level))
+    if half_width is not None:
+        return half_width, 'conformal'
+    rmse = info.get('cv_rmse', info.get('test_rmse'))
+    if rmse is None or not math.isfinite(rmse):
+        return math.inf, 'unavailable'
+    return NormalDist().inv_cdf(0.5 + level / 2) * rmse, 'normal'
+
+
+def compiled_forest(model):
+    """CompiledTreeEnsemble of an averaged forest model, or None."""
+    if isinstance(model, CompiledTreeEnsemble):
+        compiled = model
+    else:
+        compiled = getattr(model, 'compiled', None)
+        if compiled is None and not hasattr(model, 'coef_'):
+            compiled = compile_model(model)
+    if compiled is None or compiled.aggregation != 'mean':
+        return None
+    return compiled
+
+
+def tree_interval(compiled, X, level=DEFAULT_LEVEL):
+    """(predictions, lower, upper) of a forest: the tree mean and central per-tree quantiles."""
+    predictions, (lower, upper) = compiled.predict_with_quantiles(X, [(1 - level) / 2, (1 + level) / 2])
+    # A skewed set of trees can put its mean outside the central quantiles
+    return predictions, np.minimum(lower, predictions), np.maximum(upper, predictions)
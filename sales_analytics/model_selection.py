@@ -0,0 +1,259 @@
+"""
+🔬 Model Selection
+Company Sales Data - Walk-Forward Validation & Successive-Halving Search
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import ParameterSampler
+from sklearn.preprocessing import StandardScaler
+
+from .config import SCALED_ALGORITHMS
+
+# Hyperparameter distributions sampled by the search (the notebook's settings are always included)
+SEARCH_SPACES = {
+    'RF': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [3, 5, 10, None],
+        'min_samples_leaf': [1, 2, 4],
+        'max_features': [1.0, 0.5, 'sqrt'],
+    },
+    'XGB': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [2, 3, 4, 6],
+        'learning_rate': [0.03, 0.1, 0.3],
+        'subsample': [0.6, 0.8, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+        'min_child_weight': [1, 3, 5],
+    },
+    'SVR': {
+        'C': [1, 10, 100, 1000, 10000],
+        'gamma': ['scale', 0.01, 0.1, 1.0],
+        'epsilon': [0.01, 0.1, 1.0],
+    },
+    'LR': {},
+}
+
+
+def walk_forward_splits(n_samples, n_splits=5, test_size=None, min_train_size=None, gap=0):
+    """Expanding-window (train, test) slices in time order.
+
+    Each fold trains on everything before its test window (minus `gap` rows) and tests
+    on the next `test_size` rows, so no fold ever sees the future.
+    """
+    test_size = test_size or max(n_samples // (n_splits + 1), 1)
+    first_test = n_samples - n_splits * test_size
+    if min_train_size is not None:
+        first_test = max(first_test, min_train_size + gap)
+    if first_test - gap < 2:
+        raise ValueError(f"Not enough rows ({n_samples}) for {n_splits} walk-forward folds of {test_size}")
+
+    splits = []
+    for start in range(first_test, n_samples, test_size):
+        stop = min(start + test_size, n_samples)
+        splits.append((slice(0, start - gap), slice(start, stop)))
+    return splits
+
+
+class FoldCache:
+    """Per-fold training/test matrices, built once and shared by every configuration.
+
+    Scaled folds get their own StandardScaler fitted on that fold's training rows only,
+    so scaled algorithms are validated without leaking test statistics.
+
+    With `source` (the FeatureSet the arrays came from) fold slices are views of its
+    memory map, and pickled copies sent to worker processes carry only the entry path
+    instead of the matrices.
+    """
+
+    def __init__(self, features, targets, splits, source=None):
+        features = np.asarray(features)
+        self.features = features if np.issubdtype(features.dtype, np.floating) else features.astype(np.float64)
+        self.targets = {name: np.asarray(values, dtype=np.float64) for name, values in targets.items()}
+        self.splits = list(splits)
+        self.source = source
+        self._scaled = {}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if self.source is not None:
+            # Workers re-map the cached entry (and rebuild scaled folds on demand)
+            state.update(features=None, targets=list(self.targets), _scaled={})
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.source is not None:
+            self.features = self.source.features
+            self.targets = {name: self.source.target(name) for name in state['targets']}
+
+    def __len__(self):
+        return len(self.splits)
+
+    def matrices(self, fold, scaled=False):
+        """(X_train, X_test) of one fold."""
+        train, test = self.splits[fold]
+        if not scaled:
+            return self.features[train], self.features[test]
+        if fold not in self._scaled:
+            scaler = StandardScaler().fit(self.features[train])
+            self._scaled[fold] = (scaler.transform(self.features[train]), scaler.transform(self.features[test]))
+        return self._scaled[fold]
+
+    def labels(self, target, fold):
+        train, test = self.splits[fold]
+        y = self.targets[target]
+        return y[train], y[test]
+
+    def warm(self):
+        """Build every scaled fold up front (e.g. before handing an unmapped cache to worker processes)."""
+        for fold in range(len(self)):
+            self.matrices(fold, scaled=True)
+        return self
+
+
+def score_predictions(y_true, y_pred):
+    return {
+        'r2': r2_score(y_true, y_pred) if len(y_true) > 1 else float('nan'),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        'mae': mean_absolute_error(y_true, y_pred),
+    }
+
+
+def fold_predictions(algorithm, params, target, cache, folds, make_model):
+    """Out-of-fold predictions of one configuration for the given fold indices."""
+    predictions = {}
+    for fold in folds:
+        X_train, X_test = cache.matrices(fold, scaled=algorithm in SCALED_ALGORITHMS)
+        y_train, _ = cache.labels(target, fold)
+        model = make_model(algorithm, **params).fit(X_train, y_train)
+        predictions[fold] = model.predict(X_test)
+    return predictions
+
+
+def walk_forward_score(predictions, target, cache):
+    """Scores over the pooled out-of-fold predictions (stabler than averaging tiny folds)."""
+    folds = sorted(predictions)
+    y_true = np.concatenate([cache.labels(target, fold)[1] for fold in folds])
+    y_pred = np.concatenate([predictions[fold] for fold in folds])
+    return score_predictions(y_true, y_pred)
+
+
+def walk_forward_residuals(predictions, target, cache):
+    """Pooled out-of-fold residuals (actual - predicted) in time order."""
+    folds = sorted(predictions)
+    return np.concatenate([cache.labels(target, fold)[1] - predictions[fold] for fold in folds])
+
+
+def cross_validate(algorithm, params, target, cache, make_model):
+    """Walk-forward CV of one configuration over every fold of `cache`."""
+    predictions = fold_predictions(algorithm, params, target, cache, range(len(cache)), make_model)
+    return walk_forward_score(predictions, target, cache)
+
+
+def candidate_configs(algorithm, n_candidates, base_params=None, random_state=42):
+    """`base_params` (the current defaults) followed by random draws from the search space."""
+    space = SEARCH_SPACES.get(algorithm, {})
+    configs = [dict(base_params or {})]
+    if space:
+        for params in ParameterSampler(space, n_iter=max(n_candidates - 1, 0), random_state=random_state):
+            config = dict(base_params or {}, **params)
+            if config not in configs:
+                configs.append(config)
+    return configs
+
+
+# Fold cache shared with worker processes through the pool initializer
+_cache = None
+_make_model = None
+
+
+def _init_worker(cache, make_model):
+    global _cache, _make_model
+    _cache, _make_model = cache, make_model
+
+
+def _evaluate(algorithm, params, target, folds):
+    return fold_predictions(algorithm, params, target, _cache, folds, _make_model)
+
+
+def successive_halving(algorithm, target, cache, make_model, configs, eta=3, min_folds=1, pool=None):
+    """Successive halving over walk-forward folds.
+
+    Every configuration is first scored on the `min_folds` most recent folds; only the
+    best 1/eta advance to the next rung, which adds eta x as many (earlier) folds. Fold
+    predictions are kept between rungs, so a survivor only fits its new folds. Returns
+    (best params, best scores, history of every rung).
+    """
+    n_folds = len(cache)
+    rung_folds = min(max(min_folds, 1), n_folds)
+    survivors = list(range(len(configs)))
+    predictions = {i: {} for i in survivors}
+    history = []
+
+    while True:
+        # Most recent folds first: the cheapest rung is also the most relevant window
+        folds = list(range(n_folds - rung_folds, n_folds))
+        jobs = {i: [fold for fold in folds if fold not in predictions[i]] for i in survivors}
+        if pool is None:
+            new = {i: fold_predictions(algorithm, configs[i], target, cache, jobs[i], make_model) for i in survivors}
+        else:
+            # Workers hold their own copy of the fold cache (see search())
+            futures = {i: pool.submit(_evaluate, algorithm, configs[i], target, jobs[i]) for i in survivors}
+            new = {i: future.result() for i, future in futures.items()}
+        for i in survivors:
+            predictions[i].update(new[i])
+
+        scores = {i: walk_forward_score({f: predictions[i][f] for f in folds}, target, cache) for i in survivors}
+        # Rank on RMSE: R² is undefined on single-row rungs
+        ranked = sorted(survivors, key=lambda i: (scores[i]['rmse'], i))
+        history.append({'folds': len(folds), 'configs': len(survivors),
+                        'scores': [(configs[i], scores[i]) for i in ranked]})
+
+        if rung_folds >= n_folds or len(ranked) == 1:
+            best = ranked[0]
+            break
+        survivors = ranked[:max(math.ceil(len(ranked) / eta), 1)]
+        rung_folds = min(rung_folds * eta, n_folds)
+
+    # The winner is always reported on every fold
+    missing = [fold for fold in range(n_folds) if fold not in predictions[best]]
+    if missing:
+        predictions[best].update(fold_predictions(algorithm, configs[best], target, cache, missing, make_model))
+    return configs[best], walk_forward_score(predictions[best], target, cache), history
+
+
+def search(algorithms, targets, features, target_values, make_model, base_params=None, n_candidates=27,
+           n_splits=5, eta=3, workers=0, random_state=42, source=None):
+    """Successive-halving search for every algorithm x target pair on shared fold matrices.
+
+    `base_params` maps algorithm -> its current defaults, always included as a candidate.
+    `source` is the FeatureSet `features` were read from, if any (see FoldCache).
+    Returns {(algorithm, target): (best params, walk-forward scores)}.
+    """
+    splits = walk_forward_splits(len(features), n_splits)
+    cache = FoldCache(features, target_values, splits, source)
+    workers = workers or os.cpu_count() or 1
+
+    # One pool for the whole search; every worker receives the fold matrices (or their map) once
+    pool = None
+    if workers > 1:
+        shared = cache if source is not None else cache.warm()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared, make_model))
+
+    results = {}
+    try:
+        for algorithm in algorithms:
+            configs = candidate_configs(algorithm, n_candidates, (base_params or {}).get(algorithm), random_state)
+            for target in targets:
+                params, scores, _ = successive_halving(algorithm, target, cache, make_model, configs, eta,
+                                                       pool=pool if len(configs) > 1 else None)
+                results[(algorithm, target)] = (params, scores)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
@@ -0,0 +1,245 @@
+"""
+🔁 Online Model Updates
+Company Sales Data - Incremental Refits of the Deployed Models
+
+Run with:  python -m sales_analytics.online [--dry-run]
+
+Folds the actuals that arrived since the deployment was trained into the deployed
+models and publishes them as a new artifact version:
+    XGB  continues boosting from the deployed booster for a few rounds on the new rows
+    RF   grows additional trees on the new rows (oldest trees retire past a cap)
+    LR   exact recursive least-squares update of the coefficients
+SVR has no incremental form and keeps its deployed artifact until the next full retrain.
+"""
+
+import argparse
+import copy
+import json
+import os
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+try:
+    import xgboost as xgb
+except ImportError:  # pragma: no cover - XGB models are skipped without it
+    xgb = None
+
+from .artifacts import export_artifact
+from .config import DATA_PATH, MODELS_DIR, SCALED_ALGORITHMS
+from .data_store import SALES_COLUMNS, SEQUENCE_COLUMN, get_store
+from .feature_cache import get_feature_cache
+from .features import FEATURE_COLUMNS, MA_WINDOW, engineer_features
+from .train import TRAIN_FRACTION, atomic_dump, atomic_write_json, new_version
+
+# Boosting rounds added to an XGB model per update
+XGB_ROUNDS_PER_UPDATE = 10
+
+# Trees added to an RF model per update, and the most it may grow to
+RF_TREES_PER_UPDATE = 10
+RF_MAX_TREES = 300
+
+# Ridge term of the initial least-squares precision (features are standardized)
+LR_RIDGE = 1.0
+
+ONLINE_ALGORITHMS = {'LR', 'RF', 'XGB'}
+
+
+def _with_current_params(model):
+    """Copy of `model` with constructor parameters added since it was pickled set to their defaults.
+
+    sklearn refuses to refit estimators unpickled from older releases otherwise.
+    """
+    model = copy.deepcopy(model)
+    # Ensembles also clone their template estimator (and keep the fitted members)
+    parts = [model, getattr(model, 'estimator_', None)] + list(getattr(model, 'estimators_', []))
+    for part in parts:
+        if part is None:
+            continue
+        for name, value in type(part)().get_params(deep=False).items():
+            if not hasattr(part, name):
+                setattr(part, name, value)
+    return model
+
+
+def update_xgb(model, X, y, rounds=XGB_ROUNDS_PER_UPDATE):
+    """Copy of an XGBRegressor whose booster continues for `rounds` rounds on (X, y).
+
+    Uses the native training API: continuing through the sklearn wrapper re-derives the
+    intercept from the new rows and shifts the existing ensemble.
+    """
+    updated = _with_current_params(model)
+    params = updated.get_xgb_params()
+    params.pop('n_estimators', None)
+    booster = xgb.train(params, xgb.DMatrix(X, label=y), num_boost_round=rounds,
+                        xgb_model=model.get_booster().copy())
+    updated.load_model(bytearray(booster.save_raw()))
+    updated.set_params(n_estimators=booster.num_boosted_rounds())
+    return updated
+
+
+def update_random_forest(model, X, y, trees=RF_TREES_PER_UPDATE, max_trees=RF_MAX_TREES):
+    """Copy of the forest with `trees` more trees fitted on (X, y); the oldest retire past `max_trees`."""
+    updated = _with_current_params(model)
+    updated.set_params(warm_start=True, n_estimators=len(model.estimators_) + trees)
+    updated.fit(X, y)
+    if len(updated.estimators_) > max_trees:
+        updated.estimators_ = updated.estimators_[-max_trees:]
+    updated.set_params(warm_start=False, n_estimators=len(updated.estimators_))
+    return updated
+
+
+def _augment(X):
+    X = np.asarray(X, dtype=np.float64)
+    return np.column_stack([X, np.ones(len(X))])
+
+
+def update_linear(model, X, y, history=None, ridge=LR_RIDGE):
+    """Copy of a LinearRegression updated by block recursive least squares.
+
+    The inverse Gram matrix of everything seen so far is kept on the model
+    (`online_precision_`), so each update costs O(new rows x features²). The first
+    update builds it from `history` (the rows the deployed model was fitted on).
+    """
+    precision = getattr(model, 'online_precision_', None)
+    if precision is None:
+        A = _augment(history) if history is not None else np.empty((0, X.shape[1] + 1))
+        precision = np.linalg.inv(A.T @ A + ridge * np.eye(A.shape[1]))
+
+    A = _augment(X)
+    theta = np.append(model.coef_, model.intercept_)
+    # Woodbury form of the precision update, then the matching coefficient correction
+    gain = precision @ A.T
+    precision = precision - gain @ np.linalg.solve(np.eye(len(A)) + A @ gain, gain.T)
+    theta = theta + precision @ A.T @ (np.asarray(y, dtype=np.float64) - A @ theta)
+
+    updated = copy.deepcopy(model)
+    updated.coef_ = theta[:-1]
+    updated.intercept_ = theta[-1]
+    updated.online_precision_ = precision
+    return updated
+
+
+def update_model(algorithm, model, X, y, history=None):
+    if algorithm == 'XGB':
+        return update_xgb(model, X, y)
+    if algorithm == 'RF':
+        return update_random_forest(model, X, y)
+    if algorithm == 'LR':
+        return update_linear(model, X, y, history)
+    raise ValueError(f"No online update for {algorithm} models")
+
+
+def new_actuals(store, trained_rows, feature_columns=FEATURE_COLUMNS):
+    """(sales rows with derived columns, feature frame) for rows ingested after the first `trained_rows`.
+
+    Rows are selected by their ingestion sequence number, never by position in the
+    history. Only they and the rows ingested just before them (for their moving
+    averages) are read.
+    """
+    if store.row_count() <= trained_rows:
+        return None, None
+    first = max(trained_rows - (MA_WINDOW - 1), 0)
+    recent = store.read(SALES_COLUMNS + [SEQUENCE_COLUMN], [(SEQUENCE_COLUMN, '>=', first)])
+    df = engineer_features(recent)
+    new = (df[SEQUENCE_COLUMN] >= trained_rows).to_numpy()
+    return df[new].reset_index(drop=True), df.loc[new, feature_columns].reset_index(drop=True)
+
+
+def update_deployment(models_dir=MODELS_DIR, store=None, dry_run=False):
+    """Fold new actuals into every deployed model that supports it and publish the result.
+
+    Updated artifacts get a new version-stamped filename and `deployment_summary.json`
+    is replaced atomically last, so running services (which poll it) switch over
+    between requests. Returns a report dict per target.
+    """
+    store = store or get_store()
+    with open(os.path.join(models_dir, 'deployment_summary.json'), 'r') as f:
+        summary = json.load(f)
+    with open(os.path.join(models_dir, 'feature_info.json'), 'r') as f:
+        feature_columns = json.load(f)['feature_columns']
+
+    # Deployments from the notebook predate row tracking. They were fitted on the first
+    # TRAIN_FRACTION of the CSV months after the first one, which the notebook dropped
+    trained_rows = summary.get('trained_rows')
+    if trained_rows is None:
+        trained_rows = 1 + int((len(pd.read_csv(DATA_PATH, usecols=[0])) - 1) * TRAIN_FRACTION)
+
+    rows, X = new_actuals(store, trained_rows, feature_columns)
+    if X is None:
+        return {}
+
+    scaler = joblib.load(os.path.join(models_dir, os.path.basename(summary['feature_scaler'])))
+    X_scaled = pd.DataFrame(scaler.transform(X), columns=feature_columns)
+    history = None
+
+    version = new_version()
+    report = {}
+    for target, info in summary['best_models'].items():
+        algorithm = info['algorithm']
+        if algorithm not in ONLINE_ALGORITHMS:
+            report[target] = {'algorithm': algorithm, 'status': 'skipped (no incremental update)'}
+            continue
+
+        path = os.path.join(models_dir, os.path.basename(info['filename']))
+        model = joblib.load(path)
+        inputs = X_scaled if algorithm in SCALED_ALGORITHMS else X
+        y = rows[target].to_numpy(dtype=np.float64)
+
+        if algorithm == 'LR' and getattr(model, 'online_precision_', None) is None and history is None:
+            # Rows the linear models were fitted on (trailing features never depend on later rows)
+            past = get_feature_cache().get(store).frame()[feature_columns].iloc[:trained_rows]
+            history = scaler.transform(past.astype(np.float64))
+
+        start = time.perf_counter()
+        # Scored before the update: an honest out-of-sample check on the new rows
+        before = float(np.sqrt(np.mean((model.predict(inputs) - y) ** 2)))
+        updated = update_model(algorithm, model, inputs, y, history)
+        after = float(np.sqrt(np.mean((updated.predict(inputs) - y) ** 2)))
+        report[target] = {'algorithm': algorithm, 'status': 'updated', 'rows': len(y),
+                          'rmse_before': before, 'rmse_after': after,
+                          'update_ms': (time.perf_counter() - start) * 1000}
+        if dry_run:
+            continue
+
+        stem = os.path.basename(info['filename']).split('.joblib')[0].split('-')[0]
+        filename = f'{stem}-{version}.joblib'
+        atomic_dump(updated, os.path.join(models_dir, filename))
+        info['filename'] = f'{os.path.dirname(info["filename"])}/{filename}'.lstrip('/')
+        info['compact_filename'] = export_artifact(updated, models_dir, info['filename'])
+        info['online_updates'] = info.get('online_updates', 0) + 1
+        info['online_rmse'] = before
+
+    if not dry_run:
+        summary['version'] = version
+        summary['updated_date'] = datetime.now().isoformat()
+        summary['trained_rows'] = trained_rows + len(X)
+        atomic_write_json(summary, os.path.join(models_dir, 'deployment_summary.json'))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fold new sales actuals into the deployed models')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--dry-run', action='store_true', help='report the update without publishing it')
+    args = parser.parse_args(argv)
+
+    report = update_deployment(args.models_dir, dry_run=args.dry_run)
+    if not report:
+        print('✅ Deployed models are up to date')
+        return
+    for target, entry in report.items():
+        if entry['status'] != 'updated':
+            print(f'   {target:<16} {entry["algorithm"]:<4} {entry["status"]}')
+            continue
+        print(f'   {target:<16} {entry["algorithm"]:<4} +{entry["rows"]} rows in {entry["update_ms"]:.0f} ms   '
+              f'RMSE on new rows {entry["rmse_before"]:.2f} -> {entry["rmse_after"]:.2f}')
+    if not args.dry_run:
+        print(f'🔁 Published to {args.models_dir}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+"""
+🔮 Batch Prediction Engine
+Company Sales Data - Vectorized Scenario Scoring
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .attribution import explainer_for
+from .cache import feature_row_keys
+from .config import MODEL_MEMORY_BUDGET_MB, MODELS_DIR, PREDICTION_WORKERS, SCALED_ALGORITHMS
+from .features import build_feature_matrix, normalize_scenarios
+from .intervals import DEFAULT_LEVEL, TREE_QUANTILE_ALGORITHMS, calibrated_half_width, compiled_forest, tree_interval
+from .registry import ModelRegistry
+
+
+class BatchPredictor:
+    """Scores whole scenario tables against every deployed target model."""
+
+    def __init__(self, models, scaler, feature_columns, algorithms, rolling_state=None,
+                 max_workers=PREDICTION_WORKERS, cache=None):
+        self.models = models
+        self.scaler = scaler
+        self.feature_columns = list(feature_columns)
+        self.algorithms = dict(algorithms)
+        # Optional RollingWindowStore supplying real _ma3 values for scenarios without them
+        self.rolling_state = rolling_state
+        # Optional PredictionCache consulted before any scaling or inference
+        self.cache = cache
+        self.max_workers = max_workers or len(self.algorithms)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # target -> (model key, attribution explainer) of the model last explained
+        self._explainers = {}
+        # target -> (model key, compiled forest or None) used for per-tree intervals
+        self._forests = {}
+
+    @property
+    def targets(self):
+        return list(self.algorithms)
+
+    def _pool(self):
+        # Created on first parallel call and reused afterwards
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='predict')
+            return self._executor
+
+    def refresh(self):
+        """Switch to a newly published deployment when the models come from a registry.
+
+        Cached predictions need no flushing: the model keys they are stored under carry
+        each artifact's filename and version.
+        """
+        if not hasattr(self.models, 'refresh'):
+            return []
+        changed = self.models.refresh()
+        if changed:
+            self.scaler = self.models.scaler()
+            self.feature_columns = list(self.models.feature_columns)
+            self.algorithms = dict(self.models.algorithms)
+        return changed
+
+    def model_key(self, target):
+        if hasattr(self.models, 'model_key'):
+            return self.models.model_key(target)
+        return f'{target}:{self.algorithms[target]}'
+
+    def _predict_target(self, target, raw, scaled, rows=None):
+        inputs = scaled if self.algorithms[target] in SCALED_ALGORITHMS else raw
+        if rows is not None:
+            inputs = inputs.iloc[rows]
+        return np.asarray(self.models[target].predict(inputs), dtype=np.float64)
+
+    def predict_matrix(self, features, targets=None, parallel=False, use_cache=True):
+        """Predict from an already engineered (unscaled) feature matrix.
+
+        With `parallel=True` the per-target models run concurrently on a shared thread
+        pool; the raw and scaled matrices are built once and shared read-only.
+        `use_cache=False` bypasses the prediction cache (e.g. for throwaway search candidates).
+        """
+        targets = self.targets if targets is None else list(targets)
+        unknown = [t for t in targets if t not in self.algorithms]
+        if unknown:
+            raise ValueError(f"Unknown prediction targets: {unknown}")
+
+        features = np.asarray(features, dtype=np.float64)
+        n_rows = len(features)
+        predictions = {target: np.empty(n_rows) for target in targets}
+        # Row positions each target still has to compute (None = every row)
+        pending = dict.fromkeys(targets)
+
+        row_keys = None
+        if use_cache and self.cache is not None and n_rows:
+            row_keys = feature_row_keys(features)
+            for target in targets:
+                values, hit = self.cache.get_many(self.model_key(target), row_keys)
+                predictions[target][hit] = values[hit]
+                pending[target] = None if not hit.any() else np.flatnonzero(~hit)
+
+        to_compute = [t for t in targets if pending[t] is None or len(pending[t])]
+        if not to_compute:
+            return pd.DataFrame(predictions)
+
+        # Only rows missed by at least one target are scaled and scored
+        if all(pending[t] is None for t in to_compute):
+            needed = None
+        else:
+            needed = np.unique(np.concatenate([
+                np.arange(n_rows) if pending[t] is None else pending[t] for t in to_compute
+            ]))
+        subset = features if needed is None else features[needed]
+
+        # Models were fitted with feature names, so keep them attached
+        raw = pd.DataFrame(subset, columns=self.feature_columns)
+        scaled = None
+        if any(self.algorithms[t] in SCALED_ALGORITHMS for t in to_compute):
+            # One transform call for the whole batch, shared by every linear model
+            scaled = pd.DataFrame(self.scaler.transform(raw), columns=self.feature_columns)
+
+        def rows_for(target):
+            if needed is None or pending[target] is None or len(pending[target]) == len(needed):
+                return None
+            return np.searchsorted(needed, pending[target])
+
+        if parallel and len(to_compute) > 1:
+            pool = self._pool()
+            futures = {t: pool.submit(self._predict_target, t, raw, scaled, rows_for(t)) for t in to_compute}
+            computed = {t: future.result() for t, future in futures.items()}
+        else:
+            computed = {t: self._predict_target(t, raw, scaled, rows_for(t)) for t in to_compute}
+
+        for target, values in computed.items():
+            rows = pending[target]
+            if rows is None:
+                predictions[target] = values
+            else:
+                predictions[target][rows] = values
+            if row_keys is not None:
+                keys = row_keys if rows is None else [row_keys[i] for i in rows]
+                self.cache.put_many(self.model_key(target), keys, values)
+
+        return pd.DataFrame(predictions)
+
+    def predict(self, scenarios, targets=None, parallel=False, use_cache=True):
+        """Predict every requested target for an N-row scenario table."""
+        scenarios = normalize_scenarios(scenarios)
+        if self.rolling_state is not None:
+            scenarios = self.rolling_state.fill_moving_averages(scenarios)
+
+        features = build_feature_matrix(scenarios, self.feature_columns)
+        predictions = self.predict_matrix(features, targets, parallel=parallel, use_cache=use_cache)
+        predictions.index = scenarios.index
+        return predictions
+
+    def _forest(self, target):
+        if self.algorithms[target] not in TREE_QUANTILE_ALGORITHMS:
+            return None
+        key = self.model_key(target)
+        cached = self._forests.get(target)
+        if cached is None or cached[0] != key:
+            cached = (key, compiled_forest(self.models[target]))
+            self._forests[target] = cached
+        return cached[1]
+
+    def interval_method(self, target, level=DEFAULT_LEVEL):
+        """How `target`'s intervals are formed: 'tree quantiles', 'conformal', 'normal' or 'unavailable'."""
+        if self._forest(target) is not None:
+            return 'tree quantiles'
+        return self._half_width(target, level)[1]
+
+    def _half_width(self, target, level):
+        deployment = getattr(self.models, 'deployment_info', None) or {}
+        return calibrated_half_width(deployment.get('best_models', {}).get(target, {}), level)
+
+    def _interval_target(self, target, raw, scaled, level, rows=None):
+        forest = self._forest(target)
+        if forest is not None:
+            # Mean and bounds share one traversal of the compiled forest
+            inputs = raw.to_numpy(dtype=np.float32)
+            return tree_interval(forest, inputs if rows is None else inputs[rows], level)
+        predictions = self._predict_target(target, raw, scaled, rows)
+        half_width, _ = self._half_width(target, level)
+        return predictions, predictions - half_width, predictions + half_width
+
+    def _interval_keys(self, target, level):
+        # The point prediction shares predict_matrix's entry; each bound is cached per level
+        key = self.model_key(target)
+        return key, f'{key}|lower@{level:g}', f'{key}|upper@{level:g}'
+
+    def predict_intervals_matrix(self, features, targets=None, level=DEFAULT_LEVEL, parallel=False, use_cache=True):
+        """Point predictions with `level` prediction intervals from an engineered (unscaled) matrix.
+
+        Returns a frame with `<target>`, `<target>_lower` and `<target>_upper` columns.
+        Forest targets take per-tree quantiles from the traversal that yields their mean;
+        the others add calibrated half-widths to their single prediction pass. Rows whose
+        prediction and bounds are all in the prediction cache are not scored again.
+        """
+        targets = self.targets if targets is None else list(targets)
+        unknown = [t for t in targets if t not in self.algorithms]
+        if unknown:
+            raise ValueError(f"Unknown prediction targets: {unknown}")
+
+        features = np.asarray(features, dtype=np.float64)
+        n_rows = len(features)
+        values = {target: np.empty((3, n_rows)) for target in targets}
+        # Row positions each target still has to compute (None = every row)
+        pending = dict.fromkeys(targets)
+
+        row_keys = None
+        if use_cache and self.cache is not None and n_rows:
+            row_keys = feature_row_keys(features)
+            for target in targets:
+                hit = np.ones(n_rows, dtype=bool)
+                for i, key in enumerate(self._interval_keys(target, level)):
+                    values[target][i], found = self.cache.get_many(key, row_keys)
+                    hit &= found
+                pending[target] = None if not hit.any() else np.flatnonzero(~hit)
+
+        to_compute = [t for t in targets if pending[t] is None or len(pending[t])]
+        if to_compute:
+            raw = pd.DataFrame(features, columns=self.feature_columns)
+            scaled = None
+            if any(self.algorithms[t] in SCALED_ALGORITHMS for t in to_compute):
+                scaled = pd.DataFrame(self.scaler.transform(raw), columns=self.feature_columns)
+
+            if parallel and len(to_compute) > 1:
+                pool = self._pool()
+                futures = {t: pool.submit(self._interval_target, t, raw, scaled, level, pending[t]) for t in to_compute}
+                computed = {t: future.result() for t, future in futures.items()}
+            else:
+                computed = {t: self._interval_target(t, raw, scaled, level, pending[t]) for t in to_compute}
+
+            for target, bands in computed.items():
+                rows = pending[target]
+                if rows is None:
+                    values[target] = np.vstack(bands)
+                else:
+                    values[target][:, rows] = np.vstack(bands)
+                if row_keys is not None:
+                    keys = row_keys if rows is None else [row_keys[i] for i in rows]
+                    for key, band in zip(self._interval_keys(target, level), bands):
+                        self.cache.put_many(key, keys, band)
+
+        columns = {}
+        for target in targets:
+            predictions, lower, upper = values[target]
+            columns.update({target: predictions, f'{target}_lower': lower, f'{target}_upper': upper})
+        return pd.DataFrame(columns)
+
+    def predict_intervals(self, scenarios, targets=None, level=DEFAULT_LEVEL, parallel=False, use_cache=True):
+        """Predictions with prediction intervals for an N-row scenario table (see `predict_intervals_matrix`)."""
+        scenarios = normalize_scenarios(scenarios)
+        if self.rolling_state is not None:
+            scenarios = self.rolling_state.fill_moving_averages(scenarios)
+
+        features = build_feature_matrix(scenarios, self.feature_columns)
+        predictions = self.predict_intervals_matrix(features, targets, level, parallel=parallel, use_cache=use_cache)
+        predictions.index = scenarios.index
+        return predictions
+
+    def explainer(self, target):
+        """Attribution explainer of the model currently serving `target` (built once per model version)."""
+        key = self.model_key(target)
+        cached = self._explainers.get(target)
+        if cached is None or cached[0] != key:
+            cached = (key, explainer_for(self.models[target]))
+            self._explainers[target] = cached
+        return cached[1]
+
+    def explain_matrix(self, features, target):
+        """Exact per-row feature contributions of `target` for an engineered (unscaled) matrix.
+
+        Returns (contributions frame in feature_columns order, expected value); every row
+        sums to its prediction minus the expected value. Contributions of scaled models
+        are per input feature, in target units.
+        """
+        if target not in self.algorithms:
+            raise ValueError(f"Unknown prediction target: {target!r}")
+        features = np.asarray(features, dtype=np.float64)
+        inputs = features
+        if self.algorithms[target] in SCALED_ALGORITHMS:
+            inputs = self.scaler.transform(pd.DataFrame(features, columns=self.feature_columns))
+        explainer = self.explainer(target)
+        contributions = pd.DataFrame(explainer.shap_values(inputs), columns=self.feature_columns)
+        return contributions, explainer.expected_value
+
+    def explain(self, scenarios, target):
+        """Per-scenario feature contributions of `target` (see `explain_matrix`)."""
+        scenarios = normalize_scenarios(scenarios)
+        if self.rolling_state is not None:
+            scenarios = self.rolling_state.fill_moving_averages(scenarios)
+
+        features = build_feature_matrix(scenarios, self.feature_columns)
+        contributions, expected_value = self.explain_matrix(features, target)
+        contributions.index = scenarios.index
+        return contributions, expected_value
+
+    def predict_all(self, scenarios):
+        """Score every deployed target in one pass and return the scenarios with a
+        `predicted_<target>` column per model."""
+        predictions = self.predict(scenarios, parallel=True)
+        return pd.concat([scenarios, predictions.add_prefix('predicted_')], axis=1)
+
+
+def load_predictor(models_dir=MODELS_DIR, rolling_state=None, memory_budget_mb=MODEL_MEMORY_BUDGET_MB, cache=None):
+    """Predictor over the deployed models; each model is loaded on first use by the registry."""
+    registry = ModelRegistry(models_dir, memory_budget_mb=memory_budget_mb)
+    return BatchPredictor(registry, registry.scaler(), registry.feature_columns, registry.algorithms,
+                          rolling_state, cache=cache)
@@ -0,0 +1,263 @@
+"""
+🧩 Hierarchical Reconciliation
+Company Sales Data - Coherent Product & Total Forecasts
+
+`total_units` and the per-product forecasts come from independent models, so their
+outputs do not add up. Reconciliation maps the base forecasts of every node of a
+hierarchy onto forecasts that do:
+
+    bottom_up    aggregates the bottom-level forecasts
+    top_down     splits the top forecast by historical bottom-level proportions
+    ols          least-squares projection onto the coherent subspace
+    wls_struct   weighted by the number of bottom series under each node
+    wls_var      weighted by each node's base-forecast error variance (MinT, diagonal)
+    mint_shrink  MinT with the shrunk error covariance of Wickramasuriya et al.
+
+MinT variants use the constraint form y~ = y^ - W C' (C W C')^-1 C y^, where C = [I, -A]
+states that every aggregate equals the sum of its bottoms. The solve is over aggregate
+nodes only (a product x store hierarchy has far fewer aggregates than bottoms), C stays
+sparse, and the shrunk covariance is applied through its low-rank residual factor, so
+thousands of nodes and whole batches of forecast rows reconcile in a few matrix products.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+from .config import PRODUCT_COLS
+from .features import MA_WINDOW, build_feature_frame, rolling_means
+from .model_selection import FoldCache, fold_predictions, walk_forward_residuals, walk_forward_splits
+from .train import CV_SPLITS, make_model
+
+RECONCILIATION_METHODS = ('bottom_up', 'top_down', 'ols', 'wls_struct', 'wls_var', 'mint_shrink')
+
+# Methods that need base-forecast residuals
+RESIDUAL_METHODS = {'wls_var', 'mint_shrink'}
+
+
+class Hierarchy:
+    """Aggregation structure: node values = S @ bottom values, with S = [A; I].
+
+    Nodes are ordered aggregates first (rows of the sparse 0/1 matrix `aggregate`,
+    aggregates x bottoms), then bottoms.
+    """
+
+    def __init__(self, aggregate, aggregate_names, bottom_names):
+        self.aggregate = sparse.csr_matrix(aggregate, dtype=np.float64)
+        self.nodes = list(aggregate_names) + list(bottom_names)
+        self.n_aggregate, self.n_bottom = self.aggregate.shape
+        if len(self.nodes) != self.n_aggregate + self.n_bottom:
+            raise ValueError("Node names do not match the aggregation matrix")
+
+    @classmethod
+    def from_levels(cls, bottom, levels, total_name='total'):
+        """Hierarchy over the bottom series labelled by the rows of frame `bottom`.
+
+        `levels` lists the label-column groupings that get aggregate nodes; `()` is the
+        grand total. E.g. levels [(), ('store',), ('product',)] over (store, product)
+        bottoms adds a total, one node per store and one per product.
+        """
+        label_cols = list(bottom.columns)
+        bottom_names = bottom.astype(str).agg('/'.join, axis=1).tolist()
+        rows, names = [], []
+        for level in levels:
+            level = list(level)
+            if not level:
+                codes, labels = np.zeros(len(bottom), dtype=np.int64), [total_name]
+            else:
+                grouped = bottom.groupby(level, sort=False)
+                codes = grouped.ngroup().to_numpy()
+                keys = grouped.size().index
+                labels = ['/'.join(f'{col}={value}' for col, value in zip(level, np.atleast_1d(key)))
+                          for key in keys]
+            rows.append(codes + len(names))
+            names.extend(labels)
+        if len(label_cols) == 1:
+            bottom_names = bottom[label_cols[0]].astype(str).tolist()
+
+        row = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        column = np.tile(np.arange(len(bottom)), len(rows))
+        aggregate = sparse.csr_matrix((np.ones(len(row)), (row, column)), shape=(len(names), len(bottom)))
+        return cls(aggregate, names, bottom_names)
+
+    @property
+    def n_nodes(self):
+        return self.n_aggregate + self.n_bottom
+
+    @property
+    def summing_matrix(self):
+        return sparse.vstack([self.aggregate, sparse.identity(self.n_bottom, format='csr')]).tocsr()
+
+    @property
+    def constraints(self):
+        """C = [I, -A]; C @ y == 0 exactly for coherent node values y."""
+        return sparse.hstack([sparse.identity(self.n_aggregate, format='csr'), -self.aggregate]).tocsr()
+
+    def aggregate_bottoms(self, bottoms):
+        """(batch, nodes) coherent values from (batch, bottoms) bottom values."""
+        bottoms = np.asarray(bottoms, dtype=np.float64)
+        return np.hstack([(self.aggregate @ bottoms.T).T, bottoms])
+
+    def incoherence(self, values):
+        """(batch, aggregates) amount by which each aggregate misses the sum of its bottoms."""
+        return (self.constraints @ np.asarray(values, dtype=np.float64).T).T
+
+
+def product_hierarchy(products=PRODUCT_COLS, total='total_units'):
+    """Two-level hierarchy: `total` over the product unit series."""
+    return Hierarchy.from_levels(pd.DataFrame({'product': list(products)}), [()], total_name=total)
+
+
+def historical_proportions(hierarchy, bottom_actuals):
+    """Average share of the grand total held by each bottom series (top-down proportions)."""
+    bottom_actuals = np.asarray(bottom_actuals, dtype=np.float64)
+    totals = bottom_actuals.sum(axis=1, keepdims=True)
+    shares = np.divide(bottom_actuals, totals, out=np.full_like(bottom_actuals, 1 / hierarchy.n_bottom),
+                       where=totals != 0)
+    return shares.mean(axis=0)
+
+
+def shrinkage_intensity(residuals):
+    """Schäfer-Strimmer intensity of shrinking the residual correlation towards the identity.
+
+    Computed from the (T x T) Gram matrix of the standardized residuals, never the
+    (nodes x nodes) correlation matrix itself.
+    """
+    x = np.asarray(residuals, dtype=np.float64)
+    T = len(x)
+    if T < 2:
+        return 1.0
+    scale = np.sqrt((x ** 2).mean(axis=0))
+    xs = x / np.where(scale > 0, scale, 1.0)
+    sq = xs ** 2
+    gram = xs @ xs.T
+    cross_total = (gram ** 2).sum()
+    cross_diag = (sq.sum(axis=0) ** 2).sum()
+
+    # Sum of squared off-diagonal correlations, and of their estimated variances
+    squared_correlations = (cross_total - cross_diag) / T ** 2
+    variances = ((sq.sum(axis=1) ** 2).sum() - (sq ** 2).sum() - (cross_total - cross_diag) / T) / (T * (T - 1))
+    if squared_correlations <= 0:
+        return 1.0
+    return float(np.clip(variances / squared_correlations, 0.0, 1.0))
+
+
+def _error_variances(residuals):
+    variances = (np.asarray(residuals, dtype=np.float64) ** 2).mean(axis=0)
+    # Nodes forecast without error would pin the solution; give them a negligible weight instead
+    floor = variances.max() * 1e-9 if variances.max() > 0 else 1.0
+    return np.maximum(variances, floor)
+
+
+def mint(hierarchy, base, method='mint_shrink', residuals=None):
+    """Minimum-trace style reconciliation of (batch, nodes) base forecasts."""
+    base = np.atleast_2d(np.asarray(base, dtype=np.float64))
+    C = hierarchy.constraints
+    if method == 'ols':
+        weights = np.ones(hierarchy.n_nodes)
+    elif method == 'wls_struct':
+        weights = np.asarray(hierarchy.summing_matrix.sum(axis=1)).ravel()
+    elif method in RESIDUAL_METHODS:
+        if residuals is None:
+            raise ValueError(f"{method} reconciliation needs base-forecast residuals")
+        residuals = np.asarray(residuals, dtype=np.float64)
+        weights = _error_variances(residuals)
+    else:
+        raise ValueError(f"Unknown MinT method {method!r}")
+
+    gap = C @ base.T
+    system = C @ sparse.diags(weights) @ C.T
+    if method == 'mint_shrink':
+        # W = lambda D + (1 - lambda) R'R / T, applied through the residual factor R
+        intensity = shrinkage_intensity(residuals)
+        factor = C @ residuals.T
+        dense = intensity * system.toarray() + (1 - intensity) / len(residuals) * factor @ factor.T
+        correction = np.linalg.solve(dense, gap)
+        back = C.T @ correction
+        adjustment = intensity * weights[:, None] * back + (1 - intensity) / len(residuals) * (
+            residuals.T @ (residuals @ back))
+    else:
+        correction = splu(system.tocsc()).solve(np.asarray(gap))
+        adjustment = weights[:, None] * (C.T @ correction)
+    return base - adjustment.T
+
+
+def reconcile(hierarchy, base, method='mint_shrink', residuals=None, proportions=None):
+    """Coherent (batch, nodes) forecasts from (batch, nodes) base forecasts in `hierarchy.nodes` order."""
+    base = np.atleast_2d(np.asarray(base, dtype=np.float64))
+    if method == 'bottom_up':
+        return hierarchy.aggregate_bottoms(base[:, hierarchy.n_aggregate:])
+    if method == 'top_down':
+        if proportions is None:
+            raise ValueError("top_down reconciliation needs bottom-level proportions")
+        # The first aggregate must be the grand total
+        return hierarchy.aggregate_bottoms(base[:, [0]] * np.asarray(proportions, dtype=np.float64))
+    return mint(hierarchy, base, method, residuals)
+
+
+def _deployed_params(predictor, target):
+    """Hyperparameters the deployed `target` model was trained with (the defaults if not recorded)."""
+    deployment = getattr(predictor.models, 'deployment_info', None) or {}
+    return deployment.get('best_models', {}).get(target, {}).get('params') or {}
+
+
+def product_residuals(predictor, history, hierarchy=None, n_splits=CV_SPLITS):
+    """(months, nodes) out-of-sample one-step residuals of the base forecasts behind every product-hierarchy node.
+
+    Nodes with a deployed model refit that model's algorithm and hyperparameters on each
+    walk-forward fold and are scored on the months after it, so no residual comes from a
+    month the model was fitted on. The other products use the trailing-mean projection of
+    `RecursiveForecaster` (the mean of the preceding months), which never sees the month
+    it forecasts. Only the months covered by the walk-forward test windows are returned.
+    """
+    hierarchy = hierarchy or product_hierarchy()
+    history = history.reset_index(drop=True)
+    scored = [node for node in hierarchy.nodes if node in predictor.targets]
+    splits = walk_forward_splits(len(history), max(min(n_splits, len(history) - 2), 1))
+    first = splits[0][1].start
+
+    oof = {}
+    if scored:
+        features = build_feature_frame(history)[predictor.feature_columns].to_numpy()
+        cache = FoldCache(features, {node: history[node].to_numpy(dtype=np.float64) for node in scored}, splits)
+        for node in scored:
+            algorithm = predictor.algorithms[node]
+            predictions = fold_predictions(algorithm, _deployed_params(predictor, node), node, cache,
+                                           range(len(cache)), make_model)
+            oof[node] = walk_forward_residuals(predictions, node, cache)
+
+    residuals = np.empty((len(history) - first, hierarchy.n_nodes))
+    products = history[PRODUCT_COLS].to_numpy(dtype=np.float64)
+    previous = np.vstack([np.full((1, len(PRODUCT_COLS)), np.nan), rolling_means(products, MA_WINDOW)[:-1]])
+    for i, node in enumerate(hierarchy.nodes):
+        if node in oof:
+            residuals[:, i] = oof[node]
+        else:
+            actual = history[node].to_numpy(dtype=np.float64)
+            residuals[:, i] = (actual - previous[:, PRODUCT_COLS.index(node)])[first:]
+    return residuals
+
+
+def reconcile_forecast(forecast, method, hierarchy=None, residuals=None, proportions=None):
+    """Copy of a `RecursiveForecaster` frame whose `total_units` equals the sum of its product units.
+
+    Product targets (e.g. `facecream`) take their reconciled units. The `total_profit`
+    model's forecast is kept and scaled by the ratio of reconciled to base `total_units`,
+    so the profit it forecasts per unit is unchanged.
+    """
+    hierarchy = hierarchy or product_hierarchy()
+    columns = [node if node not in PRODUCT_COLS else f'{node}_units' for node in hierarchy.nodes]
+    coherent = reconcile(hierarchy, forecast[columns].to_numpy(), method, residuals, proportions)
+
+    reconciled = forecast.copy()
+    reconciled[columns] = coherent
+    for node in hierarchy.nodes:
+        if node in PRODUCT_COLS and node in reconciled.columns:
+            reconciled[node] = reconciled[f'{node}_units']
+    if {'total_profit', 'total_units'} <= set(reconciled.columns):
+        base_units = forecast['total_units'].to_numpy(dtype=np.float64)
+        ratio = np.divide(reconciled['total_units'].to_numpy(dtype=np.float64), base_units,
+                          out=np.ones_like(base_units), where=base_units != 0)
+        reconciled['total_profit'] = forecast['total_profit'].to_numpy(dtype=np.float64) * ratio
+    return reconciled
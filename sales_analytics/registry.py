@@ -0,0 +1,287 @@
+"""
+🗂️ Model Registry
+Company Sales Data - Lazy, Memory-Budgeted Artifact Loading
+"""
+
+import json
+import mmap
+import os
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from . import artifacts
+from .config import MODEL_MEMORY_BUDGET_MB, MODELS_DIR
+from .tree_engine import AcceleratedTreeModel, CompiledTreeEnsemble, accelerate
+
+
+def _is_mapped(array):
+    # Views of a memory map (e.g. arrays sliced out of one artifact file) are mapped too
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+
+def estimate_model_bytes(obj):
+    """Approximate (resident, memory-mapped) bytes held by a fitted model."""
+    seen = set()
+    resident = 0
+    mapped = 0
+    stack = [obj]
+
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+
+        if isinstance(item, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+            continue
+        elif isinstance(item, np.ndarray) and _is_mapped(item):
+            mapped += item.nbytes
+        elif isinstance(item, np.ndarray):
+            if item.dtype == object:
+                stack.extend(item.ravel())
+            else:
+                resident += item.nbytes
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set)):
+            stack.extend(item)
+        elif isinstance(item, AcceleratedTreeModel):
+            # Its own fields only; attribute probes would unpickle a deferred native model
+            stack.extend(vars(item).values())
+        elif hasattr(item, 'save_raw'):
+            # XGBoost booster: the serialized model is a close proxy for its footprint
+            resident += len(item.save_raw())
+        elif type(item).__name__ == 'Tree' and hasattr(item, '__getstate__'):
+            # sklearn trees keep their node arrays outside __dict__
+            stack.extend(item.__getstate__().values())
+        elif hasattr(item, '__dict__'):
+            stack.extend(vars(item).values())
+        else:
+            resident += sys.getsizeof(item)
+
+    return resident, mapped
+
+
+class ModelRegistry:
+    """Loads deployed models on first use and evicts the least recently used ones
+    once their resident size exceeds the memory budget.
+
+    Behaves like a read-only mapping of target name -> fitted model, so it can be
+    handed to BatchPredictor in place of a plain dict. With `compact` (the default)
+    artifacts exported by `sales_analytics.artifacts` are served instead of the
+    joblib pickles wherever the deployment lists one.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, memory_budget_mb=MODEL_MEMORY_BUDGET_MB, mmap_mode='r', compiled=True,
+                 compact=True):
+        self.models_dir = models_dir
+        # Wrap RF/XGB models with the compiled tree-ensemble inference path
+        self.compiled = compiled
+        self.compact = compact
+        self.memory_budget_bytes = None if memory_budget_mb is None else int(memory_budget_mb * 1024 * 1024)
+        self.mmap_mode = mmap_mode
+
+        self._read_deployment()
+
+        self._loaded = OrderedDict()
+        self._versions = {}
+        self._scaler = None
+        self._lock = threading.RLock()
+        self.stats = {
+            target: {'loads': 0, 'hits': 0, 'evictions': 0, 'load_time_ms': None,
+                     'resident_bytes': 0, 'mapped_bytes': 0}
+            for target in self.targets
+        }
+
+    def _read_deployment(self):
+        summary_path = os.path.join(self.models_dir, 'deployment_summary.json')
+        stat = os.stat(summary_path)
+        with open(summary_path, 'r') as f:
+            self.deployment_info = json.load(f)
+
+        with open(os.path.join(self.models_dir, 'feature_info.json'), 'r') as f:
+            self.feature_info = json.load(f)
+        self._summary_signature = (stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self):
+        """Pick up a newly published deployment; returns the targets whose artifact changed.
+
+        Models of unchanged targets stay loaded. Changed ones are dropped and load from
+        their new artifact on next use, so a publish never interrupts serving.
+        """
+        stat = os.stat(os.path.join(self.models_dir, 'deployment_summary.json'))
+        if (stat.st_mtime_ns, stat.st_size) == self._summary_signature:
+            return []
+
+        with self._lock:
+            previous = self.deployment_info
+            self._read_deployment()
+            changed = [target for target, info in self.deployment_info['best_models'].items()
+                       if previous['best_models'].get(target) != info]
+            for target in list(self._loaded):
+                if target in changed or target not in self:
+                    del self._loaded[target]
+            for target in changed:
+                self._versions.pop(target, None)
+                self.stats.setdefault(target, {'loads': 0, 'hits': 0, 'evictions': 0, 'load_time_ms': None,
+                                               'resident_bytes': 0, 'mapped_bytes': 0})
+            if self._scaler_filename(previous) != self._scaler_filename(self.deployment_info):
+                self._scaler = None
+        return changed
+
+    @property
+    def targets(self):
+        return list(self.deployment_info['best_models'])
+
+    @property
+    def algorithms(self):
+        return {target: info['algorithm'] for target, info in self.deployment_info['best_models'].items()}
+
+    @property
+    def feature_columns(self):
+        return self.feature_info['feature_columns']
+
+    def _artifact_filename(self, info, key, compact_key):
+        if self.compact and info.get(compact_key):
+            return os.path.basename(info[compact_key])
+        return os.path.basename(info[key])
+
+    def _scaler_filename(self, deployment_info):
+        return self._artifact_filename(deployment_info, 'feature_scaler', 'feature_scaler_compact')
+
+    def artifact_path(self, target):
+        """File the target's model is served from (its compact artifact when there is one)."""
+        info = self.deployment_info['best_models'][target]
+        return os.path.join(self.models_dir, self._artifact_filename(info, 'filename', 'compact_filename'))
+
+    def artifact_version(self, target):
+        """Token that changes whenever the target's artifact file is replaced."""
+        # Under the lock, so a concurrent refresh cannot pair a new deployment with a stale version
+        with self._lock:
+            version = self._versions.get(target)
+            if version is None:
+                stat = os.stat(self.artifact_path(target))
+                version = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+                self._versions[target] = version
+            return version
+
+    def model_key(self, target):
+        """Identity of the model serving `target` (algorithm, artifact and its version)."""
+        with self._lock:
+            filename = os.path.basename(self.artifact_path(target))
+            return f'{target}:{self.algorithms[target]}:{filename}:{self.artifact_version(target)}'
+
+    def __contains__(self, target):
+        return target in self.deployment_info['best_models']
+
+    def __iter__(self):
+        return iter(self.targets)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __getitem__(self, target):
+        return self.get(target)
+
+    def get(self, target):
+        if target not in self:
+            raise KeyError(f"No deployed model for target '{target}'")
+
+        with self._lock:
+            if target in self._loaded:
+                self._loaded.move_to_end(target)
+                self.stats[target]['hits'] += 1
+                return self._loaded[target]
+
+            start = time.perf_counter()
+            self._versions.pop(target, None)
+            path = self.artifact_path(target)
+            if path.endswith(artifacts.COMPACT_SUFFIX):
+                # Already the compiled form for tree ensembles
+                model = artifacts.load(path)
+                if self.compiled and isinstance(model, CompiledTreeEnsemble):
+                    model = self._with_native(target, model)
+            else:
+                model = joblib.load(path, mmap_mode=self.mmap_mode)
+                if self.compiled:
+                    model = accelerate(model)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            resident, mapped = estimate_model_bytes(model)
+
+            stats = self.stats[target]
+            stats['loads'] += 1
+            stats['load_time_ms'] = elapsed_ms
+            stats['resident_bytes'] = resident
+            stats['mapped_bytes'] = mapped
+
+            self._loaded[target] = model
+            self._evict(keep=target)
+            return model
+
+    def _with_native(self, target, compiled):
+        # Batches above COMPILED_MAX_BATCH still go to the joblib model, unpickled on first need
+        info = self.deployment_info['best_models'][target]
+        native_path = os.path.join(self.models_dir, os.path.basename(info['filename']))
+        if not os.path.exists(native_path):
+            return compiled
+        return AcceleratedTreeModel(lambda: joblib.load(native_path, mmap_mode=self.mmap_mode), compiled)
+
+    def scaler(self):
+        with self._lock:
+            if self._scaler is None:
+                path = os.path.join(self.models_dir, self._scaler_filename(self.deployment_info))
+                if path.endswith(artifacts.COMPACT_SUFFIX):
+                    self._scaler = artifacts.load(path)
+                else:
+                    self._scaler = joblib.load(path, mmap_mode=self.mmap_mode)
+            return self._scaler
+
+    @property
+    def resident_bytes(self):
+        return sum(self.stats[target]['resident_bytes'] for target in self._loaded)
+
+    def _evict(self, keep):
+        if self.memory_budget_bytes is None:
+            return
+        # Least recently used first; the model just requested always stays
+        while self.resident_bytes > self.memory_budget_bytes and len(self._loaded) > 1:
+            target = next(t for t in self._loaded if t != keep)
+            del self._loaded[target]
+            self.stats[target]['evictions'] += 1
+
+    def evict(self, target=None):
+        """Drop one loaded model (or all of them when `target` is None)."""
+        with self._lock:
+            targets = list(self._loaded) if target is None else [target]
+            for name in targets:
+                if self._loaded.pop(name, None) is not None:
+                    self.stats[name]['evictions'] += 1
+
+    def report(self):
+        """Per-model load time, footprint and usage counters."""
+        rows = []
+        for target, algorithm in self.algorithms.items():
+            stats = self.stats[target]
+            rows.append({
+                'target': target,
+                'algorithm': algorithm,
+                'loaded': target in self._loaded,
+                'load_time_ms': stats['load_time_ms'],
+                'resident_kb': stats['resident_bytes'] / 1024,
+                'mapped_kb': stats['mapped_bytes'] / 1024,
+                'loads': stats['loads'],
+                'hits': stats['hits'],
+                'evictions': stats['evictions'],
+            })
+        return pd.DataFrame(rows)
@@ -0,0 +1,162 @@
+"""
+📈 Rolling Window State
+Company Sales Data - Incremental Moving-Average Store
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .config import DATA_PATH, PRODUCT_COLS
+from .data_store import get_store
+from .features import MA_WINDOW
+
+
+class RollingWindowStore:
+    """Per-product ring buffers of the most recent monthly actuals.
+
+    Appending a month and reading the trailing means are O(window) per product,
+    independent of how much history has been ingested.
+    """
+
+    def __init__(self, window=MA_WINDOW, products=PRODUCT_COLS):
+        self.window = window
+        self.products = list(products)
+        self._buffer = np.zeros((window, len(self.products)))
+        self._head = 0
+        self._count = 0
+        self.last_month = None
+        # Data store version the buffers were last synced to (None = not store-backed)
+        self.version = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, sales_df, window=MA_WINDOW, products=PRODUCT_COLS):
+        """Seed the buffers from the tail of a time-ordered sales history."""
+        store = cls(window, products)
+        store.extend(sales_df.tail(window))
+        return store
+
+    @classmethod
+    def from_csv(cls, path=DATA_PATH, window=MA_WINDOW, products=PRODUCT_COLS):
+        return cls.from_frame(pd.read_csv(path), window, products)
+
+    @classmethod
+    def from_store(cls, store=None, window=MA_WINDOW, products=PRODUCT_COLS):
+        """Seed from the partitioned data store, reading only the trailing months."""
+        store = store or get_store()
+        state = cls(window, products)
+        state.refresh(store)
+        return state
+
+    def refresh(self, store=None):
+        """Re-seed from the store's trailing months if it changed since the last sync.
+
+        Costs one `window`-row read regardless of history size; returns True when
+        the buffers changed.
+        """
+        store = store or get_store()
+        version = store.version
+        if version == self.version:
+            return False
+
+        # Seed a fresh store off to the side; readers see the old window or the new one, never a partial one
+        seeded = type(self).from_frame(store.tail(self.window, ['month_number'] + self.products), self.window,
+                                       self.products)
+        with self._lock:
+            self._buffer, self._head, self._count = seeded._buffer, seeded._head, seeded._count
+            self.last_month = seeded.last_month
+            self.version = version
+        return True
+
+    def __len__(self):
+        return self._count
+
+    def append(self, record):
+        """Push one month of actuals (mapping with the product columns)."""
+        values = np.array([record[product] for product in self.products], dtype=np.float64)
+
+        with self._lock:
+            self._buffer[self._head] = values
+            self._head = (self._head + 1) % self.window
+            self._count = min(self._count + 1, self.window)
+            if 'month_number' in record:
+                self.last_month = int(record['month_number'])
+
+    def extend(self, sales_df):
+        for record in sales_df.to_dict('records'):
+            self.append(record)
+
+    def _recent(self, n):
+        # Most recent `n` rows of the ring buffer (n <= current count)
+        index = (self._head - 1 - np.arange(n)) % self.window
+        return self._buffer[index]
+
+    def means(self):
+        """Trailing mean of the stored actuals per product."""
+        with self._lock:
+            if self._count == 0:
+                raise ValueError("Rolling window store is empty")
+            means = self._recent(self._count).mean(axis=0)
+        return dict(zip(self.products, means))
+
+    def moving_averages_for(self, current):
+        """`_ma3` values for a new month whose own units are `current`.
+
+        Matches the training definition: the window covers the new month plus the
+        preceding `window - 1` actuals. `current` may be a mapping or an (n, products)
+        array of scenarios sharing the same history.
+        """
+        if isinstance(current, dict):
+            current = np.array([current[product] for product in self.products], dtype=np.float64)
+        current = np.asarray(current, dtype=np.float64)
+
+        with self._lock:
+            n_prior = min(self._count, self.window - 1)
+            prior_sum = self._recent(n_prior).sum(axis=0)
+
+        return (prior_sum + current) / (n_prior + 1)
+
+    def fill_moving_averages(self, scenarios):
+        """Add any missing `<product>_ma3` columns to a scenario table from the stored history.
+
+        A table of a single month holds alternatives for that month, and every row is
+        averaged with the stored actuals. A table listing each month once is a planning
+        sequence: rows are chained in month order after the last stored month, each
+        window taking in the rows of the months before it as if they were actuals.
+        Tables mixing both (a month listed twice alongside other months) are ambiguous
+        and must supply their own `_ma3` columns.
+        """
+        missing = [product for product in self.products if f'{product}_ma3' not in scenarios.columns]
+        if not missing or scenarios.empty:
+            return scenarios
+
+        scenarios = scenarios.copy()
+        current = scenarios[self.products].to_numpy(dtype=np.float64)
+        months = scenarios['month'].to_numpy(dtype=np.int64)
+        if len(np.unique(months)) == 1:
+            averages = self.moving_averages_for(current)
+        elif len(np.unique(months)) == len(months):
+            averages = self._chained_averages(months, current)
+        else:
+            raise ValueError("Scenarios spanning several months must list each month once to be chained; "
+                             "supply their `_ma3` columns otherwise")
+        for i, product in enumerate(self.products):
+            if product in missing:
+                scenarios[f'{product}_ma3'] = averages[:, i]
+        return scenarios
+
+    def _chained_averages(self, months, current):
+        # Months ahead of the stored history: the month after `last_month` comes first
+        last = self.last_month if self.last_month is not None else 0
+        order = np.argsort((months - last - 1) % 12, kind='stable')
+        with self._lock:
+            prior = self._recent(min(self._count, self.window - 1))[::-1]
+        series = np.vstack([prior, current[order]])
+
+        averages = np.empty_like(current)
+        for step, row in enumerate(order):
+            stop = len(prior) + step + 1
+            averages[row] = series[max(stop - self.window, 0):stop].mean(axis=0)
+        return averages
@@ -0,0 +1,240 @@
+"""
+🧊 Rollup Cubes
+Company Sales Data - Materialized Aggregates for the EDA Dashboards
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from .config import PRODUCT_COLS
+from .features import SEASONS, SEASON_INDEX_BY_MONTH, quarter_of
+
+# Row-level measures aggregated into every cell
+MEASURES = PRODUCT_COLS + ['total_units', 'total_profit', 'profit_per_unit']
+
+# Dimensions a cube can be rolled up along (all derived from the month cell key)
+DIMENSIONS = ('month_number', 'quarter', 'season', 'year')
+
+
+def _measure_values(sales_df, measures):
+    values = {}
+    for measure in measures:
+        if measure == 'profit_per_unit' and measure not in sales_df.columns:
+            values[measure] = sales_df['total_profit'].to_numpy(np.float64) / sales_df['total_units'].to_numpy(np.float64)
+        else:
+            values[measure] = sales_df[measure].to_numpy(np.float64)
+    return np.column_stack([values[m] for m in measures])
+
+
+class RollupCube:
+    """Per-(year, month) counts, sums and cross-products of every measure.
+
+    All cells are additive, so quarter/season/total rollups, means, variances and the
+    product correlation matrix are answered from at most a few hundred cells whatever
+    the number of raw rows, and appending data only touches the affected cells.
+    Sums and cross-products are taken about a fixed per-measure shift (the first batch
+    mean), which keeps the variance arithmetic stable for large-valued measures.
+    """
+
+    def __init__(self, measures=MEASURES, shift=None):
+        self.measures = list(measures)
+        m = len(self.measures)
+        self.shift = None if shift is None else np.asarray(shift, dtype=np.float64)
+        self.keys = np.empty((0, 2), dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.float64)
+        self.sums = np.empty((0, m))
+        self.cross = np.empty((0, m, m))
+
+    @classmethod
+    def from_frame(cls, sales_df, measures=MEASURES):
+        cube = cls(measures)
+        cube.update(sales_df)
+        return cube
+
+    @property
+    def n_rows(self):
+        return int(self.counts.sum())
+
+    # ---- maintenance -----------------------------------------------------
+
+    def _cell_index(self, keys):
+        """Index of every (year, month) key, adding empty cells for unseen ones."""
+        lookup = {tuple(key): i for i, key in enumerate(self.keys.tolist())}
+        unique = np.unique(keys, axis=0)
+        new = [key for key in unique.tolist() if tuple(key) not in lookup]
+        if new:
+            m = len(self.measures)
+            start = len(self.keys)
+            self.keys = np.vstack([self.keys, np.array(new, dtype=np.int64)])
+            self.counts = np.concatenate([self.counts, np.zeros(len(new))])
+            self.sums = np.vstack([self.sums, np.zeros((len(new), m))])
+            self.cross = np.concatenate([self.cross, np.zeros((len(new), m, m))])
+            lookup.update({tuple(key): start + i for i, key in enumerate(new)})
+        return np.array([lookup[key] for key in map(tuple, keys.tolist())], dtype=np.int64)
+
+    def update(self, sales_df):
+        """Fold new raw rows into the cube (O(rows) once, cells touched only)."""
+        if len(sales_df) == 0:
+            return self
+        values = _measure_values(sales_df, self.measures)
+        if self.shift is None:
+            self.shift = values.mean(axis=0)
+        centered = values - self.shift
+
+        year = sales_df['year'].to_numpy(np.int64) if 'year' in sales_df.columns else np.zeros(len(sales_df), np.int64)
+        month = sales_df['month_number'].to_numpy(np.int64)
+
+        # Group rows by cell first so each cell's cross-product is one matrix product
+        codes, inverse = np.unique(year * 100 + month, return_inverse=True)
+        inverse = inverse.ravel()
+        cell_index = self._cell_index(np.column_stack([codes // 100, codes % 100]))
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[order], np.arange(len(codes) + 1))
+
+        for c, target in enumerate(cell_index):
+            rows = centered[order[bounds[c]:bounds[c + 1]]]
+            self.counts[target] += len(rows)
+            self.sums[target] += rows.sum(axis=0)
+            self.cross[target] += rows.T @ rows
+        return self
+
+    def merge(self, other):
+        """Add another cube's cells (both must share measures and shift)."""
+        if other.measures != self.measures:
+            raise ValueError("Cannot merge rollups over different measures")
+        if self.shift is None:
+            self.shift = other.shift
+        if other.shift is not None and not np.array_equal(other.shift, self.shift):
+            raise ValueError("Cannot merge rollups taken about different shifts")
+        index = self._cell_index(other.keys)
+        np.add.at(self.counts, index, other.counts)
+        np.add.at(self.sums, index, other.sums)
+        np.add.at(self.cross, index, other.cross)
+        return self
+
+    # ---- queries ---------------------------------------------------------
+
+    def _labels(self, dimension):
+        year, month = self.keys[:, 0], self.keys[:, 1]
+        if dimension == 'month_number':
+            return month
+        if dimension == 'year':
+            return year
+        if dimension == 'quarter':
+            return np.array([f'Q{q}' for q in quarter_of(month)])
+        if dimension == 'season':
+            return np.array(SEASONS)[SEASON_INDEX_BY_MONTH[month]]
+        raise ValueError(f"Unknown rollup dimension: {dimension!r} (expected one of {DIMENSIONS})")
+
+    def _select(self, where):
+        mask = np.ones(len(self.keys), dtype=bool)
+        for dimension, value in (where or {}).items():
+            labels = self._labels(dimension)
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= np.isin(labels, list(values))
+        return mask
+
+    def _measure_index(self, measures):
+        unknown = [m for m in measures if m not in self.measures]
+        if unknown:
+            raise ValueError(f"Measures not in rollup: {unknown}")
+        return [self.measures.index(m) for m in measures]
+
+    def _grouped(self, by, where):
+        """(labels, counts, centered sums, centered cross) per group."""
+        mask = self._select(where)
+        if by is None:
+            return (None, self.counts[mask].sum(keepdims=True), self.sums[mask].sum(axis=0, keepdims=True),
+                    self.cross[mask].sum(axis=0, keepdims=True))
+        labels, inverse = np.unique(self._labels(by)[mask], return_inverse=True)
+        counts = np.zeros(len(labels))
+        sums = np.zeros((len(labels),) + self.sums.shape[1:])
+        cross = np.zeros((len(labels),) + self.cross.shape[1:])
+        np.add.at(counts, inverse, self.counts[mask])
+        np.add.at(sums, inverse, self.sums[mask])
+        np.add.at(cross, inverse, self.cross[mask])
+        return labels, counts, sums, cross
+
+    def _frame(self, labels, values, measures, by, single):
+        if labels is None:
+            result = pd.Series(values[0], index=measures)
+            return result.iloc[0] if single else result
+        frame = pd.DataFrame(values, index=pd.Index(labels, name=by), columns=measures)
+        return frame[measures[0]] if single else frame
+
+    def count(self, by=None, where=None):
+        labels, counts, _, _ = self._grouped(by, where)
+        if labels is None:
+            return int(counts[0])
+        return pd.Series(counts.astype(np.int64), index=pd.Index(labels, name=by))
+
+    def sum(self, measures, by=None, where=None):
+        single = isinstance(measures, str)
+        measures = [measures] if single else list(measures)
+        idx = self._measure_index(measures)
+        labels, counts, sums, _ = self._grouped(by, where)
+        values = sums[:, idx] + counts[:, None] * self.shift[idx]
+        return self._frame(labels, values, measures, by, single)
+
+    def mean(self, measures, by=None, where=None):
+        single = isinstance(measures, str)
+        measures = [measures] if single else list(measures)
+        idx = self._measure_index(measures)
+        labels, counts, sums, _ = self._grouped(by, where)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = sums[:, idx] / counts[:, None] + self.shift[idx]
+        return self._frame(labels, values, measures, by, single)
+
+    def covariance(self, measures, where=None, ddof=1):
+        idx = self._measure_index(measures)
+        _, counts, sums, cross = self._grouped(None, where)
+        n, s, c = counts[0], sums[0][idx], cross[0][np.ix_(idx, idx)]
+        cov = (c - np.outer(s, s) / n) / (n - ddof)
+        return pd.DataFrame(cov, index=measures, columns=measures)
+
+    def corr(self, measures=PRODUCT_COLS, where=None):
+        """Pearson correlation matrix, identical to DataFrame.corr() on the raw rows."""
+        measures = list(measures)
+        cov = self.covariance(measures, where).to_numpy()
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.outer(std, std)
+        np.fill_diagonal(corr, 1.0)
+        return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=measures, columns=measures)
+
+    def linear_fit(self, x, y, where=None):
+        """Least-squares line y = slope * x + intercept -> (slope, intercept, r).
+
+        Same coefficients as np.polyfit(x, y, 1) on the raw rows, from the cells alone.
+        """
+        cov = self.covariance([x, y], where).to_numpy()
+        sxx, syy, sxy = cov[0, 0], cov[1, 1], cov[0, 1]
+        if sxx == 0:
+            raise ValueError(f"Cannot fit a line: {x!r} is constant")
+        slope = sxy / sxx
+        means = self.mean([x, y], where=where)
+        intercept = means[y] - slope * means[x]
+        r = sxy / np.sqrt(sxx * syy) if syy > 0 else np.nan
+        return float(slope), float(intercept), float(r)
+
+    # ---- persistence -----------------------------------------------------
+
+    def save(self, path):
+        tmp_path = f'{path}.tmp.npz'
+        shift = np.empty(0) if self.shift is None else self.shift
+        np.savez(tmp_path, measures=np.array(self.measures), shift=shift, keys=self.keys,
+                 counts=self.counts, sums=self.sums, cross=self.cross)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            shift = data['shift']
+            cube = cls([str(m) for m in data['measures']], shift if shift.size else None)
+            cube.keys = data['keys']
+            cube.counts = data['counts']
+            cube.sums = data['sums']
+            cube.cross = data['cross']
+        return cube
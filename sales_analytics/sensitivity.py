@@ -0,0 +1,83 @@
+"""
+📉 Sensitivity Curves
+Company Sales Data - Partial Dependence & ICE Curves of the Deployed Models
+
+An ICE curve follows one background row's prediction as a single feature sweeps a
+grid of values; the partial-dependence curve is their mean. Every (feature, grid
+value, background row) combination is stacked into one matrix up front and scored in
+a single batched predict per call, rather than one predict per curve or grid point.
+"""
+
+import numpy as np
+
+# Grid points per feature (features with fewer distinct values use those values)
+GRID_POINTS = 20
+
+# Background rows the curves are averaged over (larger histories are subsampled)
+BACKGROUND_ROWS = 200
+
+
+def feature_grid(values, n_points=GRID_POINTS):
+    """Sweep values of a feature: its distinct values, or `n_points` quantiles when there are more."""
+    values = np.asarray(values, dtype=np.float64)
+    distinct = np.unique(values)
+    if len(distinct) <= n_points:
+        return distinct
+    return np.unique(np.quantile(values, np.linspace(0, 1, n_points)))
+
+
+def background_sample(features, size=BACKGROUND_ROWS, seed=0):
+    """Up to `size` rows of `features`, sampled without replacement (all rows when there are fewer)."""
+    features = np.asarray(features, dtype=np.float64)
+    if len(features) <= size:
+        return features
+    rows = np.random.default_rng(seed).choice(len(features), size, replace=False)
+    return features[np.sort(rows)]
+
+
+def sweep_matrix(background, grids):
+    """Every background row with one feature set to each of its grid values.
+
+    `grids` maps feature column index -> grid. Rows are ordered feature by feature,
+    then grid value, then background row.
+    """
+    blocks = []
+    for column, grid in grids.items():
+        block = np.repeat(background[None], len(grid), axis=0)
+        block[:, :, column] = np.asarray(grid)[:, None]
+        blocks.append(block.reshape(-1, background.shape[1]))
+    return np.concatenate(blocks) if blocks else np.empty((0, background.shape[1]))
+
+
+def ice_curves(predictor, background, targets=None, features=None, n_points=GRID_POINTS):
+    """ICE curves of every requested target x feature from one batched predict.
+
+    `background` is an engineered (unscaled) feature matrix in `predictor.feature_columns`
+    order. Returns {target: {feature: (grid, ice)}} with `ice` shaped (background rows,
+    grid points); its column means are the partial-dependence curve.
+    """
+    background = np.asarray(background, dtype=np.float64)
+    columns = predictor.feature_columns
+    targets = predictor.targets if targets is None else list(targets)
+    features = columns if features is None else list(features)
+
+    grids = {columns.index(feature): feature_grid(background[:, columns.index(feature)], n_points)
+             for feature in features}
+    # Sweep rows are throwaway: keep them out of the shared prediction cache
+    predictions = predictor.predict_matrix(sweep_matrix(background, grids), targets, use_cache=False)
+
+    curves = {target: {} for target in targets}
+    offset = 0
+    for column, grid in grids.items():
+        size = len(grid) * len(background)
+        for target in targets:
+            values = predictions[target].to_numpy()[offset:offset + size]
+            curves[target][columns[column]] = (grid, values.reshape(len(grid), len(background)).T)
+        offset += size
+    return curves
+
+
+def sensitivity_ranking(curves):
+    """Features of one target's curves ordered by the range of their partial dependence."""
+    ranges = {feature: float(np.ptp(ice.mean(axis=0))) for feature, (_, ice) in curves.items()}
+    return sorted(ranges.items(), key=lambda item: item[1], reverse=True)
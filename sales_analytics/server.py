@@ -0,0 +1,383 @@
+"""
+🌐 Prediction Service
+Company Sales Data - Asyncio HTTP API with Request Micro-Batching
+
+Run with:  python -m sales_analytics.server [--host 0.0.0.0] [--port 8600]
+
+    GET  /health          liveness and model metadata
+    GET  /models          deployed targets and algorithms
+    POST /predict         {"month": 6, "facecream": 2500, ..., "targets": ["total_units"]}
+    POST /predict/batch   {"scenarios": [{...}, ...], "targets": [...]}
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from .cache import PredictionCache
+from .config import (MODEL_REFRESH_SECONDS, MODELS_DIR, PRODUCT_COLS, SERVER_BATCH_WINDOW_MS, SERVER_HOST,
+                     SERVER_MAX_BATCH, SERVER_PORT)
+from .features import HOLIDAY_MONTHS, SCENARIO_COLUMNS
+from .prediction import load_predictor
+from .rolling_state import RollingWindowStore
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+MA_COLUMNS = [f'{product}_ma3' for product in PRODUCT_COLS]
+
+# Every queued request is resolved to this full column set, so rows from different
+# requests stack into one matrix regardless of which optional inputs they sent
+BATCH_COLUMNS = SCENARIO_COLUMNS + ['is_holiday_season'] + MA_COLUMNS
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class MicroBatcher:
+    """Coalesces scenario rows from concurrent requests into one vectorized predict call.
+
+    The first request to arrive opens a window of `window_ms`; everything queued
+    before it closes (or until `max_batch` rows) is scored together on a worker
+    thread, and each request gets back the slice of rows it submitted.
+    """
+
+    def __init__(self, predictor, window_ms=SERVER_BATCH_WINDOW_MS, max_batch=SERVER_MAX_BATCH):
+        self.predictor = predictor
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.stats = {'requests': 0, 'batches': 0, 'rows': 0, 'largest_batch': 0}
+        self._queue = None
+        self._task = None
+        self._scoring = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._scoring = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    @contextlib.asynccontextmanager
+    async def paused(self):
+        """Hold back scoring until the block exits; a batch already being scored finishes first."""
+        async with self._scoring:
+            yield
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, scenarios):
+        """Queue an (N, BATCH_COLUMNS) scenario array; resolves to its N-row prediction frame."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((scenarios, future))
+        return await future
+
+    async def _collect(self):
+        pending = [await self._queue.get()]
+        rows = len(pending[0][0])
+        deadline = time.monotonic() + self.window
+
+        while rows < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            pending.append(item)
+            rows += len(item[0])
+        return pending
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = await self._collect()
+            arrays = [scenarios for scenarios, _ in pending]
+            batch = pd.DataFrame(np.vstack(arrays), columns=BATCH_COLUMNS)
+
+            try:
+                # Scoring is CPU-bound: keep it off the event loop
+                async with self._scoring:
+                    predictions = await loop.run_in_executor(None, self.predictor.predict, batch)
+            except Exception as exc:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            self.stats['requests'] += len(pending)
+            self.stats['batches'] += 1
+            self.stats['rows'] += len(batch)
+            self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+
+            start = 0
+            for scenarios, future in pending:
+                stop = start + len(scenarios)
+                if not future.done():
+                    future.set_result(predictions.iloc[start:stop].reset_index(drop=True))
+                start = stop
+
+
+class PredictionServer:
+    """Minimal HTTP/1.1 (keep-alive) JSON API over a BatchPredictor."""
+
+    def __init__(self, predictor, window_ms=SERVER_BATCH_WINDOW_MS, max_batch=SERVER_MAX_BATCH):
+        self.predictor = predictor
+        self.batcher = MicroBatcher(predictor, window_ms, max_batch)
+        self.started = time.time()
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/models'): self.models,
+            ('POST', '/predict'): self.predict_one,
+            ('POST', '/predict/batch'): self.predict_batch,
+        }
+
+    # ---- endpoints -------------------------------------------------------
+
+    async def health(self, payload):
+        return {
+            'status': 'ok',
+            'uptime_s': round(time.time() - self.started, 1),
+            'targets': self.predictor.targets,
+            'feature_columns': self.predictor.feature_columns,
+            'batching': dict(self.batcher.stats),
+            'cache': dict(self.predictor.cache.stats) if self.predictor.cache is not None else None,
+        }
+
+    async def models(self, payload):
+        return {'models': self.predictor.algorithms}
+
+    async def predict_one(self, payload):
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        targets = self._targets(payload.pop('targets', None))
+        predictions = await self._score([payload], targets)
+        return {'predictions': predictions[0]}
+
+    async def predict_batch(self, payload):
+        if not isinstance(payload, dict) or not isinstance(payload.get('scenarios'), list):
+            raise HTTPError(400, "Request body must be a JSON object with a 'scenarios' list")
+        targets = self._targets(payload.get('targets'))
+        predictions = await self._score(payload['scenarios'], targets)
+        return {'count': len(predictions), 'predictions': predictions}
+
+    def _targets(self, targets):
+        if targets is None:
+            return self.predictor.targets
+        if isinstance(targets, str):
+            targets = [targets]
+        if not isinstance(targets, list) or not all(isinstance(t, str) for t in targets):
+            raise HTTPError(400, "'targets' must be a target name or a list of target names")
+        unknown = [t for t in targets if t not in self.predictor.algorithms]
+        if unknown:
+            raise HTTPError(400, f"Unknown prediction targets: {unknown}")
+        return list(targets)
+
+    async def _score(self, records, targets):
+        if not records:
+            return []
+        # Validated per request so one bad payload cannot fail a shared batch
+        predictions = await self.batcher.submit(self._scenario_array(records))
+        return predictions[targets].to_dict('records')
+
+    def _scenario_array(self, records):
+        """Resolve JSON scenarios to a BATCH_COLUMNS array (plain Python, no per-request DataFrame)."""
+        rows = []
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                raise HTTPError(400, f"Scenario {i} must be a JSON object")
+            if 'month' not in record and 'month_number' in record:
+                record = dict(record, month=record['month_number'])
+
+            missing = [col for col in SCENARIO_COLUMNS if col not in record]
+            if missing:
+                raise HTTPError(400, f"Scenario {i} is missing required columns: {missing}")
+            try:
+                row = [float(record[col]) for col in SCENARIO_COLUMNS]
+                holiday = record.get('is_holiday_season')
+                row.append(float(row[0] in HOLIDAY_MONTHS) if holiday is None else float(holiday))
+                row.extend(float(record.get(col, np.nan)) for col in MA_COLUMNS)
+            except (TypeError, ValueError):
+                raise HTTPError(400, f"Scenario {i} has non-numeric values")
+            # Unset moving averages are NaN until filled below; everything sent must be finite
+            supplied = row[:len(SCENARIO_COLUMNS) + 1] + [row[len(SCENARIO_COLUMNS) + 1 + j]
+                                                          for j, col in enumerate(MA_COLUMNS) if col in record]
+            if not all(math.isfinite(value) for value in supplied):
+                raise HTTPError(400, f"Scenario {i} has non-finite values (NaN or Infinity)")
+            if not 1 <= row[0] <= 12 or not row[0].is_integer():
+                raise HTTPError(400, "Scenario 'month' values must be whole numbers between 1 and 12")
+            if row[len(SCENARIO_COLUMNS)] not in (0.0, 1.0):
+                raise HTTPError(400, "Scenario 'is_holiday_season' values must be 0 or 1")
+            rows.append(row)
+
+        scenarios = np.array(rows, dtype=np.float64)
+        ma = scenarios[:, -len(MA_COLUMNS):]
+        unset = np.isnan(ma)
+        if unset.any():
+            products = scenarios[:, 1:1 + len(PRODUCT_COLS)]
+            rolling_state = self.predictor.rolling_state
+            defaults = products if rolling_state is None else rolling_state.moving_averages_for(products)
+            ma[unset] = defaults[unset]
+        return scenarios
+
+    # ---- HTTP plumbing ---------------------------------------------------
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                parts = request_line.split()
+                if len(parts) != 3:
+                    await self._respond(writer, 400, {'error': 'Malformed request line'}, keep_alive=False)
+                    break
+                method, path, version = parts
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {'error': 'Invalid Content-Length'}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': 'Request body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, response = await self._dispatch(method, path.split('?', 1)[0], body)
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        handler = self.routes.get((method, path.rstrip('/') or '/'))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                return 405, {'error': f'{method} not allowed on {path}'}
+            return 404, {'error': f'No route for {path}'}
+
+        try:
+            payload = json.loads(body) if body else {}
+        except json.JSONDecodeError as exc:
+            return 400, {'error': f'Invalid JSON: {exc}'}
+
+        try:
+            return 200, await handler(payload)
+        except HTTPError as exc:
+            return exc.status, {'error': exc.message}
+        except ValueError as exc:
+            return 400, {'error': str(exc)}
+        except Exception as exc:
+            return 500, {'error': str(exc)}
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, default=_json_default).encode('utf-8')
+        head = (
+            f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def _watch_deployment(self, interval):
+        """Swap in newly published model versions (and new actuals) without a restart."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # The predictor swaps its scaler, algorithms and models one by one: no batch
+                # may be scored in between, or it could pair a new scaler with an old model
+                async with self.batcher.paused():
+                    changed = await loop.run_in_executor(None, self.predictor.refresh)
+                # Load replacements off the event loop before requests ask for them
+                for target in changed:
+                    await loop.run_in_executor(None, self.predictor.models.get, target)
+                if self.predictor.rolling_state is not None:
+                    await loop.run_in_executor(None, self.predictor.rolling_state.refresh)
+            except Exception:  # keep serving the current version
+                pass
+
+    async def serve(self, host=SERVER_HOST, port=SERVER_PORT, refresh_seconds=MODEL_REFRESH_SECONDS):
+        self.batcher.start()
+        watcher = asyncio.create_task(self._watch_deployment(refresh_seconds)) if refresh_seconds > 0 else None
+        server = await asyncio.start_server(self.handle, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            await self.batcher.stop()
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def create_server(models_dir=MODELS_DIR, window_ms=SERVER_BATCH_WINDOW_MS, max_batch=SERVER_MAX_BATCH):
+    """Server over the deployed models, with `_ma3` trend features seeded from the sales history."""
+    predictor = load_predictor(models_dir, rolling_state=RollingWindowStore.from_store(), cache=PredictionCache())
+    # Load every model up front so the first requests do not pay for it
+    for target in predictor.targets:
+        predictor.models[target]
+    return PredictionServer(predictor, window_ms, max_batch)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve sales forecasts over HTTP')
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--batch-window-ms', type=float, default=SERVER_BATCH_WINDOW_MS)
+    parser.add_argument('--max-batch', type=int, default=SERVER_MAX_BATCH)
+    args = parser.parse_args(argv)
+
+    server = create_server(args.models_dir, args.batch_window_ms, args.max_batch)
+    print(f'🌐 Serving {len(server.predictor.targets)} models on http://{args.host}:{args.port}')
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
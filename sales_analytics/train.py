@@ -0,0 +1,324 @@
+"""
+🏋️ Model Retraining
+Company Sales Data - Parallel Algorithm x Target Training Pipeline
+
+Run with:  python -m sales_analytics.train [--algorithms LR RF XGB SVR] [--workers 4]
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.svm import SVR
+
+try:
+    import xgboost as xgb
+except ImportError:  # pragma: no cover - XGB is skipped without it
+    xgb = None
+
+from .artifacts import export_artifact
+from .config import MODELS_DIR, SCALED_ALGORITHMS, TRAINING_WORKERS
+from .feature_cache import get_feature_cache
+from .features import FEATURE_COLUMNS
+from .intervals import conformal_calibration
+from .model_selection import (FoldCache, fold_predictions, search, walk_forward_residuals, walk_forward_score,
+                              walk_forward_splits)
+
+# Prediction targets and their report descriptions (model building notebook)
+TARGETS = {
+    'total_units': 'Total Units Sold',
+    'total_profit': 'Total Profit',
+    'facecream': 'Face Cream Sales',
+    'moisturizer': 'Moisturizer Sales',
+    'profit_per_unit': 'Profit Efficiency',
+}
+
+ALGORITHMS = ['LR', 'RF', 'XGB', 'SVR']
+
+# Algorithms that can use several cores for a single fit
+THREADED_ALGORITHMS = {'RF', 'XGB'}
+
+# Chronological share of the history used for training (the rest is the test window)
+TRAIN_FRACTION = 0.75
+
+RANDOM_STATE = 42
+
+# Walk-forward folds used to score every fit
+CV_SPLITS = 5
+
+# Hyperparameters from the model building notebook
+DEFAULT_PARAMS = {
+    'LR': {},
+    'RF': {'n_estimators': 100, 'max_depth': 10, 'min_samples_split': 2, 'min_samples_leaf': 1},
+    'XGB': {'n_estimators': 100, 'max_depth': 6, 'learning_rate': 0.1, 'subsample': 0.8, 'colsample_bytree': 0.8},
+    'SVR': {'kernel': 'rbf', 'C': 100, 'gamma': 'scale', 'epsilon': 0.1},
+}
+
+
+def make_model(algorithm, n_jobs=1, random_state=RANDOM_STATE, **params):
+    """Unfitted estimator with the notebook's hyperparameters, overridden by `params`."""
+    if algorithm not in DEFAULT_PARAMS:
+        raise ValueError(f"Unknown algorithm: {algorithm!r} (expected one of {ALGORITHMS})")
+    params = dict(DEFAULT_PARAMS[algorithm], **params)
+    if algorithm == 'LR':
+        return LinearRegression(**params)
+    if algorithm == 'RF':
+        return RandomForestRegressor(random_state=random_state, n_jobs=n_jobs, **params)
+    if algorithm == 'XGB':
+        if xgb is None:
+            raise RuntimeError("xgboost is required to train XGB models")
+        return xgb.XGBRegressor(random_state=random_state, eval_metric='rmse', n_jobs=n_jobs, **params)
+    return SVR(**params)
+
+
+def prepare_training_data(sales_df=None):
+    """FeatureSet (raw + scaled float32 features, targets, scaler) of the sales history.
+
+    Served from the feature cache: the current store's history (or `sales_df`) is only
+    engineered and scaled the first time its content is seen.
+    """
+    cache = get_feature_cache()
+    return cache.get() if sales_df is None else cache.for_frame(sales_df)
+
+
+def plan_jobs(algorithms, n_workers, n_cpus=None):
+    """Threads per fit for each algorithm so that workers x threads never exceeds the CPUs."""
+    n_cpus = n_cpus or os.cpu_count() or 1
+    threads = max(n_cpus // max(n_workers, 1), 1)
+    return {algorithm: threads if algorithm in THREADED_ALGORITHMS else 1 for algorithm in algorithms}
+
+
+# Training data shared with worker processes once, through the pool initializer
+_data = None
+
+
+def _init_worker(data):
+    global _data
+    _data = data
+
+
+def _fit_one(algorithm, target, params, n_jobs, random_state):
+    feature_set, folds = _data
+    features = feature_set.frame(scaled=algorithm in SCALED_ALGORITHMS)
+    y = feature_set.target(target)
+    split = int(len(features) * TRAIN_FRACTION)
+    X_train, X_test = features.iloc[:split], features.iloc[split:]
+    y_train, y_test = y[:split], y[split:]
+
+    start = time.perf_counter()
+    model = make_model(algorithm, n_jobs, random_state, **params).fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    oof = fold_predictions(algorithm, params, target, folds, range(len(folds)),
+                           lambda name, **kwargs: make_model(name, n_jobs, random_state, **kwargs))
+    cv = walk_forward_score(oof, target, folds)
+
+    pred_train = model.predict(X_train)
+    pred_test = model.predict(X_test)
+    metrics = {
+        'train_r2': r2_score(y_train, pred_train),
+        'test_r2': r2_score(y_test, pred_test),
+        'test_rmse': float(np.sqrt(mean_squared_error(y_test, pred_test))),
+        'test_mae': mean_absolute_error(y_test, pred_test),
+        'cv_r2': cv['r2'],
+        'cv_rmse': cv['rmse'],
+        'cv_mae': cv['mae'],
+        # Held-out residuals of the walk-forward folds calibrate conformal prediction intervals
+        'calibration': conformal_calibration(walk_forward_residuals(oof, target, folds)),
+        'train_rows': split,
+        'params': params,
+        'fit_seconds': fit_seconds,
+    }
+    return algorithm, target, model, metrics
+
+
+def train_grid(algorithms=ALGORITHMS, targets=TARGETS, sales_df=None, workers=TRAINING_WORKERS,
+               random_state=RANDOM_STATE, params=None, cv_splits=CV_SPLITS):
+    """Fit every algorithm x target pair in a process pool.
+
+    `params` optionally maps (algorithm, target) -> hyperparameter overrides (e.g. from
+    `search_grid`). Besides the notebook's 75/25 holdout, every pair is scored with
+    walk-forward CV (`cv_*` metrics).
+
+    Returns (results, scaler) where results maps (algorithm, target) -> (model, metrics).
+    Every fit is seeded and the split is chronological, so results do not depend on
+    the number of workers or the order in which fits finish.
+    """
+    feature_set = prepare_training_data(sales_df)
+    tasks = [(algorithm, target) for algorithm in algorithms for target in targets]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    n_jobs = plan_jobs(algorithms, workers)
+    params = params or {}
+
+    # Workers receive the cache entry's path and map the same matrices, not pickled copies
+    folds = FoldCache(feature_set.features, {target: feature_set.target(target) for target in targets},
+                      walk_forward_splits(len(feature_set), cv_splits), source=feature_set)
+    data = (feature_set, folds)
+    if workers <= 1:
+        _init_worker(data)
+        outputs = [_fit_one(algorithm, target, params.get((algorithm, target), {}), n_jobs[algorithm], random_state)
+                   for algorithm, target in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+            futures = [pool.submit(_fit_one, algorithm, target, params.get((algorithm, target), {}),
+                                   n_jobs[algorithm], random_state)
+                       for algorithm, target in tasks]
+            outputs = [future.result() for future in futures]
+
+    results = {(algorithm, target): (model, metrics) for algorithm, target, model, metrics in outputs}
+    return results, feature_set.scaler()
+
+
+def search_grid(algorithms=ALGORITHMS, targets=TARGETS, sales_df=None, workers=TRAINING_WORKERS,
+                n_candidates=27, cv_splits=CV_SPLITS, random_state=RANDOM_STATE):
+    """Successive-halving hyperparameter search per algorithm x target -> {(algorithm, target): params}."""
+    feature_set = prepare_training_data(sales_df)
+    found = search(algorithms, targets, feature_set.features, {target: feature_set.target(target) for target in targets},
+                   make_model, base_params=DEFAULT_PARAMS, n_candidates=n_candidates, n_splits=cv_splits,
+                   workers=workers, random_state=random_state, source=feature_set)
+    return {key: params for key, (params, _) in found.items()}
+
+
+def select_best(results, targets=TARGETS, metric='cv_r2'):
+    """Highest `metric` per target -> (algorithm, model, metrics); ties go to the earlier algorithm.
+
+    Defaults to the walk-forward CV R², which is far less noisy than the single holdout.
+    """
+    best = {}
+    for (algorithm, target), (model, metrics) in results.items():
+        if target not in best or metrics[metric] > best[target][2][metric]:
+            best[target] = (algorithm, model, metrics)
+    return {target: best[target] for target in targets if target in best}
+
+
+def atomic_dump(model, path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(payload, path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def new_version():
+    """Sortable, unique-per-publish artifact version stamp."""
+    return datetime.now().strftime('%Y%m%dT%H%M%S%f')
+
+
+def write_artifacts(results, scaler, models_dir=MODELS_DIR, targets=TARGETS, version=None):
+    """Save the best model per target plus the scaler under version-stamped filenames.
+
+    Each is written both as joblib and, where it has one, as a compact pickle-free
+    artifact (`sales_analytics.artifacts`) that services load instead. Artifacts of earlier versions are left in place. `feature_info.json` and then
+    `deployment_summary.json` are replaced last, each atomically, so readers switch
+    from one complete version to the next and never see a partial deployment.
+    """
+    version = version or new_version()
+    best = select_best(results, targets)
+    os.makedirs(models_dir, exist_ok=True)
+    prefix = os.path.basename(os.path.normpath(models_dir))
+    created = datetime.now().isoformat()
+
+    best_models = {}
+    for target, (algorithm, model, metrics) in best.items():
+        filename = f'best_{target}_model_{algorithm.lower()}-{version}.joblib'
+        atomic_dump(model, os.path.join(models_dir, filename))
+        best_models[target] = {
+            'algorithm': algorithm,
+            'filename': f'{prefix}/{filename}',
+            'compact_filename': export_artifact(model, models_dir, f'{prefix}/{filename}'),
+            'test_r2': metrics['test_r2'],
+            'test_rmse': metrics['test_rmse'],
+            'test_mae': metrics['test_mae'],
+            'cv_r2': metrics['cv_r2'],
+            'cv_rmse': metrics['cv_rmse'],
+            'calibration': metrics['calibration'],
+            'params': metrics['params'],
+            'description': targets[target],
+        }
+
+    scaler_filename = f'feature_scaler-{version}.joblib'
+    atomic_dump(scaler, os.path.join(models_dir, scaler_filename))
+
+    by_algorithm = {}
+    for (algorithm, _), (_, metrics) in results.items():
+        by_algorithm.setdefault(algorithm, []).append(metrics['cv_r2'])
+
+    atomic_write_json({
+        'feature_columns': FEATURE_COLUMNS,
+        'all_features': FEATURE_COLUMNS,
+        'target_variables': list(targets),
+        'created_date': created,
+    }, os.path.join(models_dir, 'feature_info.json'))
+
+    summary = {
+        'project': 'Company Sales Forecasting',
+        'created_date': created,
+        'version': version,
+        # Leading history rows (in ingestion order) the models were fitted on; online updates
+        # fold in every row after them, starting with the holdout window
+        'trained_rows': min(metrics['train_rows'] for _, _, metrics in best.values()),
+        'best_models': best_models,
+        'feature_scaler': f'{prefix}/{scaler_filename}',
+        'feature_scaler_compact': export_artifact(scaler, models_dir, f'{prefix}/{scaler_filename}'),
+        'feature_info': f'{prefix}/feature_info.json',
+        'model_performance_summary': {algorithm: float(np.mean(scores)) for algorithm, scores in sorted(by_algorithm.items())},
+    }
+    atomic_write_json(summary, os.path.join(models_dir, 'deployment_summary.json'))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Retrain every algorithm x target model and deploy the best ones')
+    parser.add_argument('--algorithms', nargs='+', default=ALGORITHMS, choices=ALGORITHMS)
+    parser.add_argument('--targets', nargs='+', default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument('--workers', type=int, default=TRAINING_WORKERS, help='training processes (0 = one per CPU)')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--seed', type=int, default=RANDOM_STATE)
+    parser.add_argument('--search', action='store_true', help='tune hyperparameters with successive halving first')
+    parser.add_argument('--candidates', type=int, default=27, help='configurations sampled per algorithm')
+    parser.add_argument('--cv-splits', type=int, default=CV_SPLITS, help='walk-forward folds')
+    parser.add_argument('--dry-run', action='store_true', help='train and report without writing artifacts')
+    args = parser.parse_args(argv)
+
+    if set(args.targets) != set(TARGETS) and not args.dry_run:
+        # A deployment must cover every target, all fitted against the same scaler
+        parser.error('--targets subsets can only be used with --dry-run')
+
+    targets = {target: TARGETS[target] for target in args.targets}
+    params = None
+    if args.search:
+        start = time.perf_counter()
+        params = search_grid(args.algorithms, targets, workers=args.workers, n_candidates=args.candidates,
+                             cv_splits=args.cv_splits, random_state=args.seed)
+        print(f'🔬 Searched {len(params)} algorithm x target pairs in {time.perf_counter() - start:.1f}s')
+
+    start = time.perf_counter()
+    results, scaler = train_grid(args.algorithms, targets, workers=args.workers, random_state=args.seed,
+                                 params=params, cv_splits=args.cv_splits)
+    print(f'🏋️ Trained {len(results)} models in {time.perf_counter() - start:.1f}s')
+    for (algorithm, target), (_, metrics) in sorted(results.items(), key=lambda item: (item[0][1], item[0][0])):
+        print(f'   {target:<16} {algorithm:<4} CV R² {metrics["cv_r2"]:>8.4f}   CV RMSE {metrics["cv_rmse"]:>12.2f}'
+              f'   holdout R² {metrics["test_r2"]:>8.4f}')
+
+    if args.dry_run:
+        return
+    summary = write_artifacts(results, scaler, args.models_dir, targets)
+    print(f'✅ Deployed version {summary["version"]} to {args.models_dir}')
+    for target, info in summary['best_models'].items():
+        print(f'   {target:<16} -> {info["algorithm"]} ({info["filename"]})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,377 @@
+"""
+🌲 Compiled Tree-Ensemble Inference
+Company Sales Data - Vectorized RF/XGB Scoring
+"""
+
+import json
+import threading
+import time
+
+import numpy as np
+
+from .config import COMPILED_MAX_BATCH
+
+# Largest padded node table (all trees) the compiled layout will allocate
+MAX_COMPILED_NODES = 1 << 24
+
+
+class CompiledTreeEnsemble:
+    """Tree ensemble flattened into contiguous, level-ordered node arrays.
+
+    Every tree is padded to a perfect binary tree of the ensemble's maximum depth, so a
+    child index is pure arithmetic (2 * node + 1 + went_right) and the whole batch advances
+    through all trees one level per step. Padding nodes always send samples left and carry
+    the leaf value they hang under, which keeps predictions identical to the original trees.
+    `cover` (optional) is the training weight that reached each node; padding nodes carry
+    their leaf's cover on the left and none on the right.
+    """
+
+    def __init__(self, feature, threshold, default_left, value, n_trees, depth, n_features,
+                 aggregation, base_score=0.0, value_dtype=np.float64, chunk_size=512, cover=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=value_dtype)
+        self.cover = None if cover is None else np.ascontiguousarray(cover, dtype=np.float32)
+        self.n_trees = int(n_trees)
+        self.depth = int(depth)
+        self.n_features = int(n_features)
+        self.aggregation = aggregation
+        self.base_score = value_dtype(base_score)
+        self.value_dtype = value_dtype
+        self.chunk_size = chunk_size
+
+    @property
+    def stride(self):
+        return (1 << (self.depth + 1)) - 1
+
+    def apply(self, X):
+        """Leaf slot reached in every tree, shape (n_samples, n_trees)."""
+        # sklearn and XGBoost both compare float32 feature values against the thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples = X.shape[0]
+        flat = X.ravel()
+        has_missing = bool(np.isnan(flat).any())
+
+        tree_base = np.arange(self.n_trees, dtype=np.int32) * self.stride
+        row_offset = (np.arange(n_samples, dtype=np.int32) * self.n_features)[:, None]
+        child_shift = 1 - tree_base
+
+        shape = (n_samples, self.n_trees)
+        node = np.empty(shape, dtype=np.int32)
+        node[:] = tree_base
+        index = np.empty(shape, dtype=np.int32)
+        x = np.empty(shape, dtype=np.float32)
+        threshold = np.empty(shape, dtype=np.float32)
+        went_right = np.empty(shape, dtype=bool)
+
+        for _ in range(self.depth):
+            np.take(self.feature, node, out=index)
+            index += row_offset
+            np.take(flat, index, out=x)
+            np.take(self.threshold, node, out=threshold)
+            np.greater(x, threshold, out=went_right)
+            if has_missing:
+                went_right |= np.isnan(x) & ~self.default_left[node]
+            # Global index of the child: base + 2 * (node - base) + 1 + went_right
+            node *= 2
+            node += child_shift
+            node += went_right
+        return node
+
+    def tree_values(self, X):
+        """Per-tree outputs, shape (n_samples, n_trees)."""
+        return self.value[self.apply(X)]
+
+    def _aggregate(self, tree_values):
+        if self.aggregation == 'mean':
+            # Sequential float64 accumulation mirrors sklearn's forest averaging
+            total = np.zeros(tree_values.shape[0], dtype=np.float64)
+            for t in range(self.n_trees):
+                total += tree_values[:, t]
+            return total / self.n_trees
+
+        # Boosting: margin accumulated tree by tree from the base score
+        total = np.full(tree_values.shape[0], self.base_score, dtype=self.value_dtype)
+        for t in range(self.n_trees):
+            total += tree_values[:, t]
+        return total
+
+    def predict_with_quantiles(self, X, quantiles):
+        """(predictions, (len(quantiles), n_samples) quantiles of the per-tree outputs).
+
+        Both come from one traversal per chunk; only averaged forests have per-tree
+        outputs on the prediction's scale.
+        """
+        if self.aggregation != 'mean':
+            raise ValueError("Per-tree quantiles need an averaged (forest) ensemble")
+        X = np.asarray(X)
+        predictions = np.empty(X.shape[0])
+        bounds = np.empty((len(quantiles), X.shape[0]))
+        for start in range(0, X.shape[0], self.chunk_size):
+            tree_values = self.tree_values(X[start:start + self.chunk_size])
+            stop = start + len(tree_values)
+            predictions[start:stop] = self._aggregate(tree_values)
+            bounds[:, start:stop] = np.quantile(tree_values, quantiles, axis=1)
+        return predictions, bounds
+
+    def predict(self, X):
+        X = np.asarray(X)
+        return np.concatenate([
+            self._aggregate(self.tree_values(X[start:start + self.chunk_size]))
+            for start in range(0, max(X.shape[0], 1), self.chunk_size)
+        ])[:X.shape[0]]
+
+
+class _PerfectLayout:
+    # Accumulates padded trees for CompiledTreeEnsemble
+
+    def __init__(self, n_trees, depth):
+        self.depth = depth
+        self.stride = (1 << (depth + 1)) - 1
+        if n_trees * self.stride > MAX_COMPILED_NODES:
+            raise ValueError(f"Ensemble too deep for the compiled layout (depth {depth}, {n_trees} trees)")
+        size = n_trees * self.stride
+        self.feature = np.zeros(size, dtype=np.int32)
+        # +inf thresholds send every sample left through padding nodes
+        self.threshold = np.full(size, np.inf, dtype=np.float32)
+        self.default_left = np.ones(size, dtype=bool)
+        self.value = np.zeros(size, dtype=np.float64)
+        self.cover = np.zeros(size, dtype=np.float32)
+
+    def add_tree(self, tree_index, root, is_leaf, children, split, leaf_value, cover=None):
+        """`children(node) -> (left, right)`, `split(node) -> (feature, float32 threshold, default_left)`,
+        `cover(node) -> training weight at the node` (optional)."""
+        base = tree_index * self.stride
+        stack = [(root, 0)]
+        while stack:
+            node, slot = stack.pop()
+            weight = cover(node) if cover is not None else 0.0
+            if is_leaf(node):
+                # Fill the padded subtree below the leaf with its value; every sample goes left
+                pending = [(slot, weight)]
+                while pending:
+                    pad, pad_weight = pending.pop()
+                    if pad < self.stride:
+                        self.value[base + pad] = leaf_value(node)
+                        self.cover[base + pad] = pad_weight
+                        pending.extend(((2 * pad + 1, pad_weight), (2 * pad + 2, 0.0)))
+                continue
+
+            self.cover[base + slot] = weight
+            feature, threshold, default_left = split(node)
+            self.feature[base + slot] = feature
+            self.threshold[base + slot] = threshold
+            self.default_left[base + slot] = default_left
+            left, right = children(node)
+            stack.append((left, 2 * slot + 1))
+            stack.append((right, 2 * slot + 2))
+
+
+def _float32_at_most(value):
+    # Largest float32 <= value, so float32 x <= value  <=>  x <= result
+    result = np.float32(value)
+    if result > value:
+        result = np.nextafter(result, np.float32(-np.inf))
+    return result
+
+
+def compile_sklearn_forest(model):
+    """Flatten a fitted sklearn RandomForestRegressor / ExtraTreesRegressor."""
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    depth = max(tree.max_depth for tree in trees)
+    layout = _PerfectLayout(len(trees), depth)
+
+    for i, tree in enumerate(trees):
+        # Tree attributes are rebuilt on every access, so read each array once
+        left, right = tree.children_left, tree.children_right
+        feature, threshold, value = tree.feature, tree.threshold, tree.value[:, 0, 0]
+        weights = tree.weighted_n_node_samples
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8))
+        layout.add_tree(
+            i, 0,
+            is_leaf=lambda node, left=left: left[node] < 0,
+            children=lambda node, left=left, right=right: (left[node], right[node]),
+            split=lambda node, feature=feature, threshold=threshold, missing_left=missing_left: (
+                feature[node], _float32_at_most(threshold[node]), bool(missing_left[node])
+            ),
+            leaf_value=lambda node, value=value: value[node],
+            cover=lambda node, weights=weights: weights[node],
+        )
+
+    return CompiledTreeEnsemble(
+        layout.feature, layout.threshold, layout.default_left, layout.value,
+        len(trees), depth, model.n_features_in_, aggregation='mean', cover=layout.cover
+    )
+
+
+def _xgb_base_score(booster):
+    config = json.loads(booster.save_config())
+    objective = config['learner']['objective']['name']
+    if objective not in ('reg:squarederror', 'reg:linear', 'reg:absoluteerror', 'reg:pseudohubererror'):
+        raise ValueError(f"Unsupported XGBoost objective for compiled inference: {objective}")
+    base_score = config['learner']['learner_model_param']['base_score']
+    # Newer XGBoost versions store a vector-valued base score, e.g. "[2.1E3]"
+    return float(str(base_score).strip('[]'))
+
+
+def _xgb_trees(booster):
+    # Parse the JSON dump into {node_id: node} maps plus each tree's depth
+    trees = []
+    for dump in booster.get_dump(dump_format='json', with_stats=True):
+        nodes = {}
+        depth = 0
+        stack = [(json.loads(dump), 0)]
+        while stack:
+            node, level = stack.pop()
+            nodes[node['nodeid']] = node
+            depth = max(depth, level)
+            stack.extend((child, level + 1) for child in node.get('children', []))
+        trees.append((nodes, depth))
+    return trees
+
+
+def compile_xgboost(model):
+    """Flatten a fitted XGBRegressor (or Booster) with an identity-link objective."""
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    feature_names = booster.feature_names
+    feature_index = {name: i for i, name in enumerate(feature_names)} if feature_names else None
+
+    trees = _xgb_trees(booster)
+    depth = max(tree_depth for _, tree_depth in trees)
+    layout = _PerfectLayout(len(trees), depth)
+
+    def split(node):
+        name = node['split']
+        feature = feature_index[name] if feature_index else int(str(name).lstrip('f'))
+        # XGBoost sends x < t left; for float32 inputs that is x <= the next float32 below t
+        threshold = np.nextafter(np.float32(node['split_condition']), np.float32(-np.inf))
+        return feature, threshold, node['missing'] == node['yes']
+
+    for i, (nodes, _) in enumerate(trees):
+        layout.add_tree(
+            i, 0,
+            is_leaf=lambda node_id, nodes=nodes: 'leaf' in nodes[node_id],
+            children=lambda node_id, nodes=nodes: (nodes[node_id]['yes'], nodes[node_id]['no']),
+            split=lambda node_id, nodes=nodes: split(nodes[node_id]),
+            leaf_value=lambda node_id, nodes=nodes: nodes[node_id]['leaf'],
+            cover=lambda node_id, nodes=nodes: nodes[node_id]['cover'],
+        )
+
+    return CompiledTreeEnsemble(
+        layout.feature, layout.threshold, layout.default_left, layout.value,
+        len(trees), depth, booster.num_features(), aggregation='sum',
+        base_score=_xgb_base_score(booster), value_dtype=np.float32, cover=layout.cover
+    )
+
+
+def compile_model(model):
+    """Compiled equivalent of a fitted tree ensemble, or None when the model is not one."""
+    try:
+        if hasattr(model, 'get_booster'):
+            return compile_xgboost(model)
+        if hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'tree_'):
+            return compile_sklearn_forest(model)
+    except ValueError:
+        return None
+    return None
+
+
+class AcceleratedTreeModel:
+    """Routes small batches to the compiled ensemble and large ones to the native predict.
+
+    The compiled path removes the per-call overhead of sklearn/XGBoost; above
+    `max_compiled_batch` rows the native multithreaded C++ loops win again. `native`
+    is the fitted estimator or a zero-argument loader for it, called on the first
+    large batch (or attribute only the native model has), so a model served from its
+    compact artifact only unpickles the original when it is needed.
+    """
+
+    def __init__(self, native, compiled, max_compiled_batch=COMPILED_MAX_BATCH):
+        self._native = None if callable(native) and not hasattr(native, 'predict') else native
+        self._native_loader = native if self._native is None else None
+        self._native_lock = threading.Lock()
+        self.compiled = compiled
+        self.max_compiled_batch = max_compiled_batch
+
+    @property
+    def native(self):
+        if self._native is None:
+            with self._native_lock:
+                if self._native is None:
+                    self._native = self._native_loader()
+        return self._native
+
+    def __getattr__(self, name):
+        # Expose the wrapped estimator's fitted attributes (feature_importances_, ...)
+        if name.startswith('_') or name in ('native', 'compiled', 'max_compiled_batch'):
+            raise AttributeError(name)
+        if self._native is None and hasattr(self.compiled, name):
+            # Answered by the compiled form without loading a deferred native model
+            return getattr(self.compiled, name)
+        return getattr(self.native, name)
+
+    def predict(self, X):
+        if len(X) > self.max_compiled_batch:
+            return self.native.predict(X)
+        return self.compiled.predict(X)
+
+
+def accelerate(model, max_compiled_batch=COMPILED_MAX_BATCH):
+    compiled = compile_model(model)
+    if compiled is None:
+        return model
+    return AcceleratedTreeModel(model, compiled, max_compiled_batch)
+
+
+def benchmark(batch_sizes=(1, 100, 100_000), repeats=5, models_dir=None):
+    """Median latency (ms) of native vs compiled predict for every deployed tree model."""
+    import pandas as pd
+
+    from .config import DATA_PATH, MODELS_DIR
+    from .features import build_feature_frame
+    from .registry import ModelRegistry
+
+    registry = ModelRegistry(models_dir or MODELS_DIR, memory_budget_mb=None, compiled=False, compact=False)
+    history = build_feature_frame(pd.read_csv(DATA_PATH)).to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(42)
+
+    rows = []
+    for target, algorithm in registry.algorithms.items():
+        native = registry[target]
+        compiled = compile_model(native)
+        if compiled is None:
+            continue
+
+        for batch_size in batch_sizes:
+            X = history[rng.integers(0, len(history), batch_size)]
+            X_named = pd.DataFrame(X, columns=registry.feature_columns)
+            timings = {}
+            for backend, predict, inputs in (('native', native.predict, X_named), ('compiled', compiled.predict, X)):
+                predict(inputs)
+                samples = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    predict(inputs)
+                    samples.append((time.perf_counter() - start) * 1000)
+                timings[backend] = float(np.median(samples))
+
+            max_abs_diff = float(np.max(np.abs(native.predict(X_named) - compiled.predict(X))))
+            rows.append({
+                'target': target,
+                'algorithm': algorithm,
+                'batch_size': batch_size,
+                'native_ms': timings['native'],
+                'compiled_ms': timings['compiled'],
+                'speedup': timings['native'] / timings['compiled'],
+                'max_abs_diff': max_abs_diff,
+            })
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    import warnings
+
+    warnings.filterwarnings('ignore')
+    print(benchmark().to_string(index=False, float_format=lambda v: f'{v:,.4f}'))
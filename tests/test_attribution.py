@@ -0,0 +1,116 @@
+"""Exact per-prediction contributions of the attribution explainers."""
+
+import itertools
+import math
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+from sales_analytics import attribution
+from sales_analytics.attribution import TreeExplainer, explainer_for
+from sales_analytics.tree_engine import compile_model
+
+xgboost = pytest.importorskip('xgboost')
+
+N_FEATURES = 5
+
+
+def training_data(missing=False, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(300, N_FEATURES)) * [1, 10, 100, 1, 5]
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) * 50 + (X[:, 2] > 20) * 200 + X[:, 3] * X[:, 4] + rng.normal(size=len(X))
+    if missing:
+        X[rng.random(X.shape) < 0.15] = np.nan
+    return X, y
+
+
+def rows(n=6, seed=1):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, N_FEATURES)) * [1, 10, 100, 1, 5]
+
+
+@pytest.fixture(scope='module')
+def forest():
+    X, y = training_data()
+    return RandomForestRegressor(n_estimators=10, max_depth=5, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope='module', params=[False, True], ids=['dense', 'missing'])
+def booster(request):
+    X, y = training_data(request.param)
+    return xgboost.XGBRegressor(n_estimators=20, max_depth=4, learning_rate=0.3, random_state=0).fit(X, y)
+
+
+def conditional_expectation(tree, x, known):
+    """Path-dependent E[tree(x) | x_known]: unknown splits average their children by training cover."""
+    def visit(node):
+        left, right = tree.children_left[node], tree.children_right[node]
+        if left < 0:
+            return tree.value[node].ravel()[0]
+        feature = tree.feature[node]
+        if feature in known:
+            return visit(left if x[feature] <= tree.threshold[node] else right)
+        weights = tree.weighted_n_node_samples
+        return (weights[left] * visit(left) + weights[right] * visit(right)) / weights[node]
+    return visit(0)
+
+
+def brute_force_shapley(model, x):
+    """Shapley values of the forest's conditional expectation, summed over every coalition."""
+    def value(known):
+        return np.mean([conditional_expectation(estimator.tree_, x, known) for estimator in model.estimators_])
+
+    phi = np.zeros(N_FEATURES)
+    for i in range(N_FEATURES):
+        others = [j for j in range(N_FEATURES) if j != i]
+        for size in range(N_FEATURES):
+            weight = math.factorial(size) * math.factorial(N_FEATURES - size - 1) / math.factorial(N_FEATURES)
+            for coalition in itertools.combinations(others, size):
+                phi[i] += weight * (value(set(coalition) | {i}) - value(set(coalition)))
+    return phi, value(set())
+
+
+def test_forest_contributions_match_brute_force_shapley(forest):
+    explainer = explainer_for(forest)
+    X = rows()
+    contributions = explainer.shap_values(X)
+    for x, phi in zip(X, contributions):
+        expected_phi, expected_value = brute_force_shapley(forest, x.astype(np.float32))
+        np.testing.assert_allclose(phi, expected_phi, rtol=1e-5, atol=1e-6)
+        assert explainer.expected_value == pytest.approx(expected_value, rel=1e-6)
+
+
+def test_contributions_add_up_to_the_prediction(forest, booster):
+    X = rows(50)
+    for model in (forest, booster):
+        explainer = explainer_for(model)
+        total = explainer.shap_values(X).sum(axis=1) + explainer.expected_value
+        np.testing.assert_allclose(total, model.predict(X), rtol=1e-5, atol=1e-3)
+
+
+def test_booster_contributions_match_xgboost(booster):
+    X = rows(20)
+    X[::3, 1] = np.nan
+    explainer = explainer_for(booster)
+    reference = booster.get_booster().predict(xgboost.DMatrix(X), pred_contribs=True)
+    np.testing.assert_allclose(explainer.shap_values(X), reference[:, :-1], rtol=1e-4, atol=1e-3)
+    assert explainer.expected_value == pytest.approx(reference[0, -1], rel=1e-5)
+
+
+def test_blocking_and_untabulated_paths_agree(forest, monkeypatch):
+    X = rows(40)
+    tabulated = explainer_for(forest).shap_values(X)
+    monkeypatch.setattr(attribution, 'PATTERN_TABLE_SIZE', 0)
+    explainer = TreeExplainer(compile_model(forest), block_size=64)
+    assert explainer._table is None
+    np.testing.assert_allclose(explainer.shap_values(X), tabulated, rtol=1e-9, atol=1e-9)
+
+
+def test_linear_contributions_add_up_to_the_prediction():
+    X, y = training_data()
+    model = LinearRegression().fit(X, y)
+    explainer = explainer_for(model)
+    total = explainer.shap_values(rows()).sum(axis=1) + explainer.expected_value
+    np.testing.assert_allclose(total, model.predict(rows()), rtol=1e-9)
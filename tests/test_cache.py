@@ -0,0 +1,115 @@
+"""Prediction cache keys and the cached scoring path of the batch predictor."""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_analytics import cache as cache_module
+from sales_analytics.cache import PredictionCache, feature_row_keys
+from sales_analytics.config import MODELS_DIR, PRODUCT_COLS
+from sales_analytics.prediction import load_predictor
+
+
+def test_equal_feature_rows_share_a_key():
+    rows = np.array([[1.0, 0.0, np.nan], [1.0, -0.0, -np.nan], [1.0, 0.0, np.float64(np.nan) * -1]])
+    keys = feature_row_keys(rows)
+    assert keys[0] == keys[1] == keys[2]
+    # Integer and float32 inputs hash as the float64 values they stand for
+    assert feature_row_keys(np.array([[3, 4]]))[0] == feature_row_keys(np.array([[3.0, 4.0]], np.float32))[0]
+    assert feature_row_keys(rows) == keys
+
+
+def test_different_feature_rows_get_different_keys():
+    rows = np.array([[1.0, 2.0], [2.0, 1.0], [1.0, 2.0 + 1e-12], [1.0, np.inf]])
+    assert len(set(feature_row_keys(rows))) == len(rows)
+
+
+def test_entries_are_evicted_least_recently_used_first():
+    cache = PredictionCache(max_entries=2, path=None)
+    cache.put_many('m', ['a', 'b'], [1.0, 2.0])
+    cache.get_many('m', ['a'])
+    cache.put_many('m', ['c'], [3.0])
+    values, hit = cache.get_many('m', ['a', 'b', 'c'])
+    assert hit.tolist() == [True, False, True]
+    assert values[hit].tolist() == [1.0, 3.0]
+    assert cache.stats['evictions'] == 1
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    cache = PredictionCache(ttl_seconds=60, path=None)
+    cache.put_many('m', ['a'], [1.0])
+    now[0] += 61
+    assert not cache.get_many('m', ['a'])[1].any()
+    assert cache.stats['expirations'] == 1
+
+
+def test_model_keys_separate_entries():
+    cache = PredictionCache(path=None)
+    cache.put_many('total_units:RF:v1', ['row'], [10.0])
+    assert not cache.get_many('total_units:RF:v2', ['row'])[1].any()
+    assert cache.invalidate('total_units:RF:v1') == 1
+
+
+def test_persistent_cache_round_trips(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    cache = PredictionCache(path=path)
+    cache.put_many('m', ['a', 'b'], [1.5, 2.5])
+    cache.flush()
+    values, hit = PredictionCache(path=path).get_many('m', ['a', 'b'])
+    assert hit.all() and values.tolist() == [1.5, 2.5]
+
+    with open(path, 'w') as f:
+        f.write('{not json')
+    assert len(PredictionCache(path=path)) == 0
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    path = tmp_path / 'models'
+    shutil.copytree(MODELS_DIR, path)
+    return str(path)
+
+
+def scenarios(n=20):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.integers(500, 5000, (n, len(PRODUCT_COLS))), columns=PRODUCT_COLS)
+    frame.insert(0, 'month', rng.integers(1, 13, n))
+    return frame
+
+
+def test_cached_predictions_match_and_follow_redeploys(models_dir):
+    predictor = load_predictor(models_dir, memory_budget_mb=None, cache=PredictionCache(path=None))
+    expected = predictor.predict(scenarios(), use_cache=False)
+
+    first = predictor.predict(scenarios())
+    assert predictor.cache.stats['hits'] == 0
+    # The first 20 rows repeat: only the 10 new ones are scored
+    again = predictor.predict(pd.concat([scenarios(), scenarios(30).tail(10)], ignore_index=True))
+    assert predictor.cache.stats['hits'] == 20 * len(predictor.targets)
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(again.head(20), expected)
+
+    # Publishing a new artifact changes its model key, so none of its cached values are served
+    target = predictor.targets[0]
+    key = predictor.model_key(target)
+    path = predictor.models.artifact_path(target)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    summary_path = os.path.join(models_dir, 'deployment_summary.json')
+    with open(summary_path) as f:
+        summary = json.load(f)
+    summary['best_models'][target]['test_rmse'] = 0.0
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f)
+    assert predictor.refresh() == [target]
+    assert predictor.model_key(target) != key
+
+    hits = predictor.cache.stats['hits']
+    predictor.predict(scenarios(), [target])
+    assert predictor.cache.stats['hits'] == hits
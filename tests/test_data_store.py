@@ -0,0 +1,115 @@
+"""The sales data store keeps every stored row when its source CSV changes or its layout moves on."""
+
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+import pytest
+
+from sales_analytics.config import DATA_PATH
+from sales_analytics.data_store import (MANIFEST, SALES_COLUMNS, SEQUENCE_COLUMN, STORE_LAYOUT, SalesDataStore,
+                                        SourceConflictError)
+
+pa = pytest.importorskip('pyarrow')
+ds = pytest.importorskip('pyarrow.dataset')
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'sales.csv'
+    shutil.copy(DATA_PATH, path)
+    return path
+
+
+@pytest.fixture
+def store(tmp_path, source):
+    store = SalesDataStore(str(tmp_path / 'store'), str(source))
+    store.ensure_current()
+    return store
+
+
+def ingested_rows(n=3):
+    rows = pd.read_csv(DATA_PATH).head(n)
+    rows['facecream'] += 1
+    return rows
+
+
+def resave(source, df):
+    # A later mtime than the store recorded, even on coarse-grained filesystems
+    df.to_csv(source, index=False)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_touched_source_keeps_ingested_rows(store, source):
+    store.append(ingested_rows())
+    version, rows = store.version, store.row_count()
+
+    resave(source, pd.read_csv(source))
+    assert store.row_count() == rows
+    assert store.version == version
+    assert store.read(['facecream']).shape[0] == rows
+
+
+def test_rows_added_to_source_are_appended(store, source):
+    store.append(ingested_rows())
+    csv = pd.read_csv(source)
+    extra = csv.tail(2).assign(shampoo=[1, 2])
+    resave(source, pd.concat([csv, extra]))
+
+    history = store.read(SALES_COLUMNS + [SEQUENCE_COLUMN])
+    assert len(history) == len(csv) + 3 + 2
+    newest = history.sort_values(SEQUENCE_COLUMN).tail(2)
+    assert newest['shampoo'].tolist() == [1, 2]
+
+    # Appended once: the next check sees an up-to-date signature
+    assert not store.ensure_current()
+    assert store.row_count() == len(csv) + 5
+
+
+def test_edited_source_rows_are_refused(store, source):
+    store.append(ingested_rows())
+    rows = store.row_count()
+    edited = pd.read_csv(source)
+    edited.loc[0, 'facewash'] += 7
+    resave(source, edited)
+
+    with pytest.raises(SourceConflictError):
+        store.read()
+    # Nothing was dropped; an explicit rebuild replaces the contents
+    resave(source, pd.read_csv(DATA_PATH))
+    assert store.row_count() == rows
+    store.rebuild()
+    assert store.row_count() == len(edited)
+
+
+def test_older_layout_is_migrated_with_its_rows(tmp_path, source):
+    root = tmp_path / 'legacy'
+    csv = pd.read_csv(source)
+    ingested = ingested_rows(2)
+    # Layout 1: no derived year or sequence, one fragment per write named by its write time
+    for i, frame in enumerate([csv, ingested]):
+        ds.write_dataset(pa.Table.from_pandas(frame, preserve_index=False), str(root), format='parquet',
+                         partitioning=['month_number'], partitioning_flavor='hive',
+                         basename_template=f'part-{time.time_ns() + i:x}-{{i}}.parquet',
+                         existing_data_behavior='overwrite_or_ignore')
+    table = pa.Table.from_pandas(csv, preserve_index=False)
+    stat = os.stat(source)
+    with open(root / MANIFEST, 'w') as f:
+        json.dump({'partition_keys': ['month_number'], 'rows': len(csv) + 2, 'columns': sorted(csv.columns),
+                   'schema': {field.name: str(field.type) for field in table.schema},
+                   'source': {'path': os.path.abspath(source), 'mtime_ns': stat.st_mtime_ns,
+                              'size': stat.st_size}}, f)
+
+    store = SalesDataStore(str(root), str(source))
+    history = store.read(SALES_COLUMNS + ['year', SEQUENCE_COLUMN])
+    assert store._manifest()['layout'] == STORE_LAYOUT
+    assert len(history) == len(csv) + 2
+    # Ingested rows keep their place after the source rows and open a new year
+    latest = history.sort_values(SEQUENCE_COLUMN).tail(2)
+    assert latest['facecream'].tolist() == ingested['facecream'].tolist()
+    assert latest['year'].tolist() == [2, 2]
+    # Partition values are re-typed to the stored schema, not left as inferred from directory names
+    assert store._manifest()['schema']['month_number'] == 'int64'
@@ -0,0 +1,85 @@
+"""Bounded chart payloads from the LTTB and min/max downsamplers."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_analytics.downsample import downsample, downsample_frame, lttb_indices, minmax_indices
+
+
+def reference_lttb(x, y, n_out):
+    """Point-by-point LTTB as originally described (Steinarsson, 2013)."""
+    n = len(x)
+
+    def edge(i):
+        # Bucket i spans [floor(i * every) + 1, floor((i + 1) * every) + 1) with every = (n - 2) / (n_out - 2)
+        return i * (n - 2) // (n_out - 2) + 1
+
+    selected, a = [0], 0
+    for i in range(n_out - 2):
+        start, end = edge(i), edge(i + 1)
+        next_start, next_end = end, min(edge(i + 2), n)
+        avg_x, avg_y = np.mean(x[next_start:next_end]), np.mean(y[next_start:next_end])
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+def series(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.cumsum(rng.uniform(0.5, 1.5, n))
+    y = np.cumsum(rng.normal(size=n)) + 20 * np.sin(x / 50)
+    return x, y
+
+
+@pytest.mark.parametrize('n, n_out', [(1000, 100), (1000, 3), (1000, 999), (97, 10), (10, 4), (32, 24)])
+def test_lttb_matches_the_reference_algorithm(n, n_out):
+    x, y = series(n)
+    np.testing.assert_array_equal(lttb_indices(x, y, n_out), reference_lttb(x, y, n_out))
+
+
+def test_lttb_keeps_the_endpoints_and_the_budget():
+    x, y = series()
+    index = lttb_indices(x, y, 50)
+    assert len(index) == 50 and index[0] == 0 and index[-1] == len(x) - 1
+    assert np.all(np.diff(index) > 0)
+    # Nothing to drop: every point is returned
+    np.testing.assert_array_equal(lttb_indices(x[:20], y[:20], 50), np.arange(20))
+
+
+@pytest.mark.parametrize('n, n_out', [(1000, 40), (60, 46)])
+def test_minmax_keeps_every_bucket_extreme(n, n_out):
+    x, y = series(n)
+    index = minmax_indices(y, n_out)
+    assert len(index) <= n_out and np.all(np.diff(index) > 0)
+    assert {0, n - 1, int(y.argmin()), int(y.argmax())} <= set(index.tolist())
+    n_buckets = (n_out - 2) // 2
+    edges = np.arange(n_buckets + 1) * n // n_buckets
+    for bucket in map(np.arange, edges[:-1], edges[1:]):
+        assert {bucket[y[bucket].argmin()], bucket[y[bucket].argmax()]} <= set(index.tolist())
+
+
+def test_downsample_drops_missing_samples_and_handles_dates():
+    x = pd.date_range('2020-01-01', periods=500, freq='D').to_numpy()
+    _, y = series(500)
+    y[::7] = np.nan
+    xs, ys = downsample(x, y, 60)
+    assert len(xs) == 60 and not np.isnan(ys).any()
+    assert xs.dtype == x.dtype and np.all(np.diff(xs) > np.timedelta64(0))
+    with pytest.raises(ValueError, match='downsampling method'):
+        downsample(x, y, 60, method='every_nth')
+
+
+def test_zoomed_frames_spend_the_budget_on_the_window():
+    x, y = series()
+    df = pd.DataFrame({'x': x, 'units': y, 'profit': y * 10})
+    zoomed = downsample_frame(df, 'x', ['units', 'profit'], 50, x_range=(x[100], x[300]))
+    for xs, ys in zoomed.values():
+        assert len(xs) == 50 and xs.min() >= x[100] and xs.max() <= x[300]
+    np.testing.assert_allclose(zoomed['profit'][1], zoomed['units'][1] * 10)
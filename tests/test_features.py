@@ -0,0 +1,94 @@
+"""Parity of the shared feature pipeline with the model building notebook's pandas code."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from sales_analytics.config import DATA_PATH, MODELS_DIR, PRODUCT_COLS
+from sales_analytics.features import (FEATURE_COLUMNS, SEASONS, build_feature_frame, build_feature_matrix,
+                                      build_feature_row, rolling_means)
+from sales_analytics.registry import ModelRegistry
+
+
+@pytest.fixture(scope='module')
+def sales():
+    return pd.read_csv(DATA_PATH)
+
+
+def notebook_features(sales_df):
+    """Feature matrix as built in model_building_company_sales.ipynb (before its dropna)."""
+    df = sales_df.copy()
+    df['month'] = df['month_number']
+    df['quarter'] = df['month_number'].apply(lambda x: (x - 1) // 3 + 1)
+    df['is_holiday_season'] = df['month_number'].apply(lambda x: 1 if x in [11, 12] else 0)
+    df['season'] = df['month_number'].apply(lambda x:
+        'Winter' if x in [12, 1, 2] else
+        'Spring' if x in [3, 4, 5] else
+        'Summer' if x in [6, 7, 8] else 'Fall')
+    df = pd.concat([df, pd.get_dummies(df['season'], prefix='season')], axis=1)
+    df['product_diversity'] = (df[PRODUCT_COLS] > 0).sum(axis=1)
+    for col in PRODUCT_COLS:
+        df[f'{col}_ma3'] = df[col].rolling(window=3, min_periods=1).mean()
+    return df.reindex(columns=FEATURE_COLUMNS, fill_value=0).astype(np.float64)
+
+
+def test_feature_frame_matches_notebook(sales):
+    np.testing.assert_allclose(build_feature_frame(sales).to_numpy(), notebook_features(sales).to_numpy())
+
+
+def test_build_feature_row_matches_matrix(sales):
+    scenarios = sales.rename(columns={'month_number': 'month'})
+    scenarios['is_holiday_season'] = (scenarios['month'] % 5 == 0).astype(int)
+    averages = rolling_means(scenarios[PRODUCT_COLS].to_numpy())
+    for i, product in enumerate(PRODUCT_COLS):
+        scenarios[f'{product}_ma3'] = averages[:, i]
+
+    matrix = build_feature_matrix(scenarios)
+    defaults = build_feature_matrix(scenarios[['month'] + PRODUCT_COLS])
+    for i, record in enumerate(scenarios.to_dict('records')):
+        products = {product: record[product] for product in PRODUCT_COLS}
+        moving_averages = {product: record[f'{product}_ma3'] for product in PRODUCT_COLS}
+        np.testing.assert_array_equal(
+            build_feature_row(record['month'], products, record['is_holiday_season'], moving_averages), matrix[i])
+        np.testing.assert_array_equal(build_feature_row(record['month'], products), defaults[i])
+
+
+def test_rolling_means_match_pandas(sales):
+    expected = sales[PRODUCT_COLS].rolling(3, min_periods=1).mean().to_numpy()
+    np.testing.assert_allclose(rolling_means(sales[PRODUCT_COLS].to_numpy()), expected)
+
+
+def test_rolling_means_never_cross_groups():
+    rng = np.random.default_rng(0)
+    stores = np.repeat(['a', 'b', 'c', 'd'], [1, 2, 7, 12])
+    history = pd.DataFrame(rng.integers(0, 5000, (len(stores), len(PRODUCT_COLS))), columns=PRODUCT_COLS)
+    history.insert(0, 'store', stores)
+
+    expected = (history.groupby('store', sort=False)[PRODUCT_COLS].rolling(3, min_periods=1).mean()
+                .reset_index(level=0, drop=True).sort_index().to_numpy())
+    np.testing.assert_allclose(rolling_means(history[PRODUCT_COLS].to_numpy(), groups=stores), expected)
+
+
+@pytest.mark.parametrize('months', [list(range(1, 13)), [6, 7, 8, 9], [12, 1, 2, 12]])
+def test_season_one_hot_matches_get_dummies(sales, months):
+    scenarios = pd.DataFrame({'month': months})
+    for product in PRODUCT_COLS:
+        scenarios[product] = 100
+
+    # get_dummies only emits the seasons present; the pipeline always has all four columns
+    season_columns = [f'season_{season}' for season in SEASONS]
+    expected = notebook_features(sales.iloc[[month - 1 for month in months]])[season_columns]
+
+    features = pd.DataFrame(build_feature_matrix(scenarios), columns=FEATURE_COLUMNS)
+    np.testing.assert_array_equal(features[season_columns].to_numpy(), expected.to_numpy())
+
+
+def test_stored_scaler_reproduces_training_matrix(sales):
+    # The notebook dropped the first month (its lag features are NaN there) before fitting the scaler
+    training = notebook_features(sales).iloc[1:]
+    expected = StandardScaler().fit_transform(training)
+
+    scaler = ModelRegistry(MODELS_DIR).scaler()
+    features = build_feature_frame(sales).iloc[1:]
+    np.testing.assert_allclose(scaler.transform(features), expected, atol=1e-5)
@@ -0,0 +1,92 @@
+"""Goal-seek search for product mixes that reach a forecast target."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_analytics.config import MODELS_DIR, PRODUCT_COLS
+from sales_analytics.goal_seek import goal_seek, repair
+from sales_analytics.prediction import load_predictor
+
+WEIGHTS = np.array([4.0, 1.0, 2.5, 3.0, 1.5, 6.0])
+
+
+class LinearProfit:
+    """Predictor stand-in forecasting profit as a weighted sum of the product units."""
+
+    targets = ['total_profit']
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, scenarios, targets, use_cache=True):
+        assert not use_cache
+        self.calls += 1
+        return pd.DataFrame({'total_profit': scenarios[PRODUCT_COLS].to_numpy() @ WEIGHTS})
+
+
+LOWER = np.array([100, 100, 100, 100, 100, 100])
+UPPER = np.array([1000, 800, 1200, 900, 1000, 700])
+
+
+def test_reachable_goals_are_hit_within_bounds_and_capacity():
+    predictor = LinearProfit()
+    mixes, stats = goal_seek(predictor, 'total_profit', 10_000, month=6, lower=LOWER, upper=UPPER, capacity=3500)
+
+    units = mixes[PRODUCT_COLS].to_numpy()
+    assert (units >= LOWER).all() and (units <= UPPER).all()
+    assert (units.sum(axis=1) <= 3500).all()
+    np.testing.assert_array_equal(mixes['total_units_input'], units.sum(axis=1))
+    np.testing.assert_allclose(mixes['predicted'], units @ WEIGHTS)
+    # Whole-unit mixes can land within one unit's worth of the goal
+    assert abs(mixes['gap'].iloc[0]) <= WEIGHTS.max()
+    assert len({tuple(row) for row in units}) == len(units)
+    assert stats['evaluations'] == predictor.calls * 128
+
+
+def test_unreachable_goals_return_the_closest_mixes():
+    # Every product at its maximum forecasts 16,200
+    mixes, _ = goal_seek(LinearProfit(), 'total_profit', 20_000, month=1, lower=LOWER, upper=UPPER)
+    np.testing.assert_array_equal(mixes[PRODUCT_COLS].iloc[0], UPPER)
+    assert (np.diff(np.abs(mixes['gap'])) >= 0).all()
+
+
+def test_search_is_reproducible_for_a_seed():
+    first, _ = goal_seek(LinearProfit(), 'total_profit', 9_000, 3, LOWER, UPPER, seed=7)
+    again, _ = goal_seek(LinearProfit(), 'total_profit', 9_000, 3, LOWER, UPPER, seed=7)
+    pd.testing.assert_frame_equal(first, again)
+
+
+def test_repair_keeps_whole_units_inside_bounds_and_capacity():
+    rng = np.random.default_rng(0)
+    candidates = rng.uniform(-500, 2000, (200, len(PRODUCT_COLS)))
+    repaired = repair(candidates, LOWER.astype(float), UPPER.astype(float), capacity=2000)
+    assert (repaired >= LOWER).all() and (repaired <= UPPER).all()
+    assert (repaired.sum(axis=1) <= 2000).all()
+    np.testing.assert_array_equal(repaired, np.round(repaired))
+
+
+@pytest.mark.parametrize('kwargs, message', [
+    ({'target': 'revenue'}, 'Unknown prediction target'),
+    ({'lower': UPPER + 1}, 'must not exceed'),
+    ({'capacity': 500}, 'exceed the capacity'),
+])
+def test_invalid_searches_are_refused(kwargs, message):
+    arguments = dict(target='total_profit', goal=1000, month=1, lower=LOWER, upper=UPPER)
+    arguments.update(kwargs)
+    with pytest.raises(ValueError, match=message):
+        goal_seek(LinearProfit(), **arguments)
+
+
+def test_deployed_tree_model_is_searched():
+    predictor = load_predictor(MODELS_DIR, memory_budget_mb=None)
+    goal = 200_000
+    mixes, _ = goal_seek(predictor, 'total_profit', goal, month=6, lower=np.full(6, 500), upper=np.full(6, 6000),
+                         generations=20)
+    scenarios = mixes[PRODUCT_COLS].assign(month=6)
+    forecast = predictor.predict(scenarios, ['total_profit'], use_cache=False)['total_profit'].to_numpy()
+    np.testing.assert_allclose(mixes['predicted'], forecast)
+    random_mixes = np.random.default_rng(0).integers(500, 6000, (128, 6))
+    random_forecast = predictor.predict(pd.DataFrame(random_mixes, columns=PRODUCT_COLS).assign(month=6),
+                                        ['total_profit'], use_cache=False)['total_profit']
+    assert abs(mixes['gap'].iloc[0]) <= np.abs(random_forecast - goal).min()
@@ -0,0 +1,188 @@
+"""Ingestion from the drop directory into the sales data store."""
+
+import glob
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_analytics.config import DATA_PATH
+from sales_analytics.data_store import SALES_COLUMNS, SEQUENCE_COLUMN, SalesDataStore
+from sales_analytics.ingestion import (LOCK_FILE, STATE_FILE, IngestionPipeline, _exclusive, submit_records,
+                                       validate_sales_records)
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def store(tmp_path):
+    source = tmp_path / 'sales.csv'
+    shutil.copy(DATA_PATH, source)
+    store = SalesDataStore(str(tmp_path / 'store'), str(source))
+    store.ensure_current()
+    return store
+
+
+@pytest.fixture
+def drop_dir(tmp_path):
+    path = tmp_path / 'incoming'
+    path.mkdir()
+    return str(path)
+
+
+def actuals(n=2):
+    return pd.read_csv(DATA_PATH)[SALES_COLUMNS].head(n)
+
+
+@pytest.mark.parametrize('column, value, message', [
+    ('facecream', 'lots', 'non-numeric'),
+    ('facecream', None, 'non-numeric'),
+    ('shampoo', -5, 'negative'),
+    ('month_number', 13, 'between 1 and 12'),
+    ('total_units', 10, 'below the product sum'),
+    ('toothpaste', 2.5, 'fractional'),
+])
+def test_invalid_rows_are_rejected_alone(column, value, message):
+    records = actuals(3).astype(object)
+    records.loc[1, column] = value
+    valid, rejected = validate_sales_records(records)
+    assert len(valid) == 2 and len(rejected) == 1
+    assert message in rejected.loc[0, 'error']
+    assert valid['facecream'].dtype == np.int64
+
+
+def test_records_off_the_schema_are_refused(store):
+    schema = store.schema()
+    # The store derives its period and sequence columns; producers never send them
+    valid, rejected = validate_sales_records(actuals(), schema)
+    assert len(valid) == 2 and rejected.empty
+    with pytest.raises(ValueError, match='missing'):
+        validate_sales_records(actuals().drop(columns='shampoo'), schema)
+    with pytest.raises(ValueError, match='unexpected'):
+        validate_sales_records(actuals().assign(**{SEQUENCE_COLUMN: 0}), schema)
+
+
+def test_jsonl_streams_resume_from_their_committed_offset(store, drop_dir):
+    rows = store.row_count()
+    path = os.path.join(drop_dir, 'actuals.jsonl')
+    submit_records(actuals(2), drop_dir)
+    # A producer mid-write: the unterminated line waits for its newline
+    record = json.dumps(actuals(3).iloc[2].to_dict(), default=int)
+    with open(path, 'a') as f:
+        f.write(record[:20])
+
+    assert IngestionPipeline(drop_dir, store).poll()['rows'] == 2
+    with open(path, 'a') as f:
+        f.write(record[20:] + '\n{broken\n')
+
+    # A fresh pipeline picks up the saved offset: only the completed line is new
+    summary = IngestionPipeline(drop_dir, store).poll()
+    assert (summary['rows'], summary['rejected']) == (1, 1)
+    with open(os.path.join(drop_dir, STATE_FILE)) as f:
+        assert json.load(f)['offsets']['actuals.jsonl'] == os.path.getsize(path)
+    assert IngestionPipeline(drop_dir, store).poll()['rows'] == 0
+
+    history = store.read(SALES_COLUMNS + [SEQUENCE_COLUMN]).sort_values(SEQUENCE_COLUMN)
+    assert history[SEQUENCE_COLUMN].tolist() == list(range(rows + 3))
+    assert history['facecream'].tail(3).tolist() == actuals(3)['facecream'].tolist()
+
+
+def test_truncated_streams_are_read_from_the_start(store, drop_dir):
+    pipeline = IngestionPipeline(drop_dir, store)
+    submit_records(actuals(3), drop_dir)
+    assert pipeline.poll()['rows'] == 3
+    os.remove(os.path.join(drop_dir, 'actuals.jsonl'))
+    submit_records(actuals(1), drop_dir)
+    assert pipeline.poll()['rows'] == 1
+
+
+def test_csv_files_are_moved_once_ingested(store, drop_dir):
+    actuals(2).to_csv(os.path.join(drop_dir, 'march.csv'), index=False)
+    actuals(2).drop(columns='total_profit').to_csv(os.path.join(drop_dir, 'partial.csv'), index=False)
+
+    summary = IngestionPipeline(drop_dir, store).poll()
+    assert (summary['rows'], summary['rejected'], summary['files']) == (2, 1, 2)
+    assert not glob.glob(os.path.join(drop_dir, '*.csv'))
+    assert len(glob.glob(os.path.join(drop_dir, 'processed', '*.csv'))) == 2
+    rejected = pd.read_csv(glob.glob(os.path.join(drop_dir, 'rejected', 'partial-*.csv'))[0])
+    assert 'total_profit' in rejected.loc[0, 'error']
+
+
+def test_failed_poll_is_retried_without_duplicates(store, drop_dir, monkeypatch):
+    pipeline = IngestionPipeline(drop_dir, store)
+    submit_records(actuals(), drop_dir)
+    rows = store.row_count()
+
+    def unavailable(df):
+        raise OSError('disk busy')
+
+    append = store.append
+    monkeypatch.setattr(store, 'append', unavailable)
+    assert pipeline.poll_safely() is None
+    assert pipeline.totals['errors'] == 1
+
+    monkeypatch.setattr(store, 'append', append)
+    assert pipeline.poll_safely()['rows'] == 2
+    assert pipeline.poll_safely()['rows'] == 0
+    assert store.row_count() == rows + 2
+
+
+def test_failing_listener_does_not_reingest(store, drop_dir):
+    def listener(rows):
+        raise RuntimeError('listener bug')
+
+    pipeline = IngestionPipeline(drop_dir, store, listeners=[listener])
+    submit_records(actuals(), drop_dir)
+    rows = store.row_count()
+
+    assert pipeline.poll()['rows'] == 2
+    assert pipeline.poll()['rows'] == 0
+    assert store.row_count() == rows + 2
+    assert pipeline.totals['errors'] == 1
+
+
+def test_run_keeps_polling_after_a_failure(store, drop_dir, monkeypatch):
+    pipeline = IngestionPipeline(drop_dir, store)
+    stop = threading.Event()
+    calls = []
+
+    def poll():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError('transient')
+        stop.set()
+        return {}
+
+    monkeypatch.setattr(pipeline, 'poll', poll)
+    pipeline.run(interval=0, stop_event=stop)
+    assert len(calls) == 2
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='holds the lock from a forked process')
+def test_poll_skips_while_another_process_holds_the_drop_directory(store, drop_dir):
+    submit_records(actuals(), drop_dir)
+    rows = store.row_count()
+    ready, release = multiprocessing.Event(), multiprocessing.Event()
+    holder = multiprocessing.get_context('fork').Process(target=_hold_lock, args=(drop_dir, ready, release))
+    holder.start()
+    try:
+        assert ready.wait(10)
+        summary = IngestionPipeline(drop_dir, store).poll()
+        assert summary['busy'] and summary['rows'] == 0
+    finally:
+        release.set()
+        holder.join(10)
+
+    assert IngestionPipeline(drop_dir, store).poll(wait=True)['rows'] == 2
+    assert store.row_count() == rows + 2
+
+
+def _hold_lock(drop_dir, ready, release):
+    with _exclusive(os.path.join(drop_dir, LOCK_FILE), wait=True):
+        ready.set()
+        release.wait(10)
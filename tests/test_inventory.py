@@ -0,0 +1,117 @@
+"""Monte Carlo inventory simulation over bootstrapped demand paths."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_analytics.config import DATA_PATH, PRODUCT_COLS
+from sales_analytics.features import FEATURE_COLUMNS, build_feature_frame
+from sales_analytics.inventory import (bootstrap_demand, order_up_to_levels, plan_inventory, protection_demand,
+                                       simulate_policy)
+from sales_analytics.reconciliation import product_hierarchy, product_residuals
+from sales_analytics.train import make_model
+
+
+class DeployedRF:
+    """Predictor stand-in with deployed total and RF face cream models."""
+
+    models = {}
+    feature_columns = FEATURE_COLUMNS
+    algorithms = {'total_units': 'LR', 'facecream': 'RF'}
+
+    @property
+    def targets(self):
+        return list(self.algorithms)
+
+
+def test_demand_paths_resample_out_of_sample_errors():
+    history = pd.read_csv(DATA_PATH)
+    hierarchy = product_hierarchy()
+    residuals = product_residuals(DeployedRF(), history, hierarchy, n_splits=3)[:, hierarchy.n_aggregate:]
+
+    # Forecasts far above zero, so no path is clipped and each month is one whole residual row
+    forecast = np.full((4, len(PRODUCT_COLS)), 1e6)
+    paths = bootstrap_demand(forecast, residuals, n_paths=500)
+    deviations = (paths - forecast[None]).reshape(-1, len(PRODUCT_COLS))
+    drawn = (np.abs(deviations[:, None] - residuals[None]).max(axis=2) < 1e-6).any(axis=1)
+    assert drawn.all()
+
+    # An in-sample fit nearly memorises the months; its errors would understate the spread
+    column = PRODUCT_COLS.index('facecream')
+    features = build_feature_frame(history).to_numpy()
+    fitted = make_model('RF').fit(features, history['facecream'])
+    in_sample = history['facecream'].to_numpy() - fitted.predict(features)
+    assert np.abs(residuals[:, column]).mean() > np.abs(in_sample).mean()
+
+
+def demand_paths(n_paths=300, n_months=6, n_products=3, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.gamma(4.0, 50.0, (n_paths, n_months, n_products))
+
+
+def reference_policy(demand, levels, lead_time):
+    """One path of the monthly order-up-to policy with lost sales, month by month."""
+    n_months, n_products = demand.shape
+    on_hand = levels[0].copy()
+    arriving = [np.zeros(n_products) for _ in range(lead_time)]
+    ending, lost = np.empty_like(demand), np.empty_like(demand)
+    for month in range(n_months):
+        if lead_time:
+            on_hand = on_hand + arriving.pop(0)
+        order = np.maximum(levels[month] - on_hand - sum(arriving, np.zeros(n_products)), 0.0)
+        if lead_time:
+            arriving.append(order)
+        else:
+            on_hand = on_hand + order
+        lost[month] = np.maximum(demand[month] - on_hand, 0.0)
+        on_hand = np.maximum(on_hand - demand[month], 0.0)
+        ending[month] = on_hand
+    return ending, lost
+
+
+def test_protection_demand_sums_each_interval():
+    paths = demand_paths(5)
+    for lead_time in (0, 1, 2):
+        windows = protection_demand(paths, lead_time)
+        for month in range(paths.shape[1]):
+            expected = paths[:, month:month + lead_time + 1].sum(axis=1)
+            np.testing.assert_allclose(windows[:, month], expected)
+
+
+@pytest.mark.parametrize('lead_time', [0, 1, 2])
+def test_vectorized_policy_matches_a_path_by_path_simulation(lead_time):
+    paths = demand_paths(20)
+    levels = np.random.default_rng(1).uniform(150, 600, paths.shape[1:])
+    ending, lost = simulate_policy(paths, levels, lead_time)
+    for path in range(len(paths)):
+        expected_ending, expected_lost = reference_policy(paths[path], levels, lead_time)
+        np.testing.assert_allclose(ending[path], expected_ending)
+        np.testing.assert_allclose(lost[path], expected_lost)
+
+
+def test_order_up_to_levels_cover_the_service_level():
+    paths = demand_paths(20_000, seed=2)
+    levels = order_up_to_levels(paths, lead_time=1, service_level=0.9)
+    covered = (protection_demand(paths, 1) <= levels).mean(axis=0)
+    np.testing.assert_allclose(covered, 0.9, atol=0.005)
+
+
+def test_known_demand_is_never_lost():
+    history = np.full((12, len(PRODUCT_COLS)), 500.0)
+    forecast = np.full((6, len(PRODUCT_COLS)), 500.0)
+    plan, policy, baseline = plan_inventory(forecast, np.zeros((10, len(PRODUCT_COLS))), history, n_paths=100)
+    assert list(plan.index) == PRODUCT_COLS
+    np.testing.assert_allclose(plan['safety_stock'], 0, atol=1e-9)
+    np.testing.assert_allclose(policy['fill_rate'], 1.0)
+    np.testing.assert_allclose(baseline['fill_rate'], 1.0)
+    np.testing.assert_allclose(policy['demand_units'], 6 * 500.0)
+
+
+def test_forecast_policy_beats_the_history_baseline_on_rising_demand():
+    rng = np.random.default_rng(4)
+    history = rng.normal(500, 40, (12, len(PRODUCT_COLS)))
+    forecast = np.full((6, len(PRODUCT_COLS)), 900.0)
+    residuals = rng.normal(0, 40, (10, len(PRODUCT_COLS)))
+    _, policy, baseline = plan_inventory(forecast, residuals, history, n_paths=2000)
+    assert (policy['fill_rate'] > baseline['fill_rate']).all()
+    assert (policy['stockout_probability'] < baseline['stockout_probability']).all()
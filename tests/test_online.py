@@ -0,0 +1,72 @@
+"""Incremental updates of the deployed models against refits from scratch."""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+from sales_analytics.online import update_linear, update_random_forest, update_xgb
+
+
+def regression_rows(n, seed, n_features=4):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, n_features))
+    y = X @ np.array([3.0, -2.0, 0.5, 1.5][:n_features]) + 7.0 + rng.normal(0, 0.3, n)
+    return X, y
+
+
+def test_recursive_least_squares_matches_batch_ols():
+    history, y_history = regression_rows(200, 0)
+    new, y_new = regression_rows(60, 1)
+    model = LinearRegression().fit(history, y_history)
+
+    # Fed in uneven blocks, with a negligible ridge on the initial precision
+    updated = model
+    for block in (slice(0, 10), slice(10, 11), slice(11, 60)):
+        updated = update_linear(updated, new[block], y_new[block], history, ridge=1e-9)
+
+    batch = LinearRegression().fit(np.vstack([history, new]), np.concatenate([y_history, y_new]))
+    np.testing.assert_allclose(updated.coef_, batch.coef_, rtol=1e-8)
+    assert updated.intercept_ == pytest.approx(batch.intercept_, rel=1e-8)
+    # The deployed model itself is left untouched
+    assert getattr(model, 'online_precision_', None) is None
+
+
+def test_ridge_pulls_towards_the_deployed_coefficients():
+    history, y_history = regression_rows(30, 0)
+    new, y_new = regression_rows(10, 1)
+    model = LinearRegression().fit(history, y_history)
+    ridge = 5.0
+    updated = update_linear(model, new, y_new, history, ridge=ridge)
+
+    # argmin |y - A theta|^2 over every row + ridge |theta - theta_deployed|^2
+    A = np.column_stack([np.vstack([history, new]), np.ones(len(history) + len(new))])
+    y = np.concatenate([y_history, y_new])
+    theta0 = np.append(model.coef_, model.intercept_)
+    expected = np.linalg.solve(A.T @ A + ridge * np.eye(A.shape[1]), A.T @ y + ridge * theta0)
+    np.testing.assert_allclose(np.append(updated.coef_, updated.intercept_), expected, rtol=1e-9)
+
+
+def test_forest_grows_new_trees_and_retires_the_oldest():
+    X, y = regression_rows(100, 0)
+    model = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+    new, y_new = regression_rows(20, 1)
+
+    updated = update_random_forest(model, new, y_new, trees=5, max_trees=12)
+    assert len(updated.estimators_) == updated.n_estimators == 12
+    seeds = [estimator.random_state for estimator in updated.estimators_]
+    assert seeds[:7] == [estimator.random_state for estimator in model.estimators_[3:]]
+    assert len(model.estimators_) == 10
+
+
+def test_boosting_continues_from_the_deployed_booster():
+    xgboost = pytest.importorskip('xgboost')
+    X, y = regression_rows(100, 0)
+    model = xgboost.XGBRegressor(n_estimators=20, max_depth=3, random_state=0).fit(X, y)
+    new, y_new = regression_rows(40, 1)
+
+    updated = update_xgb(model, new, y_new, rounds=5)
+    assert updated.get_booster().num_boosted_rounds() == 25
+    # The first rounds are the deployed ensemble, unchanged
+    np.testing.assert_allclose(updated.predict(new, iteration_range=(0, 20)), model.predict(new), rtol=1e-6)
+    assert np.mean((updated.predict(new) - y_new) ** 2) < np.mean((model.predict(new) - y_new) ** 2)
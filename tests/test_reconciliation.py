@@ -0,0 +1,131 @@
+"""Hierarchical reconciliation of the product forecasts."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from sales_analytics.config import DATA_PATH, PRODUCT_COLS
+from sales_analytics.features import FEATURE_COLUMNS, build_feature_frame
+from sales_analytics.model_selection import walk_forward_splits
+from sales_analytics.reconciliation import (RECONCILIATION_METHODS, Hierarchy, historical_proportions, mint,
+                                            product_hierarchy, product_residuals, reconcile, reconcile_forecast,
+                                            shrinkage_intensity)
+
+
+def store_hierarchy(n_stores=4, n_products=3):
+    bottom = pd.DataFrame([(f's{store}', f'p{product}') for store in range(n_stores) for product in range(n_products)],
+                          columns=['store', 'product'])
+    return Hierarchy.from_levels(bottom, [(), ('store',), ('product',)])
+
+
+def incoherent_forecasts(hierarchy, batch=5, months=30, seed=0):
+    """(base forecasts, residuals): coherent values plus noise on every node."""
+    rng = np.random.default_rng(seed)
+    truth = hierarchy.aggregate_bottoms(rng.uniform(100, 1000, (batch, hierarchy.n_bottom)))
+    residuals = rng.normal(size=(months, hierarchy.n_nodes)) * rng.uniform(5, 50, hierarchy.n_nodes)
+    return truth + rng.normal(0, 30, truth.shape), residuals
+
+
+def dense_mint(hierarchy, base, weights):
+    """y~ = S (S' W^-1 S)^-1 S' W^-1 y with dense matrices."""
+    S = hierarchy.summing_matrix.toarray()
+    inverse = np.linalg.inv(weights)
+    return (S @ np.linalg.solve(S.T @ inverse @ S, S.T @ inverse @ base.T)).T
+
+
+class DeployedLR:
+    """Predictor stand-in with one deployed LR target and no in-sample predictions to offer."""
+
+    models = {}
+    feature_columns = FEATURE_COLUMNS
+    algorithms = {'total_units': 'LR'}
+
+    @property
+    def targets(self):
+        return list(self.algorithms)
+
+
+def test_modelled_residuals_are_out_of_sample():
+    history = pd.read_csv(DATA_PATH)
+    hierarchy = product_hierarchy()
+    residuals = product_residuals(DeployedLR(), history, hierarchy, n_splits=3)
+
+    splits = walk_forward_splits(len(history), 3)
+    assert residuals.shape == (len(history) - splits[0][1].start, hierarchy.n_nodes)
+
+    # Each test window is scored by a model (and scaler) fitted only on the months before it
+    features = build_feature_frame(history).to_numpy(dtype=np.float64)
+    actual = history['total_units'].to_numpy(dtype=np.float64)
+    expected = np.concatenate([
+        actual[test] - make_pipeline(StandardScaler(), LinearRegression()).fit(features[train], actual[train]).predict(
+            features[test])
+        for train, test in splits])
+    np.testing.assert_allclose(residuals[:, hierarchy.nodes.index('total_units')], expected, rtol=1e-6, atol=1e-6)
+
+    # Unmodelled products keep the trailing-mean projection over the same months
+    first = splits[0][1].start
+    facecream = history['facecream'].to_numpy(dtype=np.float64)
+    projection = [facecream[max(month - 3, 0):month].mean() for month in range(first, len(history))]
+    np.testing.assert_allclose(residuals[:, hierarchy.nodes.index('facecream')], facecream[first:] - projection)
+
+
+@pytest.mark.parametrize('method', RECONCILIATION_METHODS)
+def test_every_method_returns_coherent_forecasts(method):
+    hierarchy = store_hierarchy()
+    base, residuals = incoherent_forecasts(hierarchy)
+    assert np.abs(hierarchy.incoherence(base)).max() > 1
+    proportions = historical_proportions(hierarchy, np.abs(base[:, hierarchy.n_aggregate:]))
+    coherent = reconcile(hierarchy, base, method, residuals=residuals, proportions=proportions)
+    assert coherent.shape == base.shape
+    np.testing.assert_allclose(hierarchy.incoherence(coherent), 0, atol=1e-8)
+
+
+@pytest.mark.parametrize('method', ['ols', 'wls_struct', 'wls_var', 'mint_shrink'])
+def test_coherent_forecasts_are_left_unchanged(method):
+    hierarchy = store_hierarchy()
+    base, residuals = incoherent_forecasts(hierarchy)
+    coherent = hierarchy.aggregate_bottoms(base[:, hierarchy.n_aggregate:])
+    np.testing.assert_allclose(mint(hierarchy, coherent, method, residuals), coherent, rtol=1e-10)
+
+
+def test_mint_matches_the_dense_projection():
+    hierarchy = store_hierarchy()
+    base, residuals = incoherent_forecasts(hierarchy)
+    variances = (residuals ** 2).mean(axis=0)
+    intensity = shrinkage_intensity(residuals)
+    shrunk = intensity * np.diag(variances) + (1 - intensity) * residuals.T @ residuals / len(residuals)
+    structural = np.diag(np.asarray(hierarchy.summing_matrix.sum(axis=1)).ravel())
+
+    np.testing.assert_allclose(mint(hierarchy, base, 'ols'), dense_mint(hierarchy, base, np.eye(hierarchy.n_nodes)),
+                               rtol=1e-8)
+    np.testing.assert_allclose(mint(hierarchy, base, 'wls_struct'), dense_mint(hierarchy, base, structural), rtol=1e-8)
+    np.testing.assert_allclose(mint(hierarchy, base, 'wls_var', residuals),
+                               dense_mint(hierarchy, base, np.diag(variances)), rtol=1e-8)
+    np.testing.assert_allclose(mint(hierarchy, base, 'mint_shrink', residuals), dense_mint(hierarchy, base, shrunk),
+                               rtol=1e-8)
+
+
+def test_residual_methods_need_residuals():
+    hierarchy = store_hierarchy()
+    base, _ = incoherent_forecasts(hierarchy)
+    with pytest.raises(ValueError, match='residuals'):
+        reconcile(hierarchy, base, 'mint_shrink')
+
+
+def test_forecast_total_equals_its_products():
+    hierarchy = product_hierarchy()
+    rng = np.random.default_rng(3)
+    forecast = pd.DataFrame(rng.uniform(1000, 5000, (4, len(PRODUCT_COLS))),
+                            columns=[f'{product}_units' for product in PRODUCT_COLS])
+    forecast['total_units'] = forecast.sum(axis=1) * 1.1
+    forecast['total_profit'] = forecast['total_units'] * 10
+    residuals = rng.normal(0, 100, (12, hierarchy.n_nodes))
+
+    reconciled = reconcile_forecast(forecast, 'mint_shrink', hierarchy, residuals)
+    units = reconciled[[f'{product}_units' for product in PRODUCT_COLS]].sum(axis=1)
+    np.testing.assert_allclose(reconciled['total_units'], units, rtol=1e-10)
+    # Profit per unit of the total_profit model is kept
+    np.testing.assert_allclose(reconciled['total_profit'] / reconciled['total_units'], 10, rtol=1e-10)
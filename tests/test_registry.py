@@ -0,0 +1,83 @@
+"""Serving backends and model identities of the model registry."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from sales_analytics.config import COMPILED_MAX_BATCH, MODELS_DIR
+from sales_analytics.registry import ModelRegistry
+from sales_analytics.tree_engine import AcceleratedTreeModel, CompiledTreeEnsemble
+
+TREE_ALGORITHMS = ('RF', 'XGB')
+
+
+@pytest.fixture
+def registry():
+    return ModelRegistry(MODELS_DIR, memory_budget_mb=None)
+
+
+def tree_targets():
+    registry = ModelRegistry(MODELS_DIR, memory_budget_mb=None)
+    return [target for target, algorithm in registry.algorithms.items() if algorithm in TREE_ALGORITHMS]
+
+
+class Recorder:
+    """Counts the rows each backend is asked to score."""
+
+    def __init__(self, backend, calls, name):
+        self.backend = backend
+        self.calls = calls
+        self.name = name
+
+    def predict(self, X):
+        self.calls.append((self.name, len(X)))
+        return self.backend.predict(X)
+
+
+@pytest.mark.parametrize('target', tree_targets())
+def test_compact_trees_keep_a_native_backend(registry, target):
+    assert registry.artifact_path(target).endswith('.bin')
+    model = registry[target]
+    assert isinstance(model, AcceleratedTreeModel)
+    assert isinstance(model.compiled, CompiledTreeEnsemble)
+    # The joblib model is only unpickled once a large batch needs it
+    assert model._native is None
+
+
+@pytest.mark.parametrize('target', tree_targets())
+def test_batches_route_by_size(registry, target):
+    model = registry[target]
+    calls = []
+    model.compiled = Recorder(model.compiled, calls, 'compiled')
+    X = np.zeros((COMPILED_MAX_BATCH + 1, len(registry.feature_columns)))
+
+    for size in (1, COMPILED_MAX_BATCH):
+        model.predict(X[:size])
+    assert model._native is None
+
+    model._native = Recorder(model.native, calls, 'native')
+    model.predict(X)
+    assert calls == [('compiled', 1), ('compiled', COMPILED_MAX_BATCH), ('native', COMPILED_MAX_BATCH + 1)]
+
+
+def test_uncompiled_registry_serves_the_compact_ensemble():
+    registry = ModelRegistry(MODELS_DIR, memory_budget_mb=None, compiled=False)
+    for target in tree_targets():
+        assert isinstance(registry[target], CompiledTreeEnsemble)
+
+
+def test_model_keys_wait_for_a_refresh_in_progress(registry):
+    target = registry.targets[0]
+    key = registry.model_key(target)
+    registry._versions.clear()
+    keys = []
+    reader = threading.Thread(target=lambda: keys.append(registry.model_key(target)))
+
+    # refresh() swaps the deployment and drops versions under the lock; readers must not interleave
+    with registry._lock:
+        reader.start()
+        reader.join(0.2)
+        assert reader.is_alive() and target not in registry._versions
+    reader.join()
+    assert keys == [key]
@@ -0,0 +1,87 @@
+"""Trailing moving-average state behind scenarios without their own `_ma3` columns."""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_analytics.config import PRODUCT_COLS
+from sales_analytics.rolling_state import RollingWindowStore
+
+
+def months(units, first_month=1):
+    """Sales history with every product selling `units[i]` in month i."""
+    frame = pd.DataFrame({product: np.asarray(units, dtype=np.float64) for product in PRODUCT_COLS})
+    frame.insert(0, 'month_number', (np.arange(len(units)) + first_month - 1) % 12 + 1)
+    return frame
+
+
+def scenarios(month, units):
+    frame = pd.DataFrame({product: np.asarray(units, dtype=np.float64) for product in PRODUCT_COLS})
+    frame.insert(0, 'month', month)
+    return frame
+
+
+class VersionedStore:
+    """Data store stand-in serving a fixed history under a version."""
+
+    def __init__(self, version, history):
+        self.version = version
+        self.history = history
+
+    def tail(self, n, columns):
+        return self.history[columns].tail(n)
+
+
+def test_readers_never_see_a_partial_refresh():
+    stores = [VersionedStore(1, months([100, 200, 300])), VersionedStore(2, months([4000, 5000, 6000]))]
+    state = RollingWindowStore.from_store(stores[0])
+    expected = {200.0, 5000.0}
+    seen, failures = set(), []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                value = state.means()[PRODUCT_COLS[0]]
+            except ValueError as error:
+                failures.append(error)
+                continue
+            seen.add(value)
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    for reader in readers:
+        reader.start()
+    for i in range(500):
+        assert state.refresh(stores[(i + 1) % 2])
+    done.set()
+    for reader in readers:
+        reader.join()
+
+    assert not failures
+    assert seen <= expected
+    assert state.version == 1 and state.last_month == 3
+
+
+def test_single_month_scenarios_share_the_stored_window():
+    state = RollingWindowStore.from_frame(months([10, 20, 30]))
+    filled = state.fill_moving_averages(scenarios(4, [40, 100]))
+    assert filled[f'{PRODUCT_COLS[0]}_ma3'].tolist() == [30.0, 50.0]
+
+
+def test_planning_sequence_is_chained_in_month_order():
+    state = RollingWindowStore.from_frame(months([10, 20, 30], first_month=10))
+    # January follows December in the stored history; rows arrive out of order
+    table = pd.concat([scenarios([2], [90]), scenarios([1], [60]), scenarios([3], [120])], ignore_index=True)
+    filled = state.fill_moving_averages(table)
+    assert filled[f'{PRODUCT_COLS[0]}_ma3'].tolist() == [(30 + 60 + 90) / 3, (20 + 30 + 60) / 3, (60 + 90 + 120) / 3]
+
+
+def test_repeated_months_in_a_sequence_are_refused():
+    state = RollingWindowStore.from_frame(months([10, 20, 30]))
+    with pytest.raises(ValueError, match='each month once'):
+        state.fill_moving_averages(scenarios([4, 4, 5], [1, 2, 3]))
+    # Explicit moving averages need no history
+    explicit = scenarios([4, 4, 5], [1, 2, 3]).assign(**{f'{product}_ma3': 1.0 for product in PRODUCT_COLS})
+    assert state.fill_moving_averages(explicit) is explicit
@@ -0,0 +1,129 @@
+"""Rollup cube answers against pandas on the raw rows."""
+
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_analytics.config import DATA_PATH, PRODUCT_COLS
+from sales_analytics.data_store import SalesDataStore
+from sales_analytics.features import SEASON_MAP, quarter_of
+from sales_analytics.rollups import MEASURES, RollupCube
+
+
+def history(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.integers(1000, 9000, (n, len(PRODUCT_COLS))), columns=PRODUCT_COLS)
+    df['month_number'] = np.tile(np.arange(1, 13), n // 12 + 1)[:n]
+    df['year'] = np.arange(n) // 12 + 1
+    df['total_units'] = df[PRODUCT_COLS].sum(axis=1) + rng.integers(0, 50, n)
+    # Large, noisy values stress the shifted cross-product arithmetic
+    df['total_profit'] = df['total_units'] * 10 + rng.normal(0, 5000, n) + 1e7
+    return df
+
+
+def with_dimensions(df):
+    return df.assign(quarter=[f'Q{q}' for q in quarter_of(df['month_number'])],
+                     season=df['month_number'].map(SEASON_MAP),
+                     profit_per_unit=df['total_profit'] / df['total_units'])
+
+
+def assert_same_cells(cube, expected):
+    for dimension in ('month_number', 'quarter', 'season', 'year'):
+        pd.testing.assert_frame_equal(cube.sum(MEASURES, by=dimension), expected.sum(MEASURES, by=dimension),
+                                      check_names=False)
+        pd.testing.assert_series_equal(cube.count(by=dimension), expected.count(by=dimension))
+
+
+@pytest.mark.parametrize('dimension', ['month_number', 'quarter', 'season', 'year'])
+def test_rollups_match_pandas_groupby(dimension):
+    df = with_dimensions(history())
+    cube = RollupCube.from_frame(df)
+    grouped = df.groupby(dimension)
+
+    sums = cube.sum(MEASURES, by=dimension)
+    np.testing.assert_allclose(sums.to_numpy(), grouped[MEASURES].sum().loc[sums.index].to_numpy(), rtol=1e-12)
+    means = cube.mean(['total_profit', 'profit_per_unit'], by=dimension)
+    np.testing.assert_allclose(means.to_numpy(),
+                               grouped[['total_profit', 'profit_per_unit']].mean().loc[means.index].to_numpy(),
+                               rtol=1e-12)
+    counts = cube.count(by=dimension)
+    assert counts.tolist() == grouped.size().loc[counts.index].tolist()
+
+
+def test_filtered_totals_match_pandas():
+    df = with_dimensions(history())
+    cube = RollupCube.from_frame(df)
+    summer = df[df['season'] == 'Summer']
+    assert cube.sum('facecream', where={'season': 'Summer'}) == pytest.approx(summer['facecream'].sum(), rel=1e-12)
+    assert cube.count(where={'quarter': ['Q1', 'Q4']}) == df['quarter'].isin(['Q1', 'Q4']).sum()
+    np.testing.assert_allclose(cube.covariance(PRODUCT_COLS, where={'season': 'Summer'}).to_numpy(),
+                               summer[PRODUCT_COLS].cov().to_numpy(), rtol=1e-9)
+
+
+def test_incremental_updates_and_merges_match_a_single_pass():
+    df = history()
+    whole = RollupCube.from_frame(df)
+
+    incremental = RollupCube.from_frame(df.iloc[:100])
+    for start in range(100, len(df), 37):
+        incremental.update(df.iloc[start:start + 37])
+    assert_same_cells(incremental, whole)
+
+    # Partial cubes over the same shift add up cell by cell, including shared cells
+    left = RollupCube(shift=whole.shift).update(df.iloc[::2])
+    right = RollupCube(shift=whole.shift).update(df.iloc[1::2])
+    merged = left.merge(right)
+    assert_same_cells(merged, whole)
+    np.testing.assert_allclose(merged.corr(PRODUCT_COLS).to_numpy(), df[PRODUCT_COLS].corr().to_numpy(), atol=1e-10)
+
+
+def test_merging_cubes_about_different_shifts_is_refused():
+    df = history()
+    with pytest.raises(ValueError, match='shifts'):
+        RollupCube.from_frame(df.iloc[:50]).merge(RollupCube.from_frame(df.iloc[50:]))
+
+
+def test_saved_cube_round_trips(tmp_path):
+    cube = RollupCube.from_frame(history())
+    cube.save(str(tmp_path / 'rollups.npz'))
+    assert_same_cells(RollupCube.load(str(tmp_path / 'rollups.npz')), cube)
+
+
+def test_store_rollups_follow_appended_rows(tmp_path):
+    pytest.importorskip('pyarrow')
+    source = tmp_path / 'sales.csv'
+    shutil.copy(DATA_PATH, source)
+    store = SalesDataStore(str(tmp_path / 'store'), str(source))
+    store.rollups()
+    store.append(pd.read_csv(DATA_PATH).head(5))
+
+    stored = store.read()
+    rollups = store.rollups()
+    assert rollups.n_rows == len(stored)
+    np.testing.assert_allclose(rollups.sum(MEASURES, by='year').to_numpy(),
+                               RollupCube.from_frame(stored).sum(MEASURES, by='year').to_numpy(), rtol=1e-12)
+
+
+def test_corr_matches_pandas():
+    df = history()
+    cube = RollupCube.from_frame(df)
+    np.testing.assert_allclose(cube.corr(PRODUCT_COLS + ['total_profit']).to_numpy(),
+                               df[PRODUCT_COLS + ['total_profit']].corr().to_numpy(), atol=1e-10)
+
+
+def test_linear_fit_matches_polyfit():
+    df = history()
+    slope, intercept, r = RollupCube.from_frame(df).linear_fit('total_units', 'total_profit')
+    expected_slope, expected_intercept = np.polyfit(df['total_units'], df['total_profit'], 1)
+    assert slope == pytest.approx(expected_slope, rel=1e-9)
+    assert intercept == pytest.approx(expected_intercept, rel=1e-9)
+    assert r == pytest.approx(df['total_units'].corr(df['total_profit']), abs=1e-12)
+
+
+def test_linear_fit_of_constant_profit_has_no_correlation():
+    df = history().assign(total_profit=5.0)
+    slope, _, r = RollupCube.from_frame(df).linear_fit('total_units', 'total_profit')
+    assert slope == pytest.approx(0, abs=1e-9)
+    assert np.isnan(r)
@@ -0,0 +1,161 @@
+"""Request validation and micro-batching of the HTTP prediction service."""
+
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_analytics.config import MODELS_DIR, PRODUCT_COLS
+from sales_analytics.prediction import load_predictor
+from sales_analytics.server import PredictionServer
+
+SCENARIO = {'month': 6, **{product: 2000 for product in PRODUCT_COLS}}
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    return load_predictor(MODELS_DIR, memory_budget_mb=None)
+
+
+async def request(port, method, path, body=None, raw_headers=None):
+    """(status, parsed JSON) of one request on a fresh connection."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = b'' if body is None else (body if isinstance(body, bytes) else json.dumps(body).encode())
+    headers = raw_headers if raw_headers is not None else f'Content-Length: {len(data)}\r\n'
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n{headers}\r\n'.encode() + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+
+def serve(predictor, scenario, window_ms=5):
+    """Run `scenario(server, port)` against a server on an ephemeral port."""
+    async def main():
+        server = PredictionServer(predictor, window_ms=window_ms)
+        server.batcher.start()
+        listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+        try:
+            return await scenario(server, listener.sockets[0].getsockname()[1])
+        finally:
+            listener.close()
+            await server.batcher.stop()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize('body, message', [
+    (dict(SCENARIO, month=6.7), 'whole numbers'),
+    (dict(SCENARIO, month=13), 'whole numbers'),
+    (dict(SCENARIO, is_holiday_season=0.5), 'is_holiday_season'),
+    (dict(SCENARIO, facecream='many'), 'non-numeric'),
+    ({'month': 6}, 'missing required columns'),
+    (dict(SCENARIO, targets=5), "'targets'"),
+    (dict(SCENARIO, targets=['total_units', 3]), "'targets'"),
+    (dict(SCENARIO, targets=['revenue']), 'Unknown prediction targets'),
+    ([SCENARIO], 'JSON object'),
+])
+def test_invalid_scenarios_are_rejected(predictor, body, message):
+    status, payload = serve(predictor, lambda server, port: request(port, 'POST', '/predict', body))
+    assert status == 400
+    assert message in payload['error']
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), -float('inf')])
+@pytest.mark.parametrize('column', ['facecream', 'facecream_ma3', 'is_holiday_season'])
+def test_non_finite_values_are_rejected(predictor, value, column):
+    # json.dumps writes NaN/Infinity literals, which the server's parser accepts
+    body = json.dumps(dict(SCENARIO, **{column: value})).encode()
+    status, payload = serve(predictor, lambda server, port: request(port, 'POST', '/predict', body))
+    assert status == 400
+    assert 'non-finite' in payload['error']
+
+
+@pytest.mark.parametrize('header', ['Content-Length: -5\r\n', 'Content-Length: lots\r\n'])
+def test_invalid_content_length_is_a_bad_request(predictor, header):
+    status, payload = serve(predictor, lambda server, port: request(port, 'POST', '/predict', b'', header))
+    assert status == 400
+    assert 'Content-Length' in payload['error']
+
+
+def test_prediction_matches_the_predictor(predictor):
+    status, payload = serve(predictor, lambda server, port: request(
+        port, 'POST', '/predict', dict(SCENARIO, targets='total_units')))
+    assert status == 200
+    expected = predictor.predict(pd.DataFrame([SCENARIO]), ['total_units'], use_cache=False)['total_units'].iloc[0]
+    assert payload['predictions'] == {'total_units': pytest.approx(expected)}
+
+
+def test_concurrent_requests_share_one_batch(predictor):
+    scenarios = [dict(SCENARIO, month=1 + i, facecream=1000 + 400 * i) for i in range(8)]
+
+    async def scenario(server, port):
+        responses = await asyncio.gather(*(
+            request(port, 'POST', '/predict', dict(body, targets=['total_units'])) for body in scenarios))
+        return server.batcher.stats, responses
+
+    stats, responses = serve(predictor, scenario, window_ms=200)
+    assert stats['requests'] == len(scenarios)
+    assert stats['batches'] < len(scenarios)
+    assert stats['largest_batch'] > 1
+
+    # Each request gets back the rows it sent, not a neighbour's
+    expected = predictor.predict(pd.DataFrame(scenarios), ['total_units'], use_cache=False)['total_units']
+    for (status, payload), value in zip(responses, expected):
+        assert status == 200
+        assert payload['predictions']['total_units'] == pytest.approx(value)
+
+
+def test_batch_endpoint_keeps_scenario_order(predictor):
+    scenarios = [dict(SCENARIO, month=month) for month in (1, 6, 12)]
+    status, payload = serve(predictor, lambda server, port: request(
+        port, 'POST', '/predict/batch', {'scenarios': scenarios, 'targets': ['total_units']}))
+    assert status == 200
+    expected = predictor.predict(pd.DataFrame(scenarios), ['total_units'], use_cache=False)['total_units']
+    assert [row['total_units'] for row in payload['predictions']] == pytest.approx(expected.tolist())
+
+
+class SwappingPredictor:
+    """Stub whose refresh swaps its state in two steps, like BatchPredictor.refresh."""
+
+    targets = ['total_units']
+    algorithms = {'total_units': 'LR'}
+    rolling_state = None
+    models = {}
+
+    def __init__(self):
+        self.version = ('old', 'old')
+        self.scored = []
+        self.refreshes = 0
+
+    def refresh(self):
+        self.refreshes += 1
+        self.version = ('new', self.version[1])
+        time.sleep(0.2)
+        self.version = ('new', 'new')
+        return []
+
+    def predict(self, batch):
+        self.scored.append(self.version)
+        return pd.DataFrame({'total_units': np.zeros(len(batch))})
+
+
+def test_batches_wait_for_a_refresh_to_finish():
+    predictor = SwappingPredictor()
+
+    async def scenario(server, port):
+        watcher = asyncio.create_task(server._watch_deployment(0))
+        while not predictor.refreshes:
+            await asyncio.sleep(0.01)
+        # Requests sent mid-refresh are held back until it completes
+        responses = await asyncio.gather(*(request(port, 'POST', '/predict', SCENARIO) for _ in range(5)))
+        watcher.cancel()
+        return responses
+
+    responses = serve(predictor, scenario)
+    assert all(status == 200 for status, _ in responses)
+    assert predictor.scored and ('new', 'old') not in predictor.scored
@@ -0,0 +1,149 @@
+"""The compiled tree-ensemble path reproduces the native RF and XGB predictions."""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from sales_analytics.config import COMPILED_MAX_BATCH
+from sales_analytics.tree_engine import (AcceleratedTreeModel, accelerate, compile_model, compile_sklearn_forest,
+                                         compile_xgboost)
+
+xgboost = pytest.importorskip('xgboost')
+
+N_FEATURES = 5
+BATCH_SIZES = [1, COMPILED_MAX_BATCH, COMPILED_MAX_BATCH + 1]
+
+
+def training_data(missing=False, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(400, N_FEATURES)) * [1, 10, 100, 1000, 0.01]
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) * 50 + (X[:, 2] > 20) * 200 + rng.normal(size=len(X))
+    if missing:
+        X[rng.random(X.shape) < 0.15] = np.nan
+    return X, y
+
+
+def batch(size, missing=False, seed=1):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(size, N_FEATURES)) * [1, 10, 100, 1000, 0.01]
+    if missing:
+        X[rng.random(X.shape) < 0.2] = np.nan
+    return X
+
+
+@pytest.fixture(scope='module', params=[False, True], ids=['dense', 'missing'])
+def forest(request):
+    X, y = training_data(request.param)
+    return RandomForestRegressor(n_estimators=25, max_depth=8, random_state=0).fit(X, y), request.param
+
+
+@pytest.fixture(scope='module', params=[False, True], ids=['dense', 'missing'])
+def booster(request):
+    X, y = training_data(request.param)
+    model = xgboost.XGBRegressor(n_estimators=30, max_depth=5, learning_rate=0.3, random_state=0)
+    return model.fit(X, y), request.param
+
+
+def split_edges(compiled, thresholds):
+    """Rows placing each split feature exactly at, just below and just above its float32 threshold."""
+    rows = []
+    base = np.zeros(compiled.n_features, dtype=np.float32)
+    for feature, threshold in thresholds:
+        threshold = np.float32(threshold)
+        if not np.isfinite(threshold):
+            # sklearn's "missing values only" splits compare against +inf
+            continue
+        for value in (np.nextafter(threshold, np.float32(-np.inf)), threshold,
+                      np.nextafter(threshold, np.float32(np.inf))):
+            row = base.copy()
+            row[feature] = value
+            rows.append(row)
+    return np.array(rows, dtype=np.float64)
+
+
+def forest_splits(model):
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        internal = tree.children_left >= 0
+        yield from zip(tree.feature[internal], tree.threshold[internal])
+
+
+def booster_splits(model):
+    frame = model.get_booster().trees_to_dataframe()
+    splits = frame[frame['Feature'] != 'Leaf']
+    return zip(splits['Feature'].str.lstrip('f').astype(int), splits['Split'])
+
+
+@pytest.mark.parametrize('size', BATCH_SIZES)
+def test_forest_matches_native(forest, size):
+    model, missing = forest
+    X = batch(size, missing)
+    np.testing.assert_allclose(compile_sklearn_forest(model).predict(X), model.predict(X), rtol=1e-12)
+    np.testing.assert_allclose(accelerate(model).predict(X), model.predict(X), rtol=1e-12)
+
+
+@pytest.mark.parametrize('size', BATCH_SIZES)
+def test_xgboost_matches_native(booster, size):
+    model, missing = booster
+    X = batch(size, missing)
+    np.testing.assert_allclose(compile_xgboost(model).predict(X), model.predict(X), rtol=1e-6)
+    np.testing.assert_allclose(accelerate(model).predict(X), model.predict(X), rtol=1e-6)
+
+
+def test_forest_threshold_edges(forest):
+    model, _ = forest
+    compiled = compile_sklearn_forest(model)
+    X = split_edges(compiled, forest_splits(model))
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+
+
+def test_xgboost_threshold_edges(booster):
+    model, _ = booster
+    compiled = compile_xgboost(model)
+    X = split_edges(compiled, booster_splits(model))
+    np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=1e-6)
+
+
+def test_missing_values_follow_default_direction(forest, booster):
+    # Every feature missing: each tree sends the row down its default branches only
+    X = np.full((3, N_FEATURES), np.nan)
+    for model, missing in (forest, booster):
+        if not missing:
+            continue
+        compiled = compile_model(model)
+        assert not compiled.default_left.all()
+        np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=1e-6)
+
+
+class Recorder:
+    """Counts the rows each backend is asked to score."""
+
+    def __init__(self, backend, calls, name):
+        self.backend = backend
+        self.calls = calls
+        self.name = name
+
+    def predict(self, X):
+        self.calls.append((self.name, len(X)))
+        return self.backend.predict(X)
+
+
+def test_accelerated_model_routes_by_batch_size(forest):
+    model, _ = forest
+    calls = []
+    accelerated = AcceleratedTreeModel(Recorder(model, calls, 'native'),
+                                       Recorder(compile_model(model), calls, 'compiled'))
+    for size in BATCH_SIZES:
+        np.testing.assert_allclose(accelerated.predict(batch(size)), model.predict(batch(size)), rtol=1e-12)
+    assert calls == [('compiled', 1), ('compiled', COMPILED_MAX_BATCH), ('native', COMPILED_MAX_BATCH + 1)]
+
+
+def test_deferred_native_model_loads_on_first_large_batch(forest):
+    model, _ = forest
+    loads = []
+    accelerated = AcceleratedTreeModel(lambda: loads.append(1) or model, compile_model(model))
+    accelerated.predict(batch(COMPILED_MAX_BATCH))
+    assert not loads
+    accelerated.predict(batch(COMPILED_MAX_BATCH + 1))
+    accelerated.predict(batch(COMPILED_MAX_BATCH + 1))
+    assert loads == [1]